@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark des calculs statistiques de HotelSat
+Mesure la latence de AnalyticsService sur des volumes croissants de réponses: lecture de
+l'agrégat maintenu (hotel_stats_rollup) et, pour comparaison, requête d'agrégation SQL
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.hotel import db, Hotel, SatisfactionResponse
+from src.services.analytics_service import AnalyticsService
+from src.services.rollup_service import StatsRollupService
+
+# Volumes de réponses testés
+SIZES = [1000, 10000, 100000]
+REPEAT = 5
+
+
+def create_app(db_path):
+    """Crée une application Flask minimale sur une base temporaire"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        StatsRollupService(db).ensure_triggers()
+    return app
+
+
+def insert_responses(hotel_id, count):
+    """Insère des réponses aléatoires en masse pour un hôtel"""
+    now = datetime.now()
+    rating = lambda: random.choice([None, 1.0, 2.0, 3.0, 4.0, 5.0])
+    rows = []
+    for i in range(count):
+        rows.append({
+            'hotel_id': hotel_id,
+            'overall_rating': rating(),
+            'accommodation_rating': rating(),
+            'service_rating': rating(),
+            'cleanliness_rating': rating(),
+            'food_rating': rating(),
+            'location_rating': rating(),
+            'value_rating': rating(),
+            'would_recommend': random.choice([True, False, None]),
+            'comments': 'Très bon séjour, personnel accueillant',
+            'submission_date': now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+            'tally_submission_id': f'bench_{hotel_id}_{i}'
+        })
+    db.session.execute(SatisfactionResponse.__table__.insert(), rows)
+    db.session.commit()
+
+
+def measure(func, repeat=REPEAT):
+    """Retourne la meilleure durée d'exécution (en ms)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark():
+    """Exécute le benchmark des statistiques par hôtel"""
+    # Écarts signalés par rebuild() attendus après l'insertion en masse: journaux désactivés
+    logging.disable(logging.CRITICAL)
+
+    print("⏱️  Benchmark AnalyticsService.get_hotel_statistics")
+    print("=" * 72)
+    print(f"{'Réponses':>10} | {'Agrégat maintenu (ms)':>21} | {'Agrégat SQL (ms)':>16} | {'Chargement ORM (ms)':>19}")
+    print("-" * 72)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = create_app(os.path.join(tmp_dir, 'bench.db'))
+
+        with app.app_context():
+            analytics_service = AnalyticsService(db)
+
+            for size in SIZES:
+                hotel = Hotel(name=f'Hôtel benchmark {size}')
+                db.session.add(hotel)
+                db.session.commit()
+                insert_responses(hotel.id, size)
+
+                # Insertion en masse hors ingestion: agrégats recalculés comme par `flask stats rebuild`
+                StatsRollupService(db).rebuild()
+
+                rollup_ms = measure(lambda: analytics_service.get_hotel_statistics(hotel.id))
+                # Référence: requête d'agrégation utilisée en l'absence d'agrégat maintenu
+                aggregate_ms = measure(lambda: analytics_service.aggregate_statistics_query([hotel.id]).first())
+                # Référence: coût de la simple matérialisation des lignes en objets ORM
+                orm_ms = measure(lambda: SatisfactionResponse.query.filter_by(hotel_id=hotel.id).all(), repeat=1)
+                db.session.expunge_all()
+
+                print(f"{size:>10} | {rollup_ms:>21.2f} | {aggregate_ms:>16.2f} | {orm_ms:>19.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark du traitement des réponses Tally
+Mesure le coût par réponse de TallyService et TallyWebhookProcessor sur le schéma compilé
+"""
+
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.services.field_mapping import FIELD_SCHEMA
+from src.services.tally_service import TallyService
+from src.services.tally_webhook_processor import TallyWebhookProcessor
+
+# Nombre de réponses traitées par mesure
+PAYLOADS = 10000
+REPEAT = 5
+
+
+def rating_value():
+    """Note dans l'un des formats rencontrés dans les formulaires"""
+    rating = random.randint(1, 5)
+    return random.choice([rating, str(rating), f'{rating} étoiles', f'{rating}/5', f'{rating * 2}/10'])
+
+
+def core_payload(i):
+    """Réponse au formulaire de satisfaction simple"""
+    return {
+        'submissionId': f'bench_{i}',
+        'formId': 'bench_form',
+        'submittedAt': '2024-06-01T10:00:00Z',
+        'data': {
+            'nom': 'Jean Dupont',
+            'Email': 'jean.dupont@example.com',
+            'Note_Globale': rating_value(),
+            'hebergement': rating_value(),
+            'service': rating_value(),
+            'Propreté': rating_value(),
+            'restauration': rating_value(),
+            'emplacement': rating_value(),
+            'rapport_qualite_prix': rating_value(),
+            'recommandation': random.choice(['Oui', 'Non']),
+            'commentaires': 'Très bon séjour, personnel accueillant'
+        }
+    }
+
+
+def top_of_travel_payload(i):
+    """Réponse au questionnaire Top of Travel complet (toutes les sections)"""
+    data = {}
+    for field, spec in FIELD_SCHEMA.items():
+        alias = spec['aliases'][-1]
+        if spec['type'] == 'rating':
+            data[alias] = rating_value()
+        elif spec.get('choices'):
+            data[alias] = random.choice(list(spec['choices']))
+        else:
+            data[alias] = f'{field} {i}'
+    return {'submissionId': f'bench_tot_{i}', 'formId': 'bench_form', 'data': data}
+
+
+def measure(func, repeat=REPEAT):
+    """Retourne la meilleure durée d'exécution (en ms)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark():
+    """Exécute le benchmark du traitement des réponses"""
+    # Les journaux par réponse fausseraient la mesure
+    logging.disable(logging.CRITICAL)
+
+    tally_service = TallyService()
+    payload_sets = [
+        ('Formulaire simple', [core_payload(i) for i in range(PAYLOADS)]),
+        ('Top of Travel', [top_of_travel_payload(i) for i in range(PAYLOADS)])
+    ]
+
+    print(f"⏱️  Benchmark du traitement des réponses Tally ({PAYLOADS} réponses)")
+    print("=" * 64)
+    print(f"{'Réponses':>18} | {'TallyService (µs)':>18} | {'WebhookProcessor (µs)':>21}")
+    print("-" * 64)
+
+    for label, payloads in payload_sets:
+        service_ms = measure(lambda: [tally_service.process_webhook_data(p) for p in payloads])
+        processor_ms = measure(lambda: [TallyWebhookProcessor.process_webhook_data(p) for p in payloads])
+        per_payload = 1000 / len(payloads)
+        print(f"{label:>18} | {service_ms * per_payload:>18.2f} | {processor_ms * per_payload:>21.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,126 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from src.models.hotel import db, Hotel
+from src.services.rollup_service import StatsRollupService
+from src.services.comment_search_service import CommentSearchService
+from src.services.keyword_service import KeywordService
+from src.services.report_job_service import ReportJobService
+from src.services.webhook_ingest_service import WebhookIngestService
+from src.services.sheets_outbox_service import SheetsOutboxService
+from src.services.tally_service import TallyService
+from src.services.google_sheets_service import GoogleSheetsService
+from src.services.analytics_cache import analytics_cache
+
+def init_database():
+    """Crée les tables, l'index plein texte et les triggers de comptage s'ils n'existent pas (contexte d'application requis)"""
+    db.create_all()
+    # Index plein texte des commentaires (table virtuelle FTS5 + triggers)
+    CommentSearchService(db).ensure_index()
+    # Comptage des réponses par triggers (détection des agrégats périmés)
+    StatsRollupService(db).ensure_triggers()
+
+# Les commandes n'initialisent que la base (aucun thread de fond)
+
+# Commandes de maintenance des agrégats (flask --app src.main stats ...)
+@click.group('stats', cls=AppGroup, help='Maintenance des agrégats de satisfaction')
+@with_appcontext
+def stats_cli():
+    init_database()
+
+# Commandes de maintenance de l'index des commentaires (flask --app src.main comments ...)
+@click.group('comments', cls=AppGroup, help="Maintenance de l'index plein texte des commentaires")
+@with_appcontext
+def comments_cli():
+    init_database()
+
+# Commandes de maintenance des rapports asynchrones (flask --app src.main reports ...)
+@click.group('reports', cls=AppGroup, help='Maintenance des rapports générés en arrière-plan')
+@with_appcontext
+def reports_cli():
+    init_database()
+
+# Commandes de la file d'ingestion des webhooks (flask --app src.main webhooks ...)
+@click.group('webhooks', cls=AppGroup, help="Maintenance de la file d'ingestion des webhooks Tally")
+@with_appcontext
+def webhooks_cli():
+    init_database()
+
+def _bump_versions(hotel_ids=None):
+    """Change la version des données des hôtels (tous si None): les analyses en cache (ETag) sont recalculées"""
+    if hotel_ids is None:
+        hotel_ids = [hotel_id for (hotel_id,) in db.session.query(Hotel.id)]
+    for hotel_id in hotel_ids:
+        analytics_cache.bump_version(db, hotel_id)
+    db.session.commit()
+
+@stats_cli.command('rebuild')
+@click.option('--check', is_flag=True, help='Signale les écarts sans corriger les agrégats')
+def rebuild_stats(check):
+    """Recalcule hotel_stats_rollup et hotel_daily_rollup depuis satisfaction_responses"""
+    drifts = StatsRollupService(db).rebuild(fix=not check)
+
+    if not drifts:
+        click.echo("✅ Aucun écart détecté dans les agrégats")
+        return
+
+    for drift in drifts:
+        day = f" ({drift['day']})" if 'day' in drift else ''
+        click.echo(f"⚠️  {drift['table']} - hôtel {drift['hotel_id']}{day}:")
+        for field, values in drift['differences'].items():
+            click.echo(f"   {field}: stocké={values['stored']} recalculé={values['computed']}")
+
+    if check:
+        click.echo(f"{len(drifts)} ligne(s) en écart (aucune correction appliquée)")
+        raise SystemExit(1)
+
+    _bump_versions(sorted({drift['hotel_id'] for drift in drifts}))
+    click.echo(f"🔄 {len(drifts)} ligne(s) recalculée(s)")
+
+@comments_cli.command('reindex')
+def reindex_comments():
+    """Reconstruit l'index plein texte des commentaires"""
+    comment_search_service = CommentSearchService(db)
+    if not comment_search_service.ensure_index():
+        click.echo("❌ FTS5 n'est pas disponible dans cette version de SQLite")
+        raise SystemExit(1)
+
+    comment_search_service.rebuild_index()
+    click.echo("✅ Index des commentaires reconstruit")
+
+@comments_cli.command('backfill-keywords')
+def backfill_keywords():
+    """Recalcule la table des fréquences de mots-clés depuis les commentaires existants"""
+    processed = KeywordService(db).backfill()
+    _bump_versions()
+    click.echo(f"✅ Mots-clés recalculés à partir de {processed} commentaire(s)")
+
+@reports_cli.command('cleanup')
+@click.option('--retention-hours', type=int, default=None, help='Durée de conservation (REPORT_JOB_RETENTION_HOURS par défaut)')
+def cleanup_reports(retention_hours):
+    """Supprime les rapports expirés et marque en échec les travaux interrompus"""
+    removed, failed = ReportJobService(db).cleanup(retention_hours)
+    click.echo(f"🧹 {removed} rapport(s) supprimé(s), {failed} travail(aux) interrompu(s)")
+
+@webhooks_cli.command('drain')
+@click.option('--retry-failed', is_flag=True, help='Remet d\'abord en file les webhooks en échec')
+def drain_webhooks(retry_failed):
+    """Enregistre les webhooks en attente dans la file d'ingestion"""
+    ingest_service = WebhookIngestService(db, TallyService(), GoogleSheetsService())
+    if retry_failed:
+        click.echo(f"🔁 {ingest_service.retry_failed()} webhook(s) remis en file")
+
+    processed = ingest_service.drain()
+    stats = ingest_service.stats()
+    click.echo(f"✅ {processed} webhook(s) traité(s), {stats['failed']} en échec")
+
+@webhooks_cli.command('flush-sheets')
+@click.option('--retry-failed', is_flag=True, help='Remet d\'abord en attente les lignes en échec')
+def flush_sheets(retry_failed):
+    """Envoie les lignes en attente de l'outbox Google Sheets"""
+    outbox_service = SheetsOutboxService(db, GoogleSheetsService())
+    if retry_failed:
+        click.echo(f"🔁 {outbox_service.retry_failed()} ligne(s) remise(s) en attente")
+
+    appended = outbox_service.flush()
+    stats = outbox_service.stats()
+    click.echo(f"✅ {appended} ligne(s) ajoutée(s) en {stats['api_calls']} appel(s), {stats['backlog']} en attente")
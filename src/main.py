@@ -1,6 +1,7 @@
 import os
 import sys
 import logging
+import threading
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 
@@ -10,8 +11,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from src.models.hotel import db
 from src.routes.user import user_bp
 from src.routes.hotels import hotels_bp
-from src.routes.webhooks import webhooks_bp
+from src.routes.webhooks import webhooks_bp, start_ingest_worker, start_sheets_flusher
 from src.routes.reports import reports_bp
+from src.commands import stats_cli, comments_cli, reports_cli, webhooks_cli, init_database
+from src.services.report_job_service import ReportJobService
+from src.services.webhook_ingest_service import WebhookIngestService
 
 # Configuration du logging
 logging.basicConfig(
@@ -38,9 +42,44 @@ app.register_blueprint(hotels_bp, url_prefix='/api')
 app.register_blueprint(webhooks_bp, url_prefix='/api')
 app.register_blueprint(reports_bp, url_prefix='/api')
 
-# Création des tables
-with app.app_context():
-    db.create_all()
+# Commandes de maintenance
+app.cli.add_command(stats_cli)
+app.cli.add_command(comments_cli)
+app.cli.add_command(reports_cli)
+app.cli.add_command(webhooks_cli)
+
+def startup(app):
+    """Initialise la base et démarre les threads de fond du processus serveur"""
+    with app.app_context():
+        init_database()
+        # Rapports laissés en attente ou en cours par un processus arrêté
+        ReportJobService(db).reap_orphans()
+
+    # Mode file: reprise des webhooks restés en attente au démarrage
+    if WebhookIngestService.mode() == 'queue':
+        start_ingest_worker(app)
+
+    # Envoi des lignes Google Sheets restées dans l'outbox
+    start_sheets_flusher(app)
+
+# Rien n'est lancé à l'import (commandes flask, processus du pool de rendu):
+# le serveur initialise le processus au lancement du script ou à sa première requête
+_started = False
+_startup_lock = threading.Lock()
+
+def ensure_started(app):
+    """Exécute startup() une seule fois par processus"""
+    global _started
+    with _startup_lock:
+        if not _started:
+            startup(app)
+            _started = True
+
+@app.before_request
+def start_on_first_request():
+    """Serveur WSGI (gunicorn src.main:app): initialisation à la première requête du processus"""
+    if not _started:
+        ensure_started(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -64,5 +103,8 @@ def health_check():
     return {'status': 'healthy', 'service': 'HotelSat API'}
 
 if __name__ == '__main__':
+    # Reloader du mode debug: seul le processus qui sert les requêtes est initialisé
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        ensure_started(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -32,6 +32,10 @@ class Hotel(db.Model):
 
 class SatisfactionResponse(db.Model):
     __tablename__ = 'satisfaction_responses'
+    __table_args__ = (
+        # Index couvrant les agrégations par hôtel et par période
+        db.Index('ix_satisfaction_responses_hotel_date', 'hotel_id', 'submission_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), nullable=False)
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+from src.models.hotel import db
+
+class ReportJob(db.Model):
+    """Génération asynchrone d'un rapport (export Excel, comparaison)"""
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        # Recherche des travaux identiques en attente (déduplication)
+        db.Index('ix_report_jobs_params_hash_status', 'params_hash', 'status'),
+    )
+
+    STATUSES = ['pending', 'running', 'completed', 'failed']
+
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    params_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    error = db.Column(db.Text, nullable=True)
+
+    # Processus propriétaire (pid et identifiant de démarrage): travaux orphelins après un arrêt
+    worker_pid = db.Column(db.Integer, nullable=True)
+    worker_boot = db.Column(db.String(32), nullable=True)
+
+    # Fichier produit
+    artifact_path = db.Column(db.String(500), nullable=True)
+    artifact_name = db.Column(db.String(300), nullable=True)
+    artifact_mimetype = db.Column(db.String(100), nullable=True)
+    artifact_size = db.Column(db.Integer, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def get_params(self):
+        return json.loads(self.params or '{}')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'params': self.get_params(),
+            'status': self.status,
+            'error': self.error,
+            'artifact_name': self.artifact_name,
+            'artifact_size': self.artifact_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,63 @@
+from src.models.hotel import db
+
+class ResponseRating(db.Model):
+    """
+    Note détaillée d'une réponse Top of Travel (transports, chambres, piscine, animation...)
+
+    Une ligne par note renseignée, le champ étant désigné par son code du schéma Tally
+    (src/services/field_mapping.py). Table sans rowid ordonnée par (hôtel, champ, réponse):
+    les agrégats par hôtel et par section se lisent sur une plage contiguë de la clé primaire.
+    """
+    __tablename__ = 'response_ratings'
+    __table_args__ = (
+        # Notes d'une réponse
+        db.Index('ix_response_ratings_response', 'response_id'),
+        {'sqlite_with_rowid': False}
+    )
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    field_code = db.Column(db.SmallInteger, primary_key=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('satisfaction_responses.id'), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)
+
+    hotel = db.relationship('Hotel', backref=db.backref('response_ratings', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'field_code': self.field_code,
+            'response_id': self.response_id,
+            'rating': self.rating
+        }
+
+class ResponseProfile(db.Model):
+    """Profil du voyageur d'une réponse (type de voyage, tranche d'âge, durée du séjour) et avis libre"""
+    __tablename__ = 'response_profiles'
+    __table_args__ = (
+        # Répartition et filtrage des réponses d'un hôtel par profil
+        db.Index('ix_response_profiles_hotel_travel_type', 'hotel_id', 'travel_type'),
+        db.Index('ix_response_profiles_hotel_age_group', 'hotel_id', 'age_group'),
+    )
+
+    # Champs du profil extraits du formulaire
+    FIELDS = ['travel_type', 'age_group', 'trip_duration', 'additional_comments']
+
+    response_id = db.Column(db.Integer, db.ForeignKey('satisfaction_responses.id'), primary_key=True)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), nullable=False)
+    travel_type = db.Column(db.String(20), nullable=True)
+    age_group = db.Column(db.String(10), nullable=True)
+    trip_duration = db.Column(db.SmallInteger, nullable=True)
+    # Avis libre du questionnaire, indexé avec les commentaires (recherche plein texte, mots-clés)
+    additional_comments = db.Column(db.Text, nullable=True)
+
+    hotel = db.relationship('Hotel', backref=db.backref('response_profiles', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'response_id': self.response_id,
+            'hotel_id': self.hotel_id,
+            'travel_type': self.travel_type,
+            'age_group': self.age_group,
+            'trip_duration': self.trip_duration,
+            'additional_comments': self.additional_comments
+        }
@@ -0,0 +1,33 @@
+import json
+from datetime import datetime
+from src.models.hotel import db
+
+class SheetsOutboxRow(db.Model):
+    """Ligne en attente d'ajout à la feuille Google Sheets d'un hôtel"""
+    __tablename__ = 'sheets_outbox'
+    __table_args__ = (
+        # Sélection des lignes dues, par ordre d'arrivée
+        db.Index('ix_sheets_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    # 'sending': appel en cours, rapproché de la feuille avant tout renvoi
+    STATUSES = ['pending', 'sending', 'failed']
+
+    id = db.Column(db.Integer, primary_key=True)
+    google_sheet_id = db.Column(db.String(200), nullable=False, index=True)
+    # Valeurs de la ligne (liste JSON)
+    values = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Réessais avec attente exponentielle
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Réclamation par un processus (un envoi = un jeton)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    def get_values(self):
+        return json.loads(self.values)
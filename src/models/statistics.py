@@ -0,0 +1,161 @@
+from datetime import datetime
+from src.models.hotel import db
+
+class RatingAggregateMixin:
+    """Compteurs communs aux tables d'agrégats (sommes + nombre de valeurs non nulles)"""
+
+    # Colonnes de notes agrégées
+    RATING_FIELDS = [
+        'overall_rating',
+        'accommodation_rating',
+        'service_rating',
+        'cleanliness_rating',
+        'food_rating',
+        'location_rating',
+        'value_rating'
+    ]
+
+    total_responses = db.Column(db.Integer, nullable=False, default=0)
+
+    overall_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    overall_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    accommodation_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    accommodation_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    service_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    service_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    cleanliness_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    cleanliness_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    food_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    food_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    location_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    location_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    value_rating_sum = db.Column(db.Float, nullable=False, default=0)
+    value_rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Recommandation
+    recommend_yes = db.Column(db.Integer, nullable=False, default=0)
+    recommend_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def counter_fields(cls):
+        """Liste de tous les compteurs de l'agrégat"""
+        fields = ['total_responses', 'recommend_yes', 'recommend_count']
+        for field in cls.RATING_FIELDS:
+            fields.extend([f'{field}_sum', f'{field}_count'])
+        return fields
+
+    def counters_dict(self):
+        return {field: getattr(self, field) for field in self.counter_fields()}
+
+class HotelStatsRollup(RatingAggregateMixin, db.Model):
+    """Agrégats de satisfaction maintenus en continu pour chaque hôtel"""
+    __tablename__ = 'hotel_stats_rollup'
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    hotel = db.relationship('Hotel', backref=db.backref('stats_rollup', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        data = {
+            'hotel_id': self.hotel_id,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        data.update(self.counters_dict())
+        return data
+
+class HotelDailyRollup(RatingAggregateMixin, db.Model):
+    """Agrégats de satisfaction par hôtel et par jour de soumission"""
+    __tablename__ = 'hotel_daily_rollup'
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    hotel = db.relationship('Hotel', backref=db.backref('daily_rollups', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        data = {
+            'hotel_id': self.hotel_id,
+            'day': self.day.isoformat() if self.day else None
+        }
+        data.update(self.counters_dict())
+        return data
+
+class HotelResponseCount(db.Model):
+    """
+    Nombre de réponses et de modifications de réponses par hôtel
+
+    Tenu à jour par des triggers SQLite sur satisfaction_responses (StatsRollupService.ensure_triggers):
+    toute écriture est comptée, y compris hors ingestion, ce qui permet de vérifier en une lecture
+    qu'un agrégat maintenu couvre toujours les réponses de son hôtel.
+    """
+    __tablename__ = 'hotel_response_counts'
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    # Réponses modifiées ou supprimées depuis le dernier recalcul des agrégats
+    updates = db.Column(db.Integer, nullable=False, default=0)
+
+    hotel = db.relationship('Hotel', backref=db.backref('response_count', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'responses': self.responses,
+            'updates': self.updates
+        }
+
+class HotelKeywordFrequency(db.Model):
+    """Fréquence des mots-clés des commentaires par hôtel et par mois"""
+    __tablename__ = 'hotel_keyword_frequency'
+    __table_args__ = (
+        # Top-k des mots-clés d'un hôtel sur une période
+        db.Index('ix_hotel_keyword_frequency_hotel_month_occurrences', 'hotel_id', 'month', 'occurrences'),
+    )
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # premier jour du mois
+    term = db.Column(db.String(100), primary_key=True)
+    occurrences = db.Column(db.Integer, nullable=False, default=0)
+
+    hotel = db.relationship('Hotel', backref=db.backref('keyword_frequencies', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'month': self.month.isoformat() if self.month else None,
+            'term': self.term,
+            'occurrences': self.occurrences
+        }
+
+class HotelKeywordBackfill(db.Model):
+    """Marqueur d'initialisation des fréquences de mots-clés d'un hôtel depuis ses commentaires existants"""
+    __tablename__ = 'hotel_keyword_backfill'
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    backfilled_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    hotel = db.relationship('Hotel', backref=db.backref('keyword_backfill', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'backfilled_at': self.backfilled_at.isoformat() if self.backfilled_at else None
+        }
+
+class HotelDataVersion(db.Model):
+    """Version des données d'un hôtel, incrémentée à chaque écriture (invalidation des caches)"""
+    __tablename__ = 'hotel_data_version'
+
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    hotel = db.relationship('Hotel', backref=db.backref('data_version', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,37 @@
+from datetime import datetime
+from src.models.hotel import db
+
+class WebhookQueueItem(db.Model):
+    """Webhook Tally reçu et en attente d'enregistrement (file d'ingestion durable)"""
+    __tablename__ = 'webhook_ingest_queue'
+    __table_args__ = (
+        # Réclamation des éléments les plus anciens par statut
+        db.Index('ix_webhook_ingest_queue_status_id', 'status', 'id'),
+    )
+
+    STATUSES = ['pending', 'processing', 'failed']
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Paramètre hotel_id de l'URL du webhook, s'il était fourni
+    hotel_id = db.Column(db.Integer, nullable=True)
+    # Corps brut du webhook (JSON)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Réclamation par un worker (un lot = un jeton)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'hotel_id': self.hotel_id,
+            'status': self.status,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'attempts': self.attempts,
+            'last_error': self.last_error
+        }
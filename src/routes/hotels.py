@@ -2,7 +2,14 @@ from flask import Blueprint, request, jsonify
 from src.models.hotel import db, Hotel, SatisfactionResponse
 from src.services.google_sheets_service import GoogleSheetsService
 from src.services.analytics_service import AnalyticsService
+from src.services.response_cache import ResponseColumns
+from src.services.comment_search_service import CommentSearchService
+from src.services.keyword_service import KeywordService
+from src.services.analytics_cache import analytics_cache
+from src.services.hotel_resolver import hotel_resolver
+from src.services.field_mapping import FIELD_SCHEMA
 import logging
+from datetime import date
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +53,7 @@ def create_hotel():
             hotel.google_sheet_url = sheet_url
         
         db.session.commit()
+        hotel_resolver.refresh()
         
         logger.info(f"Hôtel créé: {hotel.name} (ID: {hotel.id})")
         return jsonify(hotel.to_dict()), 201
@@ -79,7 +87,10 @@ def update_hotel(hotel_id):
         if data.get('tally_form_url'):
             hotel.tally_form_url = data['tally_form_url']
         
+        # Le nom de l'hôtel figure dans certaines réponses analytiques (graphiques)
+        analytics_cache.bump_version(db, hotel.id)
         db.session.commit()
+        hotel_resolver.refresh()
         
         logger.info(f"Hôtel mis à jour: {hotel.name} (ID: {hotel.id})")
         return jsonify(hotel.to_dict())
@@ -96,6 +107,8 @@ def delete_hotel(hotel_id):
         hotel = Hotel.query.get_or_404(hotel_id)
         db.session.delete(hotel)
         db.session.commit()
+        analytics_cache.invalidate(hotel_id)
+        hotel_resolver.refresh()
         
         logger.info(f"Hôtel supprimé: {hotel.name} (ID: {hotel.id})")
         return jsonify({'message': 'Hôtel supprimé avec succès'})
@@ -106,6 +119,7 @@ def delete_hotel(hotel_id):
         return jsonify({'error': 'Erreur lors de la suppression'}), 500
 
 @hotels_bp.route('/hotels/<int:hotel_id>/statistics', methods=['GET'])
+@analytics_cache.cached('statistics')
 def get_hotel_statistics(hotel_id):
     """Récupère les statistiques de satisfaction d'un hôtel"""
     try:
@@ -148,19 +162,117 @@ def get_hotel_responses(hotel_id):
         return jsonify({'error': 'Erreur serveur'}), 500
 
 @hotels_bp.route('/hotels/<int:hotel_id>/insights', methods=['GET'])
+@analytics_cache.cached('insights')
 def get_hotel_insights(hotel_id):
     """Récupère les insights automatiques pour un hôtel"""
     try:
         hotel = Hotel.query.get_or_404(hotel_id)
         analytics_service = AnalyticsService(db)
-        insights = analytics_service.generate_insights(hotel_id)
+        report = analytics_service.generate_insights_report(hotel_id)
         
-        return jsonify({'insights': insights})
+        # Durées des étapes en en-tête Server-Timing: le corps mis en cache reste indépendant du calcul
+        response = jsonify({'insights': report['insights']})
+        response.headers['Server-Timing'] = ', '.join(
+            f'{stage};dur={duration}' for stage, duration in report['timings'].items()
+        )
+        return response
         
     except Exception as e:
         logger.error(f"Erreur lors de la génération d'insights pour l'hôtel {hotel_id}: {e}")
         return jsonify({'error': 'Erreur serveur'}), 500
 
+@hotels_bp.route('/hotels/<int:hotel_id>/correlations', methods=['GET'])
+def get_hotel_correlations(hotel_id):
+    """Récupère la matrice de corrélation entre les notes d'un hôtel"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        fields = request.args.get('fields')
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+        
+        known = set(ResponseColumns.RATING_FIELDS) | set(AnalyticsService.DETAIL_RATING_FIELDS)
+        unknown = [field for field in fields or [] if field not in known]
+        if unknown:
+            return jsonify({'error': f"Champs inconnus: {', '.join(unknown)}"}), 400
+        
+        analytics_service = AnalyticsService(db)
+        correlations = analytics_service.get_correlation_matrix(hotel_id, fields)
+        
+        if correlations is None:
+            return jsonify({'error': 'Erreur lors du calcul des corrélations'}), 500
+        
+        return jsonify(correlations)
+        
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des corrélations pour l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@hotels_bp.route('/hotels/<int:hotel_id>/sections', methods=['GET'])
+def get_hotel_section_averages(hotel_id):
+    """Moyennes des notes détaillées par section du questionnaire, éventuellement par profil voyageur"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        filters = {}
+        for field in ['travel_type', 'age_group']:
+            value = request.args.get(field)
+            if value and value not in FIELD_SCHEMA[field]['choices'].values():
+                return jsonify({'error': f"Valeur inconnue pour {field}: {value}"}), 400
+            filters[field] = value
+        
+        analytics_service = AnalyticsService(db)
+        averages = analytics_service.get_section_averages([hotel_id], **filters)
+        
+        if averages is None:
+            return jsonify({'error': 'Erreur lors du calcul des moyennes par section'}), 500
+        
+        return jsonify({'hotel_id': hotel_id, **filters, **averages[hotel_id]})
+        
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des moyennes par section de l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@hotels_bp.route('/hotels/<int:hotel_id>/comments/search', methods=['GET'])
+def search_hotel_comments(hotel_id):
+    """Recherche plein texte dans les commentaires d'un hôtel"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        query = request.args.get('q', '').strip()
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        
+        if not query:
+            return jsonify({'error': 'Le paramètre q est requis'}), 400
+        
+        comment_search_service = CommentSearchService(db)
+        if not comment_search_service.is_available():
+            return jsonify({'error': 'Recherche plein texte indisponible'}), 503
+        
+        results = comment_search_service.search(hotel_id, query, page, per_page)
+        return jsonify(results)
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la recherche dans les commentaires de l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@hotels_bp.route('/hotels/<int:hotel_id>/keywords', methods=['GET'])
+def get_hotel_keywords(hotel_id):
+    """Mots-clés les plus fréquents des commentaires d'un hôtel"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        days = request.args.get('days', type=int)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        
+        keywords = KeywordService(db).top_keywords(hotel_id, days=days, limit=limit)
+        
+        return jsonify({
+            'hotel_id': hotel_id,
+            'days': days,
+            'keywords': [{'term': term, 'occurrences': occurrences} for term, occurrences in keywords]
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des mots-clés de l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
 @hotels_bp.route('/hotels/compare', methods=['POST'])
 def compare_hotels():
     """Compare plusieurs hôtels"""
@@ -183,15 +295,47 @@ def compare_hotels():
         logger.error(f"Erreur lors de la comparaison des hôtels: {e}")
         return jsonify({'error': 'Erreur serveur'}), 500
 
+@hotels_bp.route('/hotels/ranking', methods=['GET'])
+def get_hotels_ranking():
+    """Classe tous les hôtels du portefeuille selon une métrique"""
+    try:
+        metric = request.args.get('metric', 'average_overall_rating')
+        
+        if metric not in AnalyticsService.RANKING_METRICS:
+            return jsonify({'error': f'Métrique invalide: {metric}'}), 400
+        
+        analytics_service = AnalyticsService(db)
+        ranking = analytics_service.get_portfolio_ranking(metric)
+        
+        if ranking is None:
+            return jsonify({'error': 'Erreur lors du classement'}), 500
+        
+        return jsonify({'metric': metric, 'ranking': ranking})
+        
+    except Exception as e:
+        logger.error(f"Erreur lors du classement des hôtels: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
 @hotels_bp.route('/hotels/<int:hotel_id>/temporal-analysis', methods=['GET'])
+@analytics_cache.cached('temporal-analysis')
 def get_temporal_analysis(hotel_id):
     """Récupère l'analyse temporelle pour un hôtel"""
     try:
         hotel = Hotel.query.get_or_404(hotel_id)
         period_days = request.args.get('period_days', 30, type=int)
+        granularity = request.args.get('granularity', 'week')
+        
+        if granularity not in AnalyticsService.TEMPORAL_GRANULARITIES:
+            return jsonify({'error': f'Granularité invalide: {granularity}'}), 400
+        
+        try:
+            start_date = _parse_date_arg('start_date')
+            end_date = _parse_date_arg('end_date')
+        except ValueError:
+            return jsonify({'error': 'Format de date invalide (AAAA-MM-JJ attendu)'}), 400
         
         analytics_service = AnalyticsService(db)
-        analysis = analytics_service.get_temporal_analysis(hotel_id, period_days)
+        analysis = analytics_service.get_temporal_analysis(hotel_id, period_days, granularity, start_date, end_date)
         
         if analysis is None:
             return jsonify({'error': 'Erreur lors de l\'analyse temporelle'}), 500
@@ -202,3 +346,60 @@ def get_temporal_analysis(hotel_id):
         logger.error(f"Erreur lors de l'analyse temporelle pour l'hôtel {hotel_id}: {e}")
         return jsonify({'error': 'Erreur serveur'}), 500
 
+@hotels_bp.route('/hotels/<int:hotel_id>/chart-data', methods=['GET'])
+@analytics_cache.cached('chart-data')
+def get_hotel_chart_data(hotel_id):
+    """Récupère les séries des graphiques d'un hôtel pour un rendu côté client"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        period_days = request.args.get('period_days', 60, type=int)
+        
+        analytics_service = AnalyticsService(db)
+        chart_data = analytics_service.get_chart_data(hotel_id, period_days)
+        
+        if chart_data is None:
+            return jsonify({'error': 'Erreur lors de la préparation des graphiques'}), 500
+        
+        return jsonify(chart_data)
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des données de graphiques pour l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@hotels_bp.route('/hotels/temporal-analysis', methods=['GET'])
+def get_portfolio_temporal_analysis():
+    """Récupère l'analyse temporelle de tous les hôtels"""
+    try:
+        period_days = request.args.get('period_days', 365, type=int)
+        granularity = request.args.get('granularity', 'month')
+        
+        if granularity not in AnalyticsService.TEMPORAL_GRANULARITIES:
+            return jsonify({'error': f'Granularité invalide: {granularity}'}), 400
+        
+        try:
+            start_date = _parse_date_arg('start_date')
+            end_date = _parse_date_arg('end_date')
+        except ValueError:
+            return jsonify({'error': 'Format de date invalide (AAAA-MM-JJ attendu)'}), 400
+        
+        analytics_service = AnalyticsService(db)
+        analysis = analytics_service.get_portfolio_temporal_analysis(None, period_days, granularity, start_date, end_date)
+        
+        if analysis is None:
+            return jsonify({'error': 'Erreur lors de l\'analyse temporelle'}), 500
+        
+        return jsonify({str(hotel_id): data for hotel_id, data in analysis.items()})
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de l'analyse temporelle du portefeuille: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@hotels_bp.route('/analytics/cache', methods=['GET'])
+def get_analytics_cache_stats():
+    """Compteurs du cache des réponses analytiques"""
+    return jsonify(analytics_cache.stats())
+
+def _parse_date_arg(name):
+    """Lit un paramètre de date optionnel au format ISO (AAAA-MM-JJ)"""
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
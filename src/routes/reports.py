@@ -1,13 +1,13 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from src.models.hotel import db, Hotel, SatisfactionResponse
 from src.services.analytics_service import AnalyticsService
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
+from src.services.analytics_cache import analytics_cache
+from src.services.excel_export_service import ExcelExportService
+from src.services.stream_export_service import StreamExportService
+from src.services.columnar_export_service import ColumnarExportService
+from src.services.chart_service import ChartService
+from src.services.report_job_service import ReportJobService, ReportQueueFull
 import os
-import tempfile
 from datetime import datetime
 import logging
 
@@ -20,77 +20,35 @@ def export_hotel_excel(hotel_id):
     """Exporte les données d'un hôtel vers Excel"""
     try:
         hotel = Hotel.query.get_or_404(hotel_id)
-        responses = SatisfactionResponse.query.filter_by(hotel_id=hotel_id).all()
+        has_responses = db.session.query(SatisfactionResponse.id).filter_by(hotel_id=hotel_id).first() is not None
         
-        if not responses:
+        if not has_responses:
             return jsonify({'error': 'Aucune donnée à exporter'}), 404
         
-        # Créer le DataFrame
-        data = []
-        for response in responses:
-            data.append({
-                'Date de soumission': response.submission_date.strftime('%Y-%m-%d %H:%M:%S') if response.submission_date else '',
-                'Nom du client': response.client_name or '',
-                'Email du client': response.client_email or '',
-                'Note globale': response.overall_rating or '',
-                'Hébergement': response.accommodation_rating or '',
-                'Service': response.service_rating or '',
-                'Propreté': response.cleanliness_rating or '',
-                'Restauration': response.food_rating or '',
-                'Emplacement': response.location_rating or '',
-                'Rapport qualité-prix': response.value_rating or '',
-                'Recommandation': 'Oui' if response.would_recommend else 'Non' if response.would_recommend is not None else '',
-                'Commentaires': response.comments or ''
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # Créer un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            # Créer un writer Excel avec plusieurs onglets
-            with pd.ExcelWriter(tmp_file.name, engine='openpyxl') as writer:
-                # Onglet des données brutes
-                df.to_excel(writer, sheet_name='Données', index=False)
-                
-                # Onglet des statistiques
-                analytics_service = AnalyticsService(db)
-                stats = analytics_service.get_hotel_statistics(hotel_id)
-                
-                if stats:
-                    stats_data = [
-                        ['Métrique', 'Valeur'],
-                        ['Nombre total de réponses', stats['total_responses']],
-                        ['Note moyenne globale', stats['average_overall_rating']],
-                        ['Taux de recommandation (%)', stats['recommendation_rate']],
-                        ['Réponses ce mois', stats['monthly_responses']],
-                        ['', ''],
-                        ['Moyennes par catégorie', ''],
-                        ['Hébergement', stats['category_averages'].get('accommodation_rating', 0)],
-                        ['Service', stats['category_averages'].get('service_rating', 0)],
-                        ['Propreté', stats['category_averages'].get('cleanliness_rating', 0)],
-                        ['Restauration', stats['category_averages'].get('food_rating', 0)],
-                        ['Emplacement', stats['category_averages'].get('location_rating', 0)],
-                        ['Rapport qualité-prix', stats['category_averages'].get('value_rating', 0)]
-                    ]
-                    
-                    stats_df = pd.DataFrame(stats_data[1:], columns=stats_data[0])
-                    stats_df.to_excel(writer, sheet_name='Statistiques', index=False)
-            
-            # Retourner le fichier
-            return send_file(
-                tmp_file.name,
-                as_attachment=True,
-                download_name=f'HotelSat_{hotel.name}_{datetime.now().strftime("%Y%m%d")}.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+        # Onglet des statistiques (agrégats maintenus, sans parcourir les réponses)
+        analytics_service = AnalyticsService(db)
+        stats = analytics_service.get_hotel_statistics(hotel_id)
+        
+        # Classeur produit en écriture seule et transmis par blocs au client
+        excel_export_service = ExcelExportService(db)
+        response = Response(
+            stream_with_context(excel_export_service.stream_hotel_workbook(hotel_id, stats)),
+            mimetype=ExcelExportService.MIMETYPE
+        )
+        response.headers.set(
+            'Content-Disposition', 'attachment',
+            filename=f'HotelSat_{hotel.name}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+        return response
         
     except Exception as e:
         logger.error(f"Erreur lors de l'export Excel pour l'hôtel {hotel_id}: {e}")
         return jsonify({'error': 'Erreur lors de l\'export'}), 500
 
 @reports_bp.route('/reports/hotel/<int:hotel_id>/charts', methods=['GET'])
+@analytics_cache.cached('charts')
 def generate_hotel_charts(hotel_id):
-    """Génère des graphiques pour un hôtel"""
+    """Génère des graphiques imprimables pour un hôtel"""
     try:
         hotel = Hotel.query.get_or_404(hotel_id)
         analytics_service = AnalyticsService(db)
@@ -99,112 +57,31 @@ def generate_hotel_charts(hotel_id):
         if not stats or stats['total_responses'] == 0:
             return jsonify({'error': 'Aucune donnée pour générer les graphiques'}), 404
         
-        # Configuration matplotlib
-        plt.style.use('default')
-        sns.set_palette("husl")
+        # Rendu serveur réservé aux rapports imprimables (le tableau de bord utilise /chart-data)
+        preset = request.args.get('preset', 'print')
+        if preset not in ChartService.PRESETS:
+            return jsonify({'error': f'Préréglage invalide: {preset}'}), 400
         
-        charts = {}
+        # Graphiques rendus une seule fois par jeu de données, en parallèle, servis par URL
+        chart_service = ChartService()
+        specs = {}
         
         # Graphique 1: Notes par catégorie
-        fig, ax = plt.subplots(figsize=(10, 6))
-        categories = list(stats['category_averages'].keys())
-        values = list(stats['category_averages'].values())
-        
-        category_labels = {
-            'accommodation_rating': 'Hébergement',
-            'service_rating': 'Service',
-            'cleanliness_rating': 'Propreté',
-            'food_rating': 'Restauration',
-            'location_rating': 'Emplacement',
-            'value_rating': 'Qualité-prix'
-        }
-        
-        labels = [category_labels.get(cat, cat) for cat in categories]
-        
-        bars = ax.bar(labels, values, color=sns.color_palette("husl", len(categories)))
-        ax.set_title(f'Notes par catégorie - {hotel.name}', fontsize=14, fontweight='bold')
-        ax.set_ylabel('Note moyenne (/5)')
-        ax.set_ylim(0, 5)
-        
-        # Ajouter les valeurs sur les barres
-        for bar, value in zip(bars, values):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.05,
-                   f'{value:.1f}', ha='center', va='bottom')
-        
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        
-        # Convertir en base64
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        chart_data = base64.b64encode(buffer.getvalue()).decode()
-        charts['categories'] = chart_data
-        plt.close()
+        specs['categories'] = chart_service.categories_spec(hotel.name, stats['category_averages'])
         
         # Graphique 2: Distribution des notes globales
-        responses = SatisfactionResponse.query.filter_by(hotel_id=hotel_id).all()
-        overall_ratings = [r.overall_rating for r in responses if r.overall_rating is not None]
-        
-        if overall_ratings:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            
-            # Compter les occurrences de chaque note
-            rating_counts = {}
-            for rating in range(1, 6):
-                rating_counts[rating] = sum(1 for r in overall_ratings if int(r) == rating)
-            
-            ratings = list(rating_counts.keys())
-            counts = list(rating_counts.values())
-            
-            bars = ax.bar(ratings, counts, color=sns.color_palette("viridis", len(ratings)))
-            ax.set_title(f'Distribution des notes globales - {hotel.name}', fontsize=14, fontweight='bold')
-            ax.set_xlabel('Note (/5)')
-            ax.set_ylabel('Nombre de réponses')
-            ax.set_xticks(ratings)
-            
-            # Ajouter les valeurs sur les barres
-            for bar, count in zip(bars, counts):
-                height = bar.get_height()
-                if height > 0:
-                    ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                           str(int(count)), ha='center', va='bottom')
-            
-            plt.tight_layout()
-            
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_data = base64.b64encode(buffer.getvalue()).decode()
-            charts['distribution'] = chart_data
-            plt.close()
+        rating_counts = analytics_service.get_rating_distribution(hotel_id)
+        
+        if rating_counts:
+            specs['distribution'] = chart_service.distribution_spec(hotel.name, rating_counts)
         
         # Graphique 3: Évolution temporelle
         temporal_analysis = analytics_service.get_temporal_analysis(hotel_id, 60)
         
         if temporal_analysis and temporal_analysis['data']:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            dates = [datetime.strptime(d['week'], '%Y-%m-%d') for d in temporal_analysis['data']]
-            ratings = [d['average_rating'] for d in temporal_analysis['data']]
-            
-            ax.plot(dates, ratings, marker='o', linewidth=2, markersize=6)
-            ax.set_title(f'Évolution des notes dans le temps - {hotel.name}', fontsize=14, fontweight='bold')
-            ax.set_xlabel('Semaine')
-            ax.set_ylabel('Note moyenne (/5)')
-            ax.set_ylim(0, 5)
-            ax.grid(True, alpha=0.3)
-            
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_data = base64.b64encode(buffer.getvalue()).decode()
-            charts['temporal'] = chart_data
-            plt.close()
+            specs['temporal'] = chart_service.temporal_spec(hotel.name, temporal_analysis['data'])
+        
+        charts = chart_service.chart_urls(specs, preset)
         
         return jsonify({
             'charts': charts,
@@ -216,6 +93,24 @@ def generate_hotel_charts(hotel_id):
         logger.error(f"Erreur lors de la génération des graphiques pour l'hôtel {hotel_id}: {e}")
         return jsonify({'error': 'Erreur lors de la génération des graphiques'}), 500
 
+@reports_bp.route('/charts/<chart_hash>.png', methods=['GET'])
+def get_chart_image(chart_hash):
+    """Sert un graphique du cache (contenu immuable pour un hash donné)"""
+    try:
+        # Fichier marqué comme servi (éviction LRU), rendu à nouveau s'il a été supprimé
+        path = ChartService().chart_file(chart_hash)
+    except Exception as e:
+        logger.error(f"Erreur lors du rendu du graphique {chart_hash}: {e}")
+        return jsonify({'error': 'Erreur lors du rendu du graphique'}), 500
+    
+    if path is None:
+        return jsonify({'error': 'Graphique introuvable'}), 404
+    
+    response = send_file(path, mimetype='image/png', max_age=ChartService.MAX_AGE, etag=chart_hash)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @reports_bp.route('/reports/comparison', methods=['POST'])
 def generate_comparison_report():
     """Génère un rapport de comparaison entre plusieurs hôtels"""
@@ -232,52 +127,17 @@ def generate_comparison_report():
         if not comparison_data:
             return jsonify({'error': 'Erreur lors de la génération du rapport'}), 500
         
-        # Générer un graphique de comparaison
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        hotels = list(comparison_data.keys())
-        categories = ['accommodation_rating', 'service_rating', 'cleanliness_rating', 
-                     'food_rating', 'location_rating', 'value_rating']
-        
-        category_labels = {
-            'accommodation_rating': 'Hébergement',
-            'service_rating': 'Service',
-            'cleanliness_rating': 'Propreté',
-            'food_rating': 'Restauration',
-            'location_rating': 'Emplacement',
-            'value_rating': 'Qualité-prix'
-        }
-        
-        x = range(len(categories))
-        width = 0.8 / len(hotels)
-        
-        colors = sns.color_palette("husl", len(hotels))
-        
-        for i, hotel in enumerate(hotels):
-            values = [comparison_data[hotel]['category_averages'].get(cat, 0) for cat in categories]
-            offset = (i - len(hotels)/2 + 0.5) * width
-            ax.bar([pos + offset for pos in x], values, width, label=hotel, color=colors[i])
-        
-        ax.set_title('Comparaison des notes par catégorie', fontsize=14, fontweight='bold')
-        ax.set_ylabel('Note moyenne (/5)')
-        ax.set_xlabel('Catégories')
-        ax.set_xticks(x)
-        ax.set_xticklabels([category_labels.get(cat, cat) for cat in categories], rotation=45, ha='right')
-        ax.legend()
-        ax.set_ylim(0, 5)
-        ax.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        chart_data = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
+        # Générer un graphique de comparaison (qualité impression par défaut)
+        preset = data.get('preset', 'print')
+        if preset not in ChartService.PRESETS:
+            return jsonify({'error': f'Préréglage invalide: {preset}'}), 400
+        
+        chart_service = ChartService()
+        chart_url = chart_service.chart_url(chart_service.comparison_spec(comparison_data), preset)
         
         return jsonify({
             'comparison_data': comparison_data,
-            'comparison_chart': chart_data
+            'comparison_chart': chart_url
         })
         
     except Exception as e:
@@ -288,73 +148,170 @@ def generate_comparison_report():
 def export_global_excel():
     """Exporte un rapport global de tous les hôtels"""
     try:
-        hotels = Hotel.query.all()
+        has_hotels = db.session.query(Hotel.id).first() is not None
         
-        if not hotels:
+        if not has_hotels:
             return jsonify({'error': 'Aucun hôtel trouvé'}), 404
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            with pd.ExcelWriter(tmp_file.name, engine='openpyxl') as writer:
-                
-                # Onglet de synthèse
-                analytics_service = AnalyticsService(db)
-                summary_data = []
-                
-                for hotel in hotels:
-                    stats = analytics_service.get_hotel_statistics(hotel.id)
-                    if stats:
-                        summary_data.append({
-                            'Hôtel': hotel.name,
-                            'Localisation': hotel.location or '',
-                            'Nombre de réponses': stats['total_responses'],
-                            'Note moyenne': stats['average_overall_rating'],
-                            'Taux de recommandation (%)': stats['recommendation_rate'],
-                            'Hébergement': stats['category_averages'].get('accommodation_rating', 0),
-                            'Service': stats['category_averages'].get('service_rating', 0),
-                            'Propreté': stats['category_averages'].get('cleanliness_rating', 0),
-                            'Restauration': stats['category_averages'].get('food_rating', 0),
-                            'Emplacement': stats['category_averages'].get('location_rating', 0),
-                            'Qualité-prix': stats['category_averages'].get('value_rating', 0)
-                        })
-                
-                if summary_data:
-                    summary_df = pd.DataFrame(summary_data)
-                    summary_df.to_excel(writer, sheet_name='Synthèse', index=False)
-                
-                # Onglet pour chaque hôtel avec ses données détaillées
-                for hotel in hotels:
-                    responses = SatisfactionResponse.query.filter_by(hotel_id=hotel.id).all()
-                    if responses:
-                        data = []
-                        for response in responses:
-                            data.append({
-                                'Date': response.submission_date.strftime('%Y-%m-%d') if response.submission_date else '',
-                                'Client': response.client_name or '',
-                                'Email': response.client_email or '',
-                                'Note globale': response.overall_rating or '',
-                                'Hébergement': response.accommodation_rating or '',
-                                'Service': response.service_rating or '',
-                                'Propreté': response.cleanliness_rating or '',
-                                'Restauration': response.food_rating or '',
-                                'Emplacement': response.location_rating or '',
-                                'Qualité-prix': response.value_rating or '',
-                                'Recommandation': 'Oui' if response.would_recommend else 'Non' if response.would_recommend is not None else '',
-                                'Commentaires': response.comments or ''
-                            })
-                        
-                        df = pd.DataFrame(data)
-                        # Limiter le nom de l'onglet à 31 caractères (limite Excel)
-                        sheet_name = hotel.name[:31] if len(hotel.name) > 31 else hotel.name
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            return send_file(
-                tmp_file.name,
-                as_attachment=True,
-                download_name=f'HotelSat_Rapport_Global_{datetime.now().strftime("%Y%m%d")}.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+        # Synthèse et onglets par hôtel produits en un seul parcours des réponses
+        excel_export_service = ExcelExportService(db)
+        response = Response(
+            stream_with_context(excel_export_service.stream_global_workbook()),
+            mimetype=ExcelExportService.MIMETYPE
+        )
+        response.headers.set(
+            'Content-Disposition', 'attachment',
+            filename=f'HotelSat_Rapport_Global_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+        return response
         
     except Exception as e:
         logger.error(f"Erreur lors de l'export global Excel: {e}")
         return jsonify({'error': 'Erreur lors de l\'export'}), 500
 
+@reports_bp.route('/reports/jobs', methods=['POST'])
+def create_report_job():
+    """Met en file la génération d'un rapport (global_excel, hotel_excel, comparison)"""
+    try:
+        data = request.get_json() or {}
+        job_type = data.get('type')
+        
+        if job_type == 'hotel_excel':
+            hotel_id = data.get('hotel_id')
+            if not isinstance(hotel_id, int) or db.session.get(Hotel, hotel_id) is None:
+                return jsonify({'error': 'Hôtel non trouvé'}), 404
+            params = {'hotel_id': hotel_id}
+        elif job_type == 'comparison':
+            hotel_ids = data.get('hotel_ids', [])
+            if not hotel_ids or len(hotel_ids) < 2:
+                return jsonify({'error': 'Au moins 2 hôtels requis pour la comparaison'}), 400
+            preset = data.get('preset', 'print')
+            if preset not in ChartService.PRESETS:
+                return jsonify({'error': f'Préréglage invalide: {preset}'}), 400
+            params = {'hotel_ids': sorted(set(hotel_ids)), 'preset': preset}
+        elif job_type == 'global_excel':
+            params = {}
+        else:
+            return jsonify({'error': f'Type de rapport invalide: {job_type}'}), 400
+        
+        try:
+            job, created = ReportJobService(db).enqueue(job_type, params)
+        except ReportQueueFull:
+            response = jsonify({'error': 'Trop de rapports en cours, réessayez plus tard'})
+            response.headers['Retry-After'] = '30'
+            return response, 429
+        
+        response = jsonify(_job_payload(job))
+        response.headers['Location'] = f'/api/reports/jobs/{job.id}'
+        return response, 202 if created else 200
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise en file du rapport: {e}")
+        return jsonify({'error': 'Erreur lors de la création du rapport'}), 500
+
+@reports_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """Retourne l'état et l'avancement d'un rapport"""
+    try:
+        job = ReportJobService(db).get_job(job_id)
+        
+        if job is None:
+            return jsonify({'error': 'Rapport non trouvé'}), 404
+        
+        return jsonify(_job_payload(job))
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération du rapport {job_id}: {e}")
+        return jsonify({'error': 'Erreur lors de la récupération du rapport'}), 500
+
+@reports_bp.route('/reports/jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    """Télécharge le fichier produit par un rapport terminé"""
+    job = ReportJobService(db).get_job(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Rapport non trouvé'}), 404
+    if job.status != 'completed':
+        return jsonify({'error': 'Rapport non disponible', 'status': job.status}), 409
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        return jsonify({'error': 'Rapport expiré'}), 410
+    
+    return send_file(
+        job.artifact_path,
+        mimetype=job.artifact_mimetype,
+        as_attachment=True,
+        download_name=job.artifact_name
+    )
+
+def _job_payload(job):
+    """État d'un rapport avec son avancement et ses URL de suivi"""
+    payload = job.to_dict()
+    payload['progress'] = ReportJobService(db).progress(job.id)
+    payload['status_url'] = f'/api/reports/jobs/{job.id}'
+    payload['download_url'] = f'/api/reports/jobs/{job.id}/download' if job.status == 'completed' else None
+    return payload
+
+@reports_bp.route('/reports/hotel/<int:hotel_id>/export.<any(csv, ndjson, parquet, arrow):export_format>', methods=['GET'])
+def export_hotel_stream(hotel_id, export_format):
+    """Exporte les réponses d'un hôtel en CSV, NDJSON, Parquet ou Arrow (flux, filtres since/until/after_id)"""
+    try:
+        hotel = Hotel.query.get_or_404(hotel_id)
+        
+        try:
+            filters = _parse_export_filters()
+        except ValueError:
+            return jsonify({'error': 'Paramètres invalides (since/until au format ISO, after_id entier)'}), 400
+        
+        return _stream_export_response(export_format, f'HotelSat_{hotel.name}', hotel_id=hotel_id, **filters)
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de l'export {export_format} pour l'hôtel {hotel_id}: {e}")
+        return jsonify({'error': 'Erreur lors de l\'export'}), 500
+
+@reports_bp.route('/reports/export.<any(csv, ndjson, parquet, arrow):export_format>', methods=['GET'])
+def export_portfolio_stream(export_format):
+    """Exporte les réponses de tous les hôtels en CSV, NDJSON, Parquet ou Arrow (flux, filtres since/until/after_id)"""
+    try:
+        try:
+            filters = _parse_export_filters()
+        except ValueError:
+            return jsonify({'error': 'Paramètres invalides (since/until au format ISO, after_id entier)'}), 400
+        
+        return _stream_export_response(export_format, 'HotelSat_Portefeuille', **filters)
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de l'export {export_format} du portefeuille: {e}")
+        return jsonify({'error': 'Erreur lors de l\'export'}), 500
+
+def _stream_export_response(export_format, name, **filters):
+    """Réponse HTTP transmettant l'export au fil du curseur"""
+    if export_format in ColumnarExportService.FORMATS:
+        if not ColumnarExportService.is_available():
+            return jsonify({'error': 'Export colonnaire indisponible (pyarrow non installé)'}), 501
+        export_service = ColumnarExportService(db)
+        content_type = ColumnarExportService.MIMETYPES[export_format]
+    else:
+        export_service = StreamExportService(db)
+        content_type = StreamExportService.MIMETYPES[export_format]
+    
+    response = Response(
+        stream_with_context(export_service.stream(export_format, **filters)),
+        content_type=content_type
+    )
+    response.headers.set(
+        'Content-Disposition', 'attachment',
+        filename=f'{name}_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+    )
+    return response
+
+def _parse_export_filters():
+    """Lit les filtres d'export: since/until (dates ISO, until exclue) et after_id (curseur incrémental)"""
+    since = request.args.get('since')
+    until = request.args.get('until')
+    after_id = request.args.get('after_id')
+    
+    return {
+        'since': datetime.fromisoformat(since) if since else None,
+        'until': datetime.fromisoformat(until) if until else None,
+        'after_id': int(after_id) if after_id else None
+    }
@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from src.models.hotel import db, Hotel, SatisfactionResponse
 from src.services.tally_service import TallyService
 from src.services.google_sheets_service import GoogleSheetsService
+from src.services.response_cache import response_cache
+from src.services.webhook_ingest_service import WebhookIngestService, ingest_worker, recent_submissions
+from src.services.sheets_outbox_service import SheetsOutboxService, sheets_flusher
 import logging
+import json
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +16,27 @@ webhooks_bp = Blueprint('webhooks', __name__)
 tally_service = TallyService()
 google_sheets_service = GoogleSheetsService()
 
+def _ingest_service():
+    return WebhookIngestService(db, tally_service, google_sheets_service)
+
+def start_ingest_worker(app):
+    """Démarre les workers de la file d'ingestion du processus"""
+    ingest_worker.start(app, db, tally_service, google_sheets_service)
+
+def start_sheets_flusher(app):
+    """Démarre l'envoi périodique de l'outbox Google Sheets du processus"""
+    sheets_flusher.start(app, db, google_sheets_service)
+
+def _save_response(hotel, processed_data):
+    """Enregistre une réponse et met à jour les agrégats dans la même transaction"""
+    response = _ingest_service().add_response(hotel, processed_data)
+    db.session.commit()
+    
+    if response is not None:
+        response_cache.append(response)
+        recent_submissions.add(response.tally_submission_id)
+    return response
+
 @webhooks_bp.route('/webhooks/tally', methods=['POST'])
 def handle_tally_webhook():
     """Traite les webhooks reçus de Tally"""
@@ -20,6 +46,8 @@ def handle_tally_webhook():
         
         if not webhook_data:
             return jsonify({'error': 'Aucune donnée reçue'}), 400
+        if not isinstance(webhook_data, dict):
+            return jsonify({'error': 'Format de webhook invalide'}), 400
         
         # Valider la signature si configurée
         signature = request.headers.get('X-Tally-Signature')
@@ -31,6 +59,19 @@ def handle_tally_webhook():
                 logger.warning("Signature de webhook invalide")
                 return jsonify({'error': 'Signature invalide'}), 401
         
+        # Renvoi d'une soumission récemment enregistrée: réponse sans accès à la base
+        if recent_submissions.seen(webhook_data.get('submissionId')):
+            return jsonify({'message': 'Soumission déjà traitée'}), 200
+        
+        # Mode file: enregistrement durable du corps brut, traitement par les workers
+        if WebhookIngestService.mode() == 'queue':
+            hotel_id = request.args.get('hotel_id', type=int)
+            queue_id = _ingest_service().enqueue(request.get_data(as_text=True), hotel_id)
+            start_ingest_worker(current_app._get_current_object())
+            start_sheets_flusher(current_app._get_current_object())
+            ingest_worker.notify()
+            return jsonify({'message': 'Soumission mise en file', 'queue_id': queue_id}), 202
+        
         # Traiter les données
         processed_data = tally_service.process_webhook_data(webhook_data)
         
@@ -38,51 +79,27 @@ def handle_tally_webhook():
             return jsonify({'error': 'Erreur lors du traitement des données'}), 400
         
         # Identifier l'hôtel (plusieurs stratégies possibles)
-        hotel = None
+        hotel = _ingest_service().resolve_hotel(webhook_data, request.args.get('hotel_id'))
         
-        # Stratégie 1: Utiliser un paramètre dans l'URL du webhook
-        hotel_id = request.args.get('hotel_id')
-        if hotel_id:
-            hotel = Hotel.query.get(hotel_id)
-        
-        # Stratégie 2: Chercher par URL de formulaire Tally
-        if not hotel:
-            form_id = webhook_data.get('formId')
-            if form_id:
-                hotel = Hotel.query.filter(Hotel.tally_form_url.contains(form_id)).first()
-        
-        # Stratégie 3: Utiliser le premier hôtel (pour les tests)
         if not hotel:
-            hotel = Hotel.query.first()
-        
-        if not hotel:
-            logger.error("Aucun hôtel trouvé pour ce webhook")
-            return jsonify({'error': 'Hôtel non identifié'}), 400
+            # Formulaire inconnu: webhook mis de côté plutôt qu'attribué à un autre hôtel
+            queue_id = _ingest_service().park(
+                request.get_data(as_text=True), request.args.get('hotel_id', type=int), 'Hôtel non identifié'
+            )
+            logger.warning(f"Aucun hôtel trouvé pour le formulaire {webhook_data.get('formId')}: webhook mis de côté ({queue_id})")
+            return jsonify({'message': 'Hôtel non identifié, soumission mise de côté', 'queue_id': queue_id}), 202
         
-        # Vérifier si cette soumission existe déjà
-        existing_response = SatisfactionResponse.query.filter_by(
-            tally_submission_id=processed_data['tally_submission_id']
-        ).first()
+        # Créer la nouvelle réponse (insertion idempotente sur tally_submission_id)
+        response = _save_response(hotel, processed_data)
         
-        if existing_response:
+        if response is None:
+            recent_submissions.add(processed_data['tally_submission_id'])
             logger.info(f"Soumission déjà traitée: {processed_data['tally_submission_id']}")
             return jsonify({'message': 'Soumission déjà traitée'}), 200
         
-        # Créer la nouvelle réponse
-        response = SatisfactionResponse(
-            hotel_id=hotel.id,
-            **processed_data
-        )
-        
-        db.session.add(response)
-        db.session.commit()
-        
-        # Ajouter à Google Sheets si configuré
+        # Ligne Google Sheets mise en outbox avec la réponse, envoyée par le flusher
         if hotel.google_sheet_id:
-            google_sheets_service.add_response_to_sheet(
-                hotel.google_sheet_id,
-                processed_data
-            )
+            start_sheets_flusher(current_app._get_current_object())
         
         logger.info(f"Nouvelle réponse ajoutée pour l'hôtel {hotel.name}: {response.id}")
         
@@ -97,6 +114,78 @@ def handle_tally_webhook():
         logger.error(f"Erreur lors du traitement du webhook Tally: {e}")
         return jsonify({'error': 'Erreur serveur'}), 500
 
+# Nombre maximal de webhooks par import en masse
+BATCH_MAX_ITEMS = int(os.getenv('WEBHOOK_BATCH_MAX_ITEMS', 100000))
+
+@webhooks_bp.route('/webhooks/tally/batch', methods=['POST'])
+def handle_tally_webhook_batch():
+    """Importe en masse des soumissions Tally historiques (tableau JSON ou NDJSON)"""
+    try:
+        payload = request.get_data(as_text=True)
+        
+        # Valider la signature si configurée
+        signature = request.headers.get('X-Tally-Signature')
+        webhook_secret = os.getenv('TALLY_WEBHOOK_SECRET')
+        
+        if webhook_secret and signature:
+            if not tally_service.validate_webhook_signature(payload, signature, webhook_secret):
+                logger.warning("Signature de webhook invalide")
+                return jsonify({'error': 'Signature invalide'}), 401
+        
+        try:
+            webhooks = _parse_batch(payload)
+        except ValueError:
+            return jsonify({'error': 'Un tableau JSON ou un flux NDJSON de webhooks est attendu'}), 400
+        
+        if not webhooks:
+            return jsonify({'error': 'Aucune donnée reçue'}), 400
+        if len(webhooks) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'Au plus {BATCH_MAX_ITEMS} webhooks par import'}), 413
+        
+        started = time.perf_counter()
+        results = _ingest_service().ingest_bulk(webhooks, request.args.get('hotel_id', type=int))
+        duration = time.perf_counter() - started
+        
+        statuses = [result['status'] for result in results]
+        if 'created' in statuses:
+            start_sheets_flusher(current_app._get_current_object())
+        
+        logger.info(f"Import en masse: {statuses.count('created')} réponse(s) créée(s) sur {len(results)} en {duration:.2f}s")
+        
+        return jsonify({
+            'total': len(results),
+            'created': statuses.count('created'),
+            'duplicates': statuses.count('duplicate'),
+            'errors': statuses.count('error'),
+            'duration_ms': round(duration * 1000, 2),
+            'rows_per_second': round(len(results) / duration, 1) if duration > 0 else None,
+            'results': results
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erreur lors de l'import en masse des webhooks Tally: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+def _parse_batch(payload):
+    """Webhooks d'un import en masse: tableau JSON, ou un objet JSON par ligne (NDJSON)"""
+    if payload.lstrip().startswith('['):
+        webhooks = json.loads(payload)
+        if not isinstance(webhooks, list):
+            raise ValueError('Tableau JSON attendu')
+        return webhooks
+    
+    webhooks = []
+    for line in payload.splitlines():
+        if not line.strip():
+            continue
+        try:
+            webhooks.append(json.loads(line))
+        except ValueError:
+            # Ligne illisible: signalée dans le résultat de l'élément
+            webhooks.append(None)
+    return webhooks
+
 @webhooks_bp.route('/webhooks/test', methods=['POST'])
 def test_webhook():
     """Endpoint de test pour simuler un webhook Tally"""
@@ -117,20 +206,15 @@ def test_webhook():
         processed_data = tally_service.process_webhook_data(test_data)
         
         # Créer la réponse de test
-        response = SatisfactionResponse(
-            hotel_id=hotel.id,
-            **processed_data
-        )
+        response = _save_response(hotel, processed_data)
         
-        db.session.add(response)
-        db.session.commit()
+        if response is None:
+            logger.info(f"Soumission de test déjà traitée: {processed_data['tally_submission_id']}")
+            return jsonify({'message': 'Soumission déjà traitée'}), 200
         
-        # Ajouter à Google Sheets si configuré
+        # Ligne Google Sheets mise en outbox avec la réponse, envoyée par le flusher
         if hotel.google_sheet_id:
-            google_sheets_service.add_response_to_sheet(
-                hotel.google_sheet_id,
-                processed_data
-            )
+            start_sheets_flusher(current_app._get_current_object())
         
         logger.info(f"Réponse de test créée pour l'hôtel {hotel.name}: {response.id}")
         
@@ -145,6 +229,26 @@ def test_webhook():
         logger.error(f"Erreur lors de la création de la réponse de test: {e}")
         return jsonify({'error': 'Erreur serveur'}), 500
 
+@webhooks_bp.route('/webhooks/queue', methods=['GET'])
+def webhook_queue_status():
+    """Retourne la profondeur, le retard et le débit de la file d'ingestion"""
+    try:
+        return jsonify(_ingest_service().stats())
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération de l'état de la file: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
+@webhooks_bp.route('/webhooks/sheets-outbox', methods=['GET'])
+def sheets_outbox_status():
+    """Retourne l'arriéré de l'outbox Google Sheets et les compteurs d'appels à l'API"""
+    try:
+        return jsonify(SheetsOutboxService(db, google_sheets_service).stats())
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération de l'état de l'outbox: {e}")
+        return jsonify({'error': 'Erreur serveur'}), 500
+
 @webhooks_bp.route('/webhooks/status', methods=['GET'])
 def webhook_status():
     """Vérifie le statut des webhooks"""
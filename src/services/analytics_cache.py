@@ -0,0 +1,154 @@
+import os
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy.dialects.sqlite import insert
+from src.models.hotel import db
+from src.models.statistics import HotelDataVersion
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsResponseCache:
+    """
+    Cache LRU des réponses JSON des endpoints analytiques, borné en octets
+
+    La clé combine l'hôtel, l'endpoint, les paramètres de la requête, la version des données
+    de l'hôtel (incrémentée par les webhooks) et le jour courant (périodes relatives à aujourd'hui).
+    Chaque réponse porte un ETag fort permettant au client de revalider avec If-None-Match.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, endpoint):
+        """Décorateur de route mettant en cache les réponses 200 d'un endpoint par hôtel"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                hotel_id = kwargs['hotel_id']
+                key = (
+                    hotel_id,
+                    endpoint,
+                    tuple(sorted(request.args.items(multi=True))),
+                    self.data_version(db, hotel_id),
+                    date.today().isoformat()
+                )
+
+                entry = self._get(key)
+                server_timing = None
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    # Durées propres à ce calcul: transmises au client mais jamais mises en cache
+                    server_timing = response.headers.get('Server-Timing')
+                    entry = self._store(key, response.get_data(), response.mimetype)
+
+                body, etag, mimetype, hit = entry
+                if request.if_none_match.contains(etag):
+                    with self._lock:
+                        self.not_modified += 1
+                    response = make_response('', 304)
+                else:
+                    response = make_response(body)
+                    response.mimetype = mimetype
+
+                response.set_etag(etag)
+                # Le client doit revalider à chaque affichage (réponse 304 si inchangée)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+                if server_timing:
+                    response.headers['Server-Timing'] = server_timing
+                return response
+            return wrapper
+        return decorator
+
+    def data_version(self, db, hotel_id):
+        """Version courante des données d'un hôtel (0 si jamais modifiées)"""
+        version = db.session.query(HotelDataVersion.version).filter(
+            HotelDataVersion.hotel_id == hotel_id
+        ).scalar()
+        return version or 0
+
+    def bump_version(self, db, hotel_id):
+        """Incrémente la version des données d'un hôtel, dans la transaction en cours"""
+        table = HotelDataVersion.__table__
+        statement = insert(table).values(hotel_id=hotel_id, version=1, updated_at=datetime.utcnow())
+        statement = statement.on_conflict_do_update(
+            index_elements=['hotel_id'],
+            set_={'version': table.c.version + 1, 'updated_at': statement.excluded.updated_at}
+        )
+        db.session.execute(statement)
+
+    def invalidate(self, hotel_id=None):
+        """Supprime les réponses d'un hôtel (ou de tous les hôtels) du cache"""
+        with self._lock:
+            keys = [key for key in self._entries if hotel_id is None or key[0] == hotel_id]
+            for key in keys:
+                self.total_bytes -= len(self._entries.pop(key)[0])
+
+    def stats(self):
+        """Compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0
+            }
+
+    def _get(self, key):
+        """Retourne (corps, etag, type, True) si la réponse est en cache"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry + (True,)
+
+    def _store(self, key, body, mimetype):
+        """Enregistre une réponse et évince les entrées les moins récemment utilisées"""
+        etag = hashlib.sha256(body).hexdigest()[:32]
+
+        with self._lock:
+            if len(body) <= self.max_bytes:
+                if key in self._entries:
+                    self.total_bytes -= len(self._entries.pop(key)[0])
+
+                # Les versions précédentes des données de cet hôtel ne seront plus demandées
+                stale = [other for other in self._entries if other[:3] == key[:3]]
+                for other in stale:
+                    self.total_bytes -= len(self._entries.pop(other)[0])
+
+                self._entries[key] = (body, etag, mimetype)
+                self.total_bytes += len(body)
+
+                while self.total_bytes > self.max_bytes:
+                    _, (evicted, _, _) = self._entries.popitem(last=False)
+                    self.total_bytes -= len(evicted)
+                    self.evictions += 1
+            else:
+                logger.info(f"Réponse {key[1]} de l'hôtel {key[0]} trop volumineuse pour le cache ({len(body)} octets)")
+
+        return body, etag, mimetype, False
+
+# Cache partagé par les requêtes du processus
+analytics_cache = AnalyticsResponseCache(int(os.getenv('ANALYTICS_CACHE_MAX_BYTES', 32 * 1024 * 1024)))
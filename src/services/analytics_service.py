@@ -1,89 +1,246 @@
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 import logging
-from sqlalchemy import func
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+from types import SimpleNamespace
+from sqlalchemy import func, case
 from src.models.hotel import SatisfactionResponse, Hotel
+from src.models.statistics import HotelStatsRollup, HotelDailyRollup, HotelResponseCount
+from src.models.response_details import ResponseRating, ResponseProfile
+from src.services.field_mapping import field_mapping
+from src.services.response_cache import response_cache
+from src.services.correlation_engine import CorrelationEngine
+from src.services.keyword_service import KeywordService
 
 logger = logging.getLogger(__name__)
 
+@contextmanager
+def _timed(timings, stage):
+    """Mesure la durée d'une étape (en ms)"""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((perf_counter() - start) * 1000, 2)
+
+class HotelSnapshot:
+    """Données d'un hôtel chargées une seule fois et partagées par les analyses"""
+    
+    def __init__(self, hotel_id, columns, top_keywords, total_comments):
+        self.hotel_id = hotel_id
+        self.columns = columns
+        self.top_keywords = top_keywords
+        self.total_comments = total_comments
+
 class AnalyticsService:
+    # Granularités disponibles pour l'analyse temporelle
+    TEMPORAL_GRANULARITIES = ['day', 'week', 'month', 'quarter']
+    
+    # Catégories de notation principales
+    CATEGORIES = [
+        'accommodation_rating',
+        'service_rating',
+        'cleanliness_rating',
+        'food_rating',
+        'location_rating',
+        'value_rating'
+    ]
+    
+    # Métriques disponibles pour le classement du portefeuille
+    RANKING_METRICS = [
+        'average_overall_rating',
+        'recommendation_rate',
+        'total_responses',
+        'monthly_responses'
+    ] + CATEGORIES
+    
+    # Sections du questionnaire Top of Travel et notes détaillées, dans l'ordre du schéma
+    SECTIONS = list(field_mapping.sections)
+    DETAIL_RATING_FIELDS = list(field_mapping.rating_codes)
+    
+    # Appartenance des notes détaillées aux sections (matrice champs x sections)
+    SECTION_MEMBERSHIP = (
+        np.array([field_mapping.schema[field]['section'] for field in DETAIL_RATING_FIELDS])[:, None]
+        == np.array(SECTIONS)[None, :]
+    ).astype(np.float64)
+    
     def __init__(self, db):
         self.db = db
     
     def get_hotel_statistics(self, hotel_id):
         """Calcule les statistiques de satisfaction pour un hôtel"""
         try:
-            responses = SatisfactionResponse.query.filter_by(hotel_id=hotel_id).all()
-            
-            if not responses:
-                return {
-                    'total_responses': 0,
-                    'average_overall_rating': 0,
-                    'recommendation_rate': 0,
-                    'category_averages': {},
-                    'monthly_responses': 0
-                }
-            
-            # Convertir en DataFrame pour faciliter les calculs
-            data = [response.to_dict() for response in responses]
-            df = pd.DataFrame(data)
-            
-            # Statistiques de base
-            total_responses = len(responses)
-            
-            # Note moyenne globale
-            overall_ratings = [r.overall_rating for r in responses if r.overall_rating is not None]
-            average_overall_rating = np.mean(overall_ratings) if overall_ratings else 0
-            
-            # Taux de recommandation
-            recommendations = [r.would_recommend for r in responses if r.would_recommend is not None]
-            recommendation_rate = (sum(recommendations) / len(recommendations) * 100) if recommendations else 0
-            
-            # Moyennes par catégorie
-            categories = [
-                'accommodation_rating',
-                'service_rating',
-                'cleanliness_rating',
-                'food_rating',
-                'location_rating',
-                'value_rating'
-            ]
-            
-            category_averages = {}
-            for category in categories:
-                values = [getattr(r, category) for r in responses if getattr(r, category) is not None]
-                category_averages[category] = np.mean(values) if values else 0
+            # Lecture directe des agrégats maintenus à l'ingestion
+            rollup = self._current_rollups([hotel_id]).get(hotel_id)
+            if rollup is not None:
+                return self._build_statistics(rollup, self._count_monthly_responses(hotel_id))
             
-            # Réponses du mois en cours
-            current_month = datetime.now().replace(day=1)
-            monthly_responses = SatisfactionResponse.query.filter(
-                SatisfactionResponse.hotel_id == hotel_id,
-                SatisfactionResponse.submission_date >= current_month
-            ).count()
-            
-            return {
-                'total_responses': total_responses,
-                'average_overall_rating': round(average_overall_rating, 1),
-                'recommendation_rate': round(recommendation_rate, 1),
-                'category_averages': {k: round(v, 1) for k, v in category_averages.items()},
-                'monthly_responses': monthly_responses
-            }
+            # Pas d'agrégat à jour: calcul en une seule passe SQL
+            row = self.aggregate_statistics_query([hotel_id]).first()
+            if row is None:
+                return self._build_statistics(None, 0)
+            return self._build_statistics(row, row.monthly_responses)
             
         except Exception as e:
             logger.error(f"Erreur lors du calcul des statistiques pour l'hôtel {hotel_id}: {e}")
             return None
     
+    def _current_rollups(self, hotel_ids):
+        """
+        Agrégats maintenus encore à jour des hôtels demandés {hotel_id: agrégat}
+        
+        Le nombre de réponses tenu par les triggers de satisfaction_responses doit égaler celui de
+        l'agrégat, sans modification de réponse: une écriture hors ingestion (import, insertion ou
+        suppression directe) écarte l'agrégat jusqu'au prochain `flask stats rebuild`.
+        """
+        rows = self.db.session.query(HotelStatsRollup, HotelResponseCount).outerjoin(
+            HotelResponseCount, HotelResponseCount.hotel_id == HotelStatsRollup.hotel_id
+        ).filter(HotelStatsRollup.hotel_id.in_(hotel_ids)).all()
+        
+        rollups = {}
+        for rollup, counts in rows:
+            if counts is not None and counts.responses == rollup.total_responses and not counts.updates:
+                rollups[rollup.hotel_id] = rollup
+            else:
+                logger.warning(f"Agrégats de l'hôtel {rollup.hotel_id} périmés (écriture hors ingestion): calcul SQL")
+        return rollups
+    
+    def aggregate_statistics_query(self, hotel_ids=None, group_by_day=False, start_date=None, end_date=None):
+        """Construit la requête d'agrégation (une seule passe SQL, groupée par hôtel et éventuellement par jour)"""
+        day = func.date(SatisfactionResponse.submission_date).label('day')
+        columns = [
+            SatisfactionResponse.hotel_id,
+            func.count(SatisfactionResponse.id).label('total_responses'),
+            func.sum(case((SatisfactionResponse.would_recommend.is_(True), 1), else_=0)).label('recommend_yes'),
+            func.count(SatisfactionResponse.would_recommend).label('recommend_count'),
+            func.sum(case((SatisfactionResponse.submission_date >= self._current_month(), 1), else_=0)).label('monthly_responses')
+        ]
+        for field in HotelStatsRollup.RATING_FIELDS:
+            column = getattr(SatisfactionResponse, field)
+            columns.append(func.sum(column).label(f'{field}_sum'))
+            columns.append(func.count(column).label(f'{field}_count'))
+        
+        if group_by_day:
+            columns.append(day)
+        
+        query = self.db.session.query(*columns)
+        if hotel_ids is not None:
+            query = query.filter(SatisfactionResponse.hotel_id.in_(hotel_ids))
+        if start_date is not None:
+            query = query.filter(SatisfactionResponse.submission_date >= start_date)
+        if end_date is not None:
+            query = query.filter(SatisfactionResponse.submission_date < end_date)
+        
+        if group_by_day:
+            return query.group_by(SatisfactionResponse.hotel_id, day)
+        return query.group_by(SatisfactionResponse.hotel_id)
+    
+    def _current_month(self):
+        """Début de la période des réponses du mois en cours"""
+        return datetime.now().replace(day=1)
+    
+    def _count_monthly_responses(self, hotel_id):
+        """Compte les réponses du mois en cours (parcours d'index)"""
+        return SatisfactionResponse.query.filter(
+            SatisfactionResponse.hotel_id == hotel_id,
+            SatisfactionResponse.submission_date >= self._current_month()
+        ).count()
+    
+    def _build_statistics(self, row, monthly_responses):
+        """Construit le dictionnaire de statistiques à partir des sommes et compteurs agrégés"""
+        if row is None or not row.total_responses:
+            return {
+                'total_responses': 0,
+                'average_overall_rating': 0,
+                'recommendation_rate': 0,
+                'category_averages': {},
+                'monthly_responses': 0
+            }
+        
+        # Note moyenne globale
+        average_overall_rating = row.overall_rating_sum / row.overall_rating_count if row.overall_rating_count else 0
+        
+        # Taux de recommandation
+        recommendation_rate = (row.recommend_yes / row.recommend_count * 100) if row.recommend_count else 0
+        
+        # Moyennes par catégorie
+        category_averages = {}
+        for category in self.CATEGORIES:
+            count = getattr(row, f'{category}_count')
+            category_averages[category] = getattr(row, f'{category}_sum') / count if count else 0
+        
+        return {
+            'total_responses': row.total_responses,
+            'average_overall_rating': round(average_overall_rating, 1),
+            'recommendation_rate': round(recommendation_rate, 1),
+            'category_averages': {k: round(v, 1) for k, v in category_averages.items()},
+            'monthly_responses': monthly_responses or 0
+        }
+    
+    def get_statistics_for_hotels(self, hotel_ids=None):
+        """
+        Calcule les statistiques d'un ensemble d'hôtels en un nombre constant de requêtes
+        
+        Args:
+            hotel_ids: Identifiants des hôtels (tous les hôtels si None; non numériques ignorés)
+            
+        Returns:
+            Liste de tuples (hôtel, statistiques) dans l'ordre de hotel_ids
+        """
+        query = Hotel.query
+        if hotel_ids is not None:
+            hotel_ids = [hotel_id for hotel_id in map(self._as_hotel_id, hotel_ids) if hotel_id is not None]
+            query = query.filter(Hotel.id.in_(hotel_ids))
+        rows = query.order_by(Hotel.id).all()
+        
+        rollups = self._current_rollups([hotel.id for hotel in rows])
+        hotels = {hotel.id: (hotel, rollups.get(hotel.id)) for hotel in rows}
+        if hotel_ids is None:
+            hotel_ids = list(hotels)
+        
+        # Réponses du mois en cours, toutes les lignes en une requête groupée
+        monthly_counts = dict(
+            self.db.session.query(SatisfactionResponse.hotel_id, func.count(SatisfactionResponse.id))
+            .filter(
+                SatisfactionResponse.hotel_id.in_(list(hotels)),
+                SatisfactionResponse.submission_date >= self._current_month()
+            )
+            .group_by(SatisfactionResponse.hotel_id).all()
+        )
+        
+        # Hôtels sans agrégat à jour: une seule passe SQL groupée
+        untracked_ids = [hotel_id for hotel_id, (_, rollup) in hotels.items() if rollup is None]
+        aggregates = {}
+        if untracked_ids:
+            aggregates = {row.hotel_id: row for row in self.aggregate_statistics_query(untracked_ids).all()}
+        
+        results = []
+        for hotel_id in hotel_ids:
+            if hotel_id not in hotels:
+                continue
+            hotel, rollup = hotels[hotel_id]
+            totals = rollup if rollup is not None else aggregates.get(hotel_id)
+            results.append((hotel, self._build_statistics(totals, monthly_counts.get(hotel_id, 0))))
+        
+        return results
+    
+    @staticmethod
+    def _as_hotel_id(value):
+        """Identifiant d'hôtel entier (None si la valeur n'est pas un nombre)"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    
     def get_comparative_analysis(self, hotel_ids):
         """Effectue une analyse comparative entre plusieurs hôtels"""
         try:
             comparative_data = {}
             
-            for hotel_id in hotel_ids:
-                hotel = Hotel.query.get(hotel_id)
-                if hotel:
-                    stats = self.get_hotel_statistics(hotel_id)
-                    comparative_data[hotel.name] = stats
+            for hotel, stats in self.get_statistics_for_hotels(hotel_ids):
+                comparative_data[hotel.name] = stats
             
             return comparative_data
             
@@ -91,205 +248,584 @@ class AnalyticsService:
             logger.error(f"Erreur lors de l'analyse comparative: {e}")
             return None
     
-    def get_temporal_analysis(self, hotel_id, period_days=30):
-        """Analyse l'évolution temporelle des données de satisfaction"""
+    def get_portfolio_ranking(self, metric='average_overall_rating'):
+        """Classe l'ensemble des hôtels selon une métrique de satisfaction"""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=period_days)
+            if metric not in self.RANKING_METRICS:
+                raise ValueError(f"Métrique inconnue: {metric}")
             
-            responses = SatisfactionResponse.query.filter(
-                SatisfactionResponse.hotel_id == hotel_id,
-                SatisfactionResponse.submission_date >= start_date
-            ).order_by(SatisfactionResponse.submission_date).all()
-            
-            if not responses:
-                return {'data': [], 'trend': 'stable'}
-            
-            # Grouper par semaine
-            weekly_data = {}
-            for response in responses:
-                week_start = response.submission_date - timedelta(days=response.submission_date.weekday())
-                week_key = week_start.strftime('%Y-%m-%d')
-                
-                if week_key not in weekly_data:
-                    weekly_data[week_key] = []
-                
-                if response.overall_rating:
-                    weekly_data[week_key].append(response.overall_rating)
-            
-            # Calculer les moyennes hebdomadaires
-            temporal_data = []
-            for week, ratings in weekly_data.items():
-                temporal_data.append({
-                    'week': week,
-                    'average_rating': round(np.mean(ratings), 1),
-                    'response_count': len(ratings)
+            ranking = []
+            for hotel, stats in self.get_statistics_for_hotels():
+                if metric in self.CATEGORIES:
+                    value = stats['category_averages'].get(metric, 0)
+                else:
+                    value = stats[metric]
+                ranking.append({
+                    'hotel_id': hotel.id,
+                    'hotel_name': hotel.name,
+                    'value': value,
+                    'statistics': stats
                 })
             
-            # Déterminer la tendance
-            if len(temporal_data) >= 2:
-                first_half = temporal_data[:len(temporal_data)//2]
-                second_half = temporal_data[len(temporal_data)//2:]
-                
-                first_avg = np.mean([d['average_rating'] for d in first_half])
-                second_avg = np.mean([d['average_rating'] for d in second_half])
-                
-                if second_avg > first_avg + 0.2:
-                    trend = 'improving'
-                elif second_avg < first_avg - 0.2:
-                    trend = 'declining'
-                else:
-                    trend = 'stable'
-            else:
-                trend = 'insufficient_data'
+            # Les hôtels sans réponse sont classés en dernier
+            ranking.sort(key=lambda entry: (entry['statistics']['total_responses'] > 0, entry['value']), reverse=True)
+            for position, entry in enumerate(ranking, start=1):
+                entry['rank'] = position
+            
+            return ranking
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du classement des hôtels: {e}")
+            return None
+    
+    def get_temporal_analysis(self, hotel_id, period_days=30, granularity='week', start_date=None, end_date=None):
+        """Analyse l'évolution temporelle des données de satisfaction"""
+        try:
+            start_date, end_date = self._temporal_range(period_days, start_date, end_date)
+            rows = self._daily_overall_ratings([hotel_id], start_date, end_date)
+            return self._build_temporal_analysis(rows, granularity)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse temporelle: {e}")
+            return None
+    
+    def get_portfolio_temporal_analysis(self, hotel_ids=None, period_days=365, granularity='month', start_date=None, end_date=None):
+        """Analyse l'évolution temporelle de plusieurs hôtels à partir des agrégats journaliers"""
+        try:
+            if hotel_ids is None:
+                hotel_ids = [hotel_id for (hotel_id,) in self.db.session.query(Hotel.id).all()]
+            
+            start_date, end_date = self._temporal_range(period_days, start_date, end_date)
+            rows_by_hotel = {hotel_id: [] for hotel_id in hotel_ids}
+            for row in self._daily_overall_ratings(hotel_ids, start_date, end_date):
+                rows_by_hotel[row[0]].append(row)
             
             return {
-                'data': temporal_data,
-                'trend': trend
+                hotel_id: self._build_temporal_analysis(rows, granularity)
+                for hotel_id, rows in rows_by_hotel.items()
             }
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse temporelle: {e}")
+            logger.error(f"Erreur lors de l'analyse temporelle du portefeuille: {e}")
             return None
     
+    def _temporal_range(self, period_days, start_date, end_date):
+        """Détermine la plage de jours (bornes incluses) de l'analyse temporelle"""
+        if end_date is None:
+            end_date = datetime.now().date()
+        if start_date is None:
+            start_date = end_date - timedelta(days=period_days)
+        return start_date, end_date
+    
+    def _daily_overall_ratings(self, hotel_ids, start_date, end_date):
+        """
+        Récupère les sommes journalières de la note globale sur une plage de jours
+        
+        Returns:
+            Liste de tuples (hotel_id, jour, somme des notes, nombre de notes) triés par jour
+        """
+        # Hôtels dont les agrégats journaliers sont maintenus à l'ingestion et à jour
+        tracked_ids = set(self._current_rollups(hotel_ids))
+        untracked_ids = [hotel_id for hotel_id in hotel_ids if hotel_id not in tracked_ids]
+        
+        rows = []
+        if tracked_ids:
+            daily_rollups = self.db.session.query(
+                HotelDailyRollup.hotel_id,
+                HotelDailyRollup.day,
+                HotelDailyRollup.overall_rating_sum,
+                HotelDailyRollup.overall_rating_count
+            ).filter(
+                HotelDailyRollup.hotel_id.in_(tracked_ids),
+                HotelDailyRollup.day >= start_date,
+                HotelDailyRollup.day <= end_date
+            )
+            rows.extend(tuple(row) for row in daily_rollups.all())
+        
+        if untracked_ids:
+            # Pas encore d'agrégats: regroupement par jour en SQL
+            query = self.aggregate_statistics_query(
+                untracked_ids,
+                group_by_day=True,
+                start_date=datetime.combine(start_date, time.min),
+                end_date=datetime.combine(end_date + timedelta(days=1), time.min)
+            )
+            for row in query.all():
+                rows.append((row.hotel_id, date.fromisoformat(row.day), row.overall_rating_sum or 0, row.overall_rating_count))
+        
+        return sorted(rows, key=lambda row: row[1])
+    
+    def _bucket_start(self, day, granularity):
+        """Premier jour de la période (jour, semaine, mois ou trimestre) contenant ce jour"""
+        if granularity == 'day':
+            return day
+        if granularity == 'week':
+            return day - timedelta(days=day.weekday())
+        if granularity == 'month':
+            return day.replace(day=1)
+        if granularity == 'quarter':
+            return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+        raise ValueError(f"Granularité inconnue: {granularity}")
+    
+    def _build_temporal_analysis(self, rows, granularity):
+        """Regroupe les agrégats journaliers par période et détermine la tendance"""
+        buckets = {}
+        for _, day, rating_sum, rating_count in rows:
+            if not rating_count:
+                continue
+            key = self._bucket_start(day, granularity)
+            bucket = buckets.setdefault(key, [0, 0])
+            bucket[0] += rating_sum
+            bucket[1] += rating_count
+        
+        if not buckets:
+            return {'data': [], 'trend': 'stable', 'granularity': granularity}
+        
+        # Calculer les moyennes par période
+        temporal_data = []
+        for period in sorted(buckets):
+            rating_sum, rating_count = buckets[period]
+            entry = {
+                'period': period.strftime('%Y-%m-%d'),
+                'average_rating': round(rating_sum / rating_count, 1),
+                'response_count': rating_count
+            }
+            if granularity == 'week':
+                entry['week'] = entry['period']
+            temporal_data.append(entry)
+        
+        # Déterminer la tendance
+        if len(temporal_data) >= 2:
+            first_half = temporal_data[:len(temporal_data)//2]
+            second_half = temporal_data[len(temporal_data)//2:]
+            
+            first_avg = np.mean([d['average_rating'] for d in first_half])
+            second_avg = np.mean([d['average_rating'] for d in second_half])
+            
+            if second_avg > first_avg + 0.2:
+                trend = 'improving'
+            elif second_avg < first_avg - 0.2:
+                trend = 'declining'
+            else:
+                trend = 'stable'
+        else:
+            trend = 'insufficient_data'
+        
+        return {
+            'data': temporal_data,
+            'trend': trend,
+            'granularity': granularity
+        }
+    
     def get_detailed_analysis(self, hotel_id):
         """Effectue une analyse détaillée des données de satisfaction"""
         try:
-            responses = SatisfactionResponse.query.filter_by(hotel_id=hotel_id).all()
+            return self._detailed_analysis_from_snapshot(self.load_snapshot(hotel_id))
             
-            if not responses:
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse détaillée: {e}")
+            return None
+    
+    def load_snapshot(self, hotel_id):
+        """Charge en une fois les données d'un hôtel nécessaires aux analyses"""
+        columns = response_cache.get(self.db, hotel_id)
+        
+        keyword_service = KeywordService(self.db)
+        if keyword_service.has_keywords(hotel_id):
+            # Mots-clés lus dans la table de fréquences maintenue à l'ingestion
+            top_keywords = keyword_service.top_keywords(hotel_id)
+            total_comments = SatisfactionResponse.query.filter(
+                SatisfactionResponse.hotel_id == hotel_id,
+                SatisfactionResponse.comments.isnot(None),
+                SatisfactionResponse.comments != ''
+            ).count()
+        else:
+            # Hôtel pas encore couvert par la table de fréquences: seule la colonne texte des commentaires est chargée
+            comments = [
+                comment for (comment,) in self.db.session.query(SatisfactionResponse.comments)
+                .filter(SatisfactionResponse.hotel_id == hotel_id, SatisfactionResponse.comments.isnot(None)).all()
+                if comment
+            ]
+            top_keywords = self._count_keywords(comments)
+            total_comments = len(comments)
+        
+        return HotelSnapshot(hotel_id, columns, top_keywords, total_comments)
+    
+    def _count_keywords(self, comments, limit=10):
+        """Compte les mots-clés des commentaires (hôtel absent de la table de fréquences)"""
+        word_freq = Counter()
+        for comment in comments:
+            word_freq.update(KeywordService.tokenize(comment))
+        
+        return sorted(word_freq.items(), key=lambda x: (-x[1], x[0]))[:limit]
+    
+    def _statistics_from_snapshot(self, snapshot):
+        """Calcule les statistiques de l'hôtel directement sur les colonnes de l'instantané"""
+        columns = snapshot.columns
+        valid = ~np.isnan(columns.ratings)
+        sums = np.where(valid, columns.ratings, 0).sum(axis=0)
+        counts = valid.sum(axis=0)
+        
+        totals = SimpleNamespace(
+            total_responses=len(columns),
+            recommend_yes=int(np.count_nonzero(columns.recommend == 1)),
+            recommend_count=int(np.count_nonzero(columns.recommend >= 0))
+        )
+        for index, field in enumerate(columns.RATING_FIELDS):
+            setattr(totals, f'{field}_sum', float(sums[index]))
+            setattr(totals, f'{field}_count', int(counts[index]))
+        
+        monthly_responses = int(np.count_nonzero(columns.submitted_at >= np.datetime64(self._current_month(), 'us')))
+        return self._build_statistics(totals, monthly_responses)
+    
+    def _temporal_analysis_from_snapshot(self, snapshot, period_days=30, granularity='week'):
+        """Analyse temporelle calculée sur les colonnes de l'instantané"""
+        columns = snapshot.columns
+        start_date, end_date = self._temporal_range(period_days, None, None)
+        
+        overall = columns.rating('overall_rating')
+        days = columns.submitted_at.astype('datetime64[D]')
+        mask = (
+            ~np.isnat(days) & ~np.isnan(overall)
+            & (days >= np.datetime64(start_date)) & (days <= np.datetime64(end_date))
+        )
+        
+        # Sommes et nombres de notes par jour, sans boucle sur les réponses
+        unique_days, inverse = np.unique(days[mask], return_inverse=True)
+        sums = np.bincount(inverse, weights=overall[mask], minlength=len(unique_days))
+        counts = np.bincount(inverse, minlength=len(unique_days))
+        
+        rows = [
+            (snapshot.hotel_id, day.astype(object), float(rating_sum), int(count))
+            for day, rating_sum, count in zip(unique_days, sums, counts)
+        ]
+        return self._build_temporal_analysis(rows, granularity)
+    
+    def _detailed_analysis_from_snapshot(self, snapshot):
+        """Analyse détaillée (mots-clés, distribution, corrélations) sur l'instantané"""
+        columns = snapshot.columns
+        
+        if not len(columns):
+            return None
+        
+        # Distribution des notes
+        rating_distribution = {
+            str(rating): count for rating, count in self._rating_distribution(columns).items()
+        }
+        
+        # Corrélations entre catégories (observations complètes par paire)
+        correlations = CorrelationEngine.pairs(self.CATEGORIES, columns.matrix(self.CATEGORIES))
+        
+        return {
+            'top_keywords': snapshot.top_keywords,
+            'rating_distribution': rating_distribution,
+            'correlations': correlations,
+            'total_comments': snapshot.total_comments
+        }
+    
+    def get_correlation_matrix(self, hotel_id, fields=None):
+        """
+        Matrice de corrélation complète entre champs de notation d'un hôtel
+        
+        Les notes détaillées Top of Travel (response_ratings) sont alignées sur les réponses du
+        cache en colonnes. Sans liste de champs: notes principales et notes détaillées renseignées.
+        """
+        try:
+            columns = response_cache.get(self.db, hotel_id)
+            if fields:
+                core_fields = [field for field in fields if field in columns.RATING_FIELDS]
+                detail_fields = [field for field in fields if field in field_mapping.rating_codes]
+            else:
+                core_fields, detail_fields = list(columns.RATING_FIELDS), None
+            
+            detail_fields, details = self._detail_rating_matrix(hotel_id, columns.ids, detail_fields)
+            matrix_fields = core_fields + detail_fields
+            matrix = np.hstack([columns.matrix(core_fields), details])
+            
+            if fields:
+                # Ordre des champs demandé
+                matrix = matrix[:, [matrix_fields.index(field) for field in fields]]
+                matrix_fields = list(fields)
+            return CorrelationEngine.matrix(matrix_fields, matrix)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la matrice de corrélation: {e}")
+            return None
+    
+    def _detail_rating_matrix(self, hotel_id, response_ids, fields=None):
+        """
+        Notes détaillées d'un hôtel alignées sur des réponses (NaN si absente)
+        
+        Args:
+            hotel_id: Identifiant de l'hôtel
+            response_ids: Identifiants triés des réponses (lignes de la matrice)
+            fields: Notes détaillées retenues, toutes celles renseignées pour l'hôtel si None
+            
+        Returns:
+            Tuple (champs, matrice réponses x champs)
+        """
+        query = self.db.session.query(
+            ResponseRating.field_code,
+            ResponseRating.response_id,
+            ResponseRating.rating
+        ).filter(ResponseRating.hotel_id == hotel_id)
+        if fields is not None:
+            query = query.filter(ResponseRating.field_code.in_([field_mapping.rating_codes[field] for field in fields]))
+        rows = query.all() if fields is None or fields else []
+        
+        if fields is None:
+            rated = {row[0] for row in rows}
+            fields = [field for field in self.DETAIL_RATING_FIELDS if field_mapping.rating_codes[field] in rated]
+        
+        matrix = np.full((len(response_ids), len(fields)), np.nan)
+        field_index = {field_mapping.rating_codes[field]: index for index, field in enumerate(fields)}
+        # Codes retirés du schéma ignorés
+        rows = [row for row in rows if row[0] in field_index]
+        if rows and len(response_ids):
+            codes, ids, ratings = zip(*rows)
+            ids = np.array(ids, dtype=np.int64)
+            positions = np.minimum(np.searchsorted(response_ids, ids), len(response_ids) - 1)
+            # Réponses absentes du cache (enregistrées entre-temps) ignorées
+            known = response_ids[positions] == ids
+            cols = np.array([field_index[code] for code in codes], dtype=np.int64)
+            matrix[positions[known], cols[known]] = np.array(ratings, dtype=np.float64)[known]
+        
+        return fields, matrix
+    
+    def get_rating_distribution(self, hotel_id):
+        """Distribution des notes globales (1 à 5), None si aucune note n'est renseignée"""
+        try:
+            columns = response_cache.get(self.db, hotel_id)
+            if not np.any(~np.isnan(columns.rating('overall_rating'))):
                 return None
+            return self._rating_distribution(columns)
             
-            # Analyse des commentaires
-            comments = [r.comments for r in responses if r.comments]
-            
-            # Mots-clés fréquents (analyse simple)
-            all_words = []
-            for comment in comments:
-                words = comment.lower().split()
-                # Filtrer les mots courts et courants
-                filtered_words = [w for w in words if len(w) > 3 and w not in ['très', 'bien', 'avec', 'pour', 'dans', 'cette', 'tout', 'plus']]
-                all_words.extend(filtered_words)
-            
-            word_freq = {}
-            for word in all_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
-            
-            # Top 10 des mots les plus fréquents
-            top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-            
-            # Distribution des notes
-            rating_distribution = {}
-            for i in range(1, 6):
-                rating_distribution[str(i)] = len([r for r in responses if r.overall_rating and int(r.overall_rating) == i])
-            
-            # Corrélations entre catégories
-            categories = ['accommodation_rating', 'service_rating', 'cleanliness_rating', 'food_rating', 'location_rating', 'value_rating']
-            correlations = {}
-            
-            for i, cat1 in enumerate(categories):
-                for cat2 in categories[i+1:]:
-                    values1 = [getattr(r, cat1) for r in responses if getattr(r, cat1) is not None]
-                    values2 = [getattr(r, cat2) for r in responses if getattr(r, cat2) is not None]
-                    
-                    if len(values1) > 1 and len(values2) > 1:
-                        correlation = np.corrcoef(values1, values2)[0, 1]
-                        correlations[f"{cat1}_vs_{cat2}"] = round(correlation, 2)
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la distribution des notes: {e}")
+            return None
+    
+    def get_section_averages(self, hotel_ids, travel_type=None, age_group=None):
+        """
+        Moyennes des notes détaillées par section (transports, chambres, piscine...) et par champ
+        
+        Sommes et nombres de notes sont agrégés en SQL par hôtel et par champ (plage de la clé
+        primaire de response_ratings), puis réduits par section en une opération matricielle.
+        
+        Args:
+            hotel_ids: Identifiants des hôtels
+            travel_type: Ne retenir que les réponses de ce type de voyage (solo, couple...)
+            age_group: Ne retenir que les réponses de cette tranche d'âge
+            
+        Returns:
+            Dict {hotel_id: {'sections': {section: {'average', 'count', 'fields'}}}}, None en cas d'erreur
+        """
+        try:
+            query = self.db.session.query(
+                ResponseRating.hotel_id,
+                ResponseRating.field_code,
+                func.sum(ResponseRating.rating),
+                func.count(ResponseRating.rating)
+            ).filter(ResponseRating.hotel_id.in_(hotel_ids))
+            
+            if travel_type or age_group:
+                query = query.join(ResponseProfile, ResponseProfile.response_id == ResponseRating.response_id)
+                if travel_type:
+                    query = query.filter(ResponseProfile.travel_type == travel_type)
+                if age_group:
+                    query = query.filter(ResponseProfile.age_group == age_group)
+            
+            rows = query.group_by(ResponseRating.hotel_id, ResponseRating.field_code).all()
+            return self._section_averages(hotel_ids, rows)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des moyennes par section: {e}")
+            return None
+    
+    def _section_averages(self, hotel_ids, rows):
+        """Réduit les sommes (hôtel, champ) en moyennes par champ et par section"""
+        sums = np.zeros((len(hotel_ids), len(self.DETAIL_RATING_FIELDS)))
+        counts = np.zeros_like(sums)
+        
+        if rows:
+            hotel_index = {hotel_id: index for index, hotel_id in enumerate(hotel_ids)}
+            field_index = {field_mapping.rating_codes[field]: index for index, field in enumerate(self.DETAIL_RATING_FIELDS)}
+            # Codes retirés du schéma ignorés
+            rows = [row for row in rows if row[1] in field_index]
+            hotels = np.array([hotel_index[row[0]] for row in rows], dtype=np.int64)
+            fields = np.array([field_index[row[1]] for row in rows], dtype=np.int64)
+            sums[hotels, fields] = [row[2] for row in rows]
+            counts[hotels, fields] = [row[3] for row in rows]
+        
+        # Moyennes par champ et par section (toutes les notes de la section), NaN sans note
+        section_counts = counts @ self.SECTION_MEMBERSHIP
+        with np.errstate(invalid='ignore', divide='ignore'):
+            field_averages = np.round(sums / counts, 2)
+            section_averages = np.round((sums @ self.SECTION_MEMBERSHIP) / section_counts, 2)
+        
+        result = {}
+        for h, hotel_id in enumerate(hotel_ids):
+            sections = {}
+            for s, section in enumerate(self.SECTIONS):
+                sections[section] = {
+                    'average': float(section_averages[h, s]) if section_counts[h, s] else None,
+                    'count': int(section_counts[h, s]),
+                    'fields': {
+                        field: {'average': float(field_averages[h, f]), 'count': int(counts[h, f])}
+                        for f, field in enumerate(self.DETAIL_RATING_FIELDS)
+                        if self.SECTION_MEMBERSHIP[f, s] and counts[h, f]
+                    }
+                }
+            result[hotel_id] = {'sections': sections}
+        return result
+    
+    def get_chart_data(self, hotel_id, period_days=60):
+        """
+        Séries compactes des graphiques de l'hôtel (catégories, distribution, évolution) pour un rendu côté client
+        
+        Returns:
+            Dict des séries, None en cas d'erreur
+        """
+        try:
+            # Un seul instantané pour les trois séries (comme generate_insights_report)
+            snapshot = self.load_snapshot(hotel_id)
+            stats = self._statistics_from_snapshot(snapshot)
+            
+            overall = snapshot.columns.rating('overall_rating')
+            distribution = self._rating_distribution(snapshot.columns) if np.any(~np.isnan(overall)) else None
+            temporal = self._temporal_analysis_from_snapshot(snapshot, period_days)
             
             return {
-                'top_keywords': top_keywords,
-                'rating_distribution': rating_distribution,
-                'correlations': correlations,
-                'total_comments': len(comments)
+                'total_responses': stats['total_responses'],
+                'categories': {
+                    'keys': list(stats['category_averages'].keys()),
+                    'values': list(stats['category_averages'].values())
+                },
+                'distribution': {
+                    'ratings': list(distribution.keys()),
+                    'counts': list(distribution.values())
+                } if distribution else None,
+                'temporal': {
+                    'periods': [d['period'] for d in temporal['data']],
+                    'values': [d['average_rating'] for d in temporal['data']],
+                    'trend': temporal['trend']
+                } if temporal and temporal['data'] else None
             }
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse détaillée: {e}")
+            logger.error(f"Erreur lors de la préparation des données de graphiques: {e}")
             return None
     
+    def _rating_distribution(self, columns):
+        """Compte les notes globales par valeur entière (troncature), de 1 à 5"""
+        overall = columns.rating('overall_rating')
+        truncated = np.trunc(overall[~np.isnan(overall)])
+        return {rating: int(np.count_nonzero(truncated == rating)) for rating in range(1, 6)}
+    
     def generate_insights(self, hotel_id):
         """Génère des insights automatiques basés sur les données"""
+        return self.generate_insights_report(hotel_id)['insights']
+    
+    def generate_insights_report(self, hotel_id):
+        """
+        Génère les insights à partir d'un instantané unique des données de l'hôtel
+        
+        Returns:
+            Dict contenant les insights et la durée de chaque étape (en ms)
+        """
+        timings = {}
         try:
-            stats = self.get_hotel_statistics(hotel_id)
-            detailed = self.get_detailed_analysis(hotel_id)
-            temporal = self.get_temporal_analysis(hotel_id)
-            
-            if not stats or not detailed:
-                return []
-            
-            insights = []
-            
-            # Insight sur la note globale
-            if stats['average_overall_rating'] >= 4.5:
-                insights.append({
-                    'type': 'positive',
-                    'title': 'Excellente satisfaction globale',
-                    'description': f"Votre hôtel obtient une note moyenne de {stats['average_overall_rating']}/5, ce qui est excellent."
-                })
-            elif stats['average_overall_rating'] < 3.5:
-                insights.append({
-                    'type': 'warning',
-                    'title': 'Satisfaction à améliorer',
-                    'description': f"La note moyenne de {stats['average_overall_rating']}/5 indique des axes d'amélioration."
-                })
-            
-            # Insight sur le taux de recommandation
-            if stats['recommendation_rate'] >= 80:
-                insights.append({
-                    'type': 'positive',
-                    'title': 'Fort taux de recommandation',
-                    'description': f"{stats['recommendation_rate']}% de vos clients recommandent votre hôtel."
-                })
-            elif stats['recommendation_rate'] < 60:
-                insights.append({
-                    'type': 'warning',
-                    'title': 'Taux de recommandation faible',
-                    'description': f"Seulement {stats['recommendation_rate']}% de recommandation. Identifiez les points d'amélioration."
-                })
+            with _timed(timings, 'snapshot'):
+                snapshot = self.load_snapshot(hotel_id)
             
-            # Insight sur la catégorie la mieux notée
-            best_category = max(stats['category_averages'], key=stats['category_averages'].get)
-            worst_category = min(stats['category_averages'], key=stats['category_averages'].get)
-            
-            category_names = {
-                'accommodation_rating': 'Hébergement',
-                'service_rating': 'Service',
-                'cleanliness_rating': 'Propreté',
-                'food_rating': 'Restauration',
-                'location_rating': 'Emplacement',
-                'value_rating': 'Rapport qualité-prix'
-            }
+            with _timed(timings, 'statistics'):
+                stats = self._statistics_from_snapshot(snapshot)
             
-            insights.append({
-                'type': 'info',
-                'title': 'Point fort identifié',
-                'description': f"Votre meilleur atout est '{category_names.get(best_category, best_category)}' avec {stats['category_averages'][best_category]}/5."
-            })
+            with _timed(timings, 'detailed_analysis'):
+                detailed = self._detailed_analysis_from_snapshot(snapshot)
             
-            if stats['category_averages'][worst_category] < 4.0:
-                insights.append({
-                    'type': 'improvement',
-                    'title': 'Axe d\'amélioration prioritaire',
-                    'description': f"'{category_names.get(worst_category, worst_category)}' obtient {stats['category_averages'][worst_category]}/5 et mérite attention."
-                })
+            with _timed(timings, 'temporal_analysis'):
+                temporal = self._temporal_analysis_from_snapshot(snapshot)
             
-            # Insight sur la tendance
-            if temporal and temporal['trend'] == 'improving':
-                insights.append({
-                    'type': 'positive',
-                    'title': 'Tendance positive',
-                    'description': 'Vos notes de satisfaction sont en amélioration ces dernières semaines.'
-                })
-            elif temporal and temporal['trend'] == 'declining':
-                insights.append({
-                    'type': 'warning',
-                    'title': 'Tendance à surveiller',
-                    'description': 'Vos notes de satisfaction montrent une baisse récente.'
-                })
+            with _timed(timings, 'insights'):
+                insights = self._build_insights(stats, detailed, temporal) if stats and detailed else []
             
-            return insights
+            logger.debug(f"Durées de génération des insights pour l'hôtel {hotel_id}: {timings}")
+            return {'insights': insights, 'timings': timings}
             
         except Exception as e:
             logger.error(f"Erreur lors de la génération d'insights: {e}")
-            return []
-
+            return {'insights': [], 'timings': timings}
+    
+    def _build_insights(self, stats, detailed, temporal):
+        """Applique les règles d'insights aux analyses déjà calculées"""
+        insights = []
+        
+        # Insight sur la note globale
+        if stats['average_overall_rating'] >= 4.5:
+            insights.append({
+                'type': 'positive',
+                'title': 'Excellente satisfaction globale',
+                'description': f"Votre hôtel obtient une note moyenne de {stats['average_overall_rating']}/5, ce qui est excellent."
+            })
+        elif stats['average_overall_rating'] < 3.5:
+            insights.append({
+                'type': 'warning',
+                'title': 'Satisfaction à améliorer',
+                'description': f"La note moyenne de {stats['average_overall_rating']}/5 indique des axes d'amélioration."
+            })
+        
+        # Insight sur le taux de recommandation
+        if stats['recommendation_rate'] >= 80:
+            insights.append({
+                'type': 'positive',
+                'title': 'Fort taux de recommandation',
+                'description': f"{stats['recommendation_rate']}% de vos clients recommandent votre hôtel."
+            })
+        elif stats['recommendation_rate'] < 60:
+            insights.append({
+                'type': 'warning',
+                'title': 'Taux de recommandation faible',
+                'description': f"Seulement {stats['recommendation_rate']}% de recommandation. Identifiez les points d'amélioration."
+            })
+        
+        # Insight sur la catégorie la mieux notée
+        best_category = max(stats['category_averages'], key=stats['category_averages'].get)
+        worst_category = min(stats['category_averages'], key=stats['category_averages'].get)
+        
+        category_names = {
+            'accommodation_rating': 'Hébergement',
+            'service_rating': 'Service',
+            'cleanliness_rating': 'Propreté',
+            'food_rating': 'Restauration',
+            'location_rating': 'Emplacement',
+            'value_rating': 'Rapport qualité-prix'
+        }
+        
+        insights.append({
+            'type': 'info',
+            'title': 'Point fort identifié',
+            'description': f"Votre meilleur atout est '{category_names.get(best_category, best_category)}' avec {stats['category_averages'][best_category]}/5."
+        })
+        
+        if stats['category_averages'][worst_category] < 4.0:
+            insights.append({
+                'type': 'improvement',
+                'title': 'Axe d\'amélioration prioritaire',
+                'description': f"'{category_names.get(worst_category, worst_category)}' obtient {stats['category_averages'][worst_category]}/5 et mérite attention."
+            })
+        
+        # Insight sur la tendance
+        if temporal and temporal['trend'] == 'improving':
+            insights.append({
+                'type': 'positive',
+                'title': 'Tendance positive',
+                'description': 'Vos notes de satisfaction sont en amélioration ces dernières semaines.'
+            })
+        elif temporal and temporal['trend'] == 'declining':
+            insights.append({
+                'type': 'warning',
+                'title': 'Tendance à surveiller',
+                'description': 'Vos notes de satisfaction montrent une baisse récente.'
+            })
+        
+        return insights
@@ -0,0 +1,199 @@
+"""
+Rendu des graphiques avec l'API objet de matplotlib (Figure + canvas Agg)
+Aucun état global pyplot: les fonctions de rendu peuvent s'exécuter en parallèle,
+dans des threads ou dans les processus du pool de rendu
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import seaborn as sns
+
+logger = logging.getLogger(__name__)
+
+# Préréglages de rendu: résolution et facteur d'échelle appliqué à la taille de base de chaque graphique
+PRESETS = {
+    'thumbnail': {'dpi': 72, 'scale': 0.5},
+    'dashboard': {'dpi': 110, 'scale': 1.0},
+    'print': {'dpi': 300, 'scale': 1.0}
+}
+
+# Taille de base (en pouces) par type de graphique
+BASE_SIZES = {
+    'categories': (10, 6),
+    'distribution': (8, 6),
+    'temporal': (12, 6),
+    'comparison': (12, 8)
+}
+
+def render_chart(spec, preset):
+    """
+    Rend une spécification de graphique en PNG
+
+    Args:
+        spec: Spécification (type, titre, données) produite par ChartService
+        preset: Nom du préréglage de rendu (voir PRESETS)
+
+    Returns:
+        Contenu du fichier PNG
+    """
+    settings = PRESETS[preset]
+    width, height = BASE_SIZES[spec['kind']]
+
+    fig = Figure(figsize=(width * settings['scale'], height * settings['scale']))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    RENDERERS[spec['kind']](fig, ax, spec)
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=settings['dpi'], bbox_inches='tight')
+    return buffer.getvalue()
+
+def _rotate_labels(ax, ha='center'):
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment(ha)
+
+def _render_categories(fig, ax, spec):
+    bars = ax.bar(spec['labels'], spec['values'], color=sns.color_palette("husl", len(spec['labels'])))
+    ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+    ax.set_ylabel('Note moyenne (/5)')
+    ax.set_ylim(0, 5)
+
+    # Ajouter les valeurs sur les barres
+    for bar, value in zip(bars, spec['values']):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.05,
+               f'{value:.1f}', ha='center', va='bottom')
+
+    _rotate_labels(ax, ha='right')
+
+def _render_distribution(fig, ax, spec):
+    bars = ax.bar(spec['ratings'], spec['counts'], color=sns.color_palette("viridis", len(spec['ratings'])))
+    ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+    ax.set_xlabel('Note (/5)')
+    ax.set_ylabel('Nombre de réponses')
+    ax.set_xticks(spec['ratings'])
+
+    # Ajouter les valeurs sur les barres
+    for bar, count in zip(bars, spec['counts']):
+        height = bar.get_height()
+        if height > 0:
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                   str(int(count)), ha='center', va='bottom')
+
+def _render_temporal(fig, ax, spec):
+    dates = [datetime.strptime(d, '%Y-%m-%d') for d in spec['dates']]
+
+    ax.plot(dates, spec['ratings'], marker='o', linewidth=2, markersize=6)
+    ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+    ax.set_xlabel('Semaine')
+    ax.set_ylabel('Note moyenne (/5)')
+    ax.set_ylim(0, 5)
+    ax.grid(True, alpha=0.3)
+
+    _rotate_labels(ax)
+
+def _render_comparison(fig, ax, spec):
+    series = spec['series']
+    x = range(len(spec['labels']))
+    width = 0.8 / len(series)
+    colors = sns.color_palette("husl", len(series))
+
+    for i, serie in enumerate(series):
+        offset = (i - len(series)/2 + 0.5) * width
+        ax.bar([pos + offset for pos in x], serie['values'], width, label=serie['name'], color=colors[i])
+
+    ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+    ax.set_ylabel('Note moyenne (/5)')
+    ax.set_xlabel('Catégories')
+    ax.set_xticks(x)
+    ax.set_xticklabels(spec['labels'], rotation=45, ha='right')
+    ax.legend()
+    ax.set_ylim(0, 5)
+    ax.grid(True, alpha=0.3)
+
+RENDERERS = {
+    'categories': _render_categories,
+    'distribution': _render_distribution,
+    'temporal': _render_temporal,
+    'comparison': _render_comparison
+}
+
+class ChartRenderPool:
+    """Pool de processus borné exécutant les rendus hors du worker HTTP"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        # Rendus en attente limités: au-delà, l'appelant attend qu'une place se libère
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1) * 4)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def render_many(self, jobs):
+        """
+        Rend plusieurs graphiques en parallèle
+
+        Args:
+            jobs: Liste de tuples (spécification, préréglage)
+
+        Returns:
+            Liste des contenus PNG, dans l'ordre des jobs
+        """
+        if self.max_workers <= 0:
+            return [render_chart(spec, preset) for spec, preset in jobs]
+
+        futures = []
+        try:
+            for spec, preset in jobs:
+                self._slots.acquire()
+                try:
+                    future = self._get_executor().submit(render_chart, spec, preset)
+                except Exception:
+                    self._slots.release()
+                    raise
+                future.add_done_callback(lambda _: self._slots.release())
+                futures.append(future)
+            return [future.result() for future in futures]
+
+        except (BrokenProcessPool, OSError) as e:
+            # Pool indisponible ou processus interrompu: rendu dans le processus courant
+            logger.warning(f"Pool de rendu indisponible, rendu local: {e}")
+            for future in futures:
+                future.cancel()
+            self._reset()
+            return [render_chart(spec, preset) for spec, preset in jobs]
+
+    def shutdown(self):
+        """Arrête les processus du pool"""
+        self._reset()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # 'spawn': les processus ne partagent ni connexions ni verrous du worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+# Pool partagé par les requêtes du processus (CHART_RENDER_WORKERS=0 pour un rendu local).
+# Chaque worker HTTP a son propre pool: taille par défaut réduite pour ne pas multiplier
+# les processus de rendu par le nombre de workers
+render_pool = ChartRenderPool(int(os.getenv('CHART_RENDER_WORKERS', 2)))
@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from src.services.chart_renderer import PRESETS, render_pool
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_LABELS = {
+    'accommodation_rating': 'Hébergement',
+    'service_rating': 'Service',
+    'cleanliness_rating': 'Propreté',
+    'food_rating': 'Restauration',
+    'location_rating': 'Emplacement',
+    'value_rating': 'Qualité-prix'
+}
+
+class ChartService:
+    """
+    Rendu des graphiques PNG avec cache disque adressé par contenu
+
+    Chaque graphique est décrit par une spécification (type, titre, données). Le hash de la
+    spécification et des paramètres de rendu donne le nom du fichier: des données inchangées
+    ne déclenchent jamais un nouveau rendu, et l'URL peut être mise en cache indéfiniment.
+    """
+
+    # Version du rendu incluse dans la clé (à incrémenter si le rendu change)
+    RENDER_VERSION = 2
+
+    PRESETS = list(PRESETS.keys())
+
+    HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+    # Durée de mise en cache côté client (un an: le contenu d'une URL ne change jamais)
+    MAX_AGE = 365 * 24 * 3600
+
+    # Nombre maximal de fichiers conservés (les moins récemment servis sont supprimés)
+    MAX_FILES = int(os.getenv('CHART_CACHE_MAX_FILES', 2000))
+
+    # Spécifications conservées à côté des PNG: un graphique supprimé est rendu à nouveau
+    # quand son URL est demandée (URL encore présente dans une réponse mise en cache)
+    MAX_SPEC_FILES = int(os.getenv('CHART_CACHE_MAX_SPEC_FILES', MAX_FILES * 10))
+
+    # Vérification de la taille du cache tous les N rendus
+    PRUNE_EVERY = 50
+
+    _renders_since_prune = 0
+    _prune_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.getenv(
+            'CHART_CACHE_DIR',
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'charts')
+        )
+
+    def chart_url(self, spec, preset='dashboard'):
+        """Retourne l'URL d'un graphique, rendu uniquement s'il n'est pas déjà en cache"""
+        return self.chart_urls({'chart': spec}, preset)['chart']
+
+    def chart_urls(self, specs, preset='dashboard'):
+        """
+        Retourne les URL de plusieurs graphiques, en rendant en parallèle ceux absents du cache
+
+        Args:
+            specs: Dict {nom: spécification}
+            preset: Préréglage de rendu (thumbnail, dashboard, print)
+
+        Returns:
+            Dict {nom: URL}
+        """
+        hashes = {name: self.chart_hash(spec, preset) for name, spec in specs.items()}
+
+        missing = {}
+        for name, chart_hash in hashes.items():
+            path = self.path(chart_hash)
+            if os.path.exists(path):
+                self._touch(path)
+                self._touch(self._spec_path(chart_hash))
+            else:
+                missing.setdefault(chart_hash, specs[name])
+
+        if missing:
+            self._render({chart_hash: (spec, preset) for chart_hash, spec in missing.items()})
+
+        return {name: f'/api/charts/{chart_hash}.png' for name, chart_hash in hashes.items()}
+
+    def chart_file(self, chart_hash):
+        """
+        Chemin du PNG d'un graphique à servir, rendu à nouveau s'il a été supprimé du cache
+
+        Returns:
+            Chemin du fichier, None si le hash est inconnu
+        """
+        path = self.path(chart_hash)
+        if path is None:
+            return None
+        if os.path.exists(path):
+            self._touch(path)
+            self._touch(self._spec_path(chart_hash))
+            return path
+
+        try:
+            with open(self._spec_path(chart_hash), encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Spécification rendue avec d'autres paramètres (RENDER_VERSION modifiée): URL périmée
+        if stored.get('preset') not in PRESETS or self.chart_hash(stored['spec'], stored['preset']) != chart_hash:
+            return None
+
+        self._render({chart_hash: (stored['spec'], stored['preset'])})
+        return path
+
+    def chart_hash(self, spec, preset='dashboard'):
+        """Hash SHA-256 de la spécification et des paramètres de rendu"""
+        render = {'version': self.RENDER_VERSION, 'preset': preset, 'settings': PRESETS[preset]}
+        payload = json.dumps({'spec': spec, 'render': render}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, chart_hash):
+        """Chemin du fichier PNG d'un graphique (None si le hash est invalide)"""
+        if not self.HASH_PATTERN.match(chart_hash):
+            return None
+        return os.path.join(self.cache_dir, f'{chart_hash}.png')
+
+    # Spécifications des graphiques
+
+    def categories_spec(self, hotel_name, category_averages):
+        """Graphique des notes moyennes par catégorie"""
+        return {
+            'kind': 'categories',
+            'title': f'Notes par catégorie - {hotel_name}',
+            'labels': [CATEGORY_LABELS.get(cat, cat) for cat in category_averages],
+            'values': list(category_averages.values())
+        }
+
+    def distribution_spec(self, hotel_name, rating_counts):
+        """Graphique de distribution des notes globales"""
+        return {
+            'kind': 'distribution',
+            'title': f'Distribution des notes globales - {hotel_name}',
+            'ratings': list(rating_counts.keys()),
+            'counts': list(rating_counts.values())
+        }
+
+    def temporal_spec(self, hotel_name, temporal_data):
+        """Graphique d'évolution hebdomadaire des notes"""
+        return {
+            'kind': 'temporal',
+            'title': f'Évolution des notes dans le temps - {hotel_name}',
+            'dates': [d['week'] for d in temporal_data],
+            'ratings': [d['average_rating'] for d in temporal_data]
+        }
+
+    def comparison_spec(self, comparison_data):
+        """Graphique de comparaison des catégories entre hôtels"""
+        categories = list(CATEGORY_LABELS.keys())
+        return {
+            'kind': 'comparison',
+            'title': 'Comparaison des notes par catégorie',
+            'labels': [CATEGORY_LABELS[cat] for cat in categories],
+            'series': [
+                {'name': hotel, 'values': [data['category_averages'].get(cat, 0) for cat in categories]}
+                for hotel, data in comparison_data.items()
+            ]
+        }
+
+    # Maintenance du cache
+
+    def _render(self, charts):
+        """Rend en parallèle des graphiques {hash: (spécification, préréglage)} et les écrit dans le cache"""
+        pngs = render_pool.render_many(list(charts.values()))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for (chart_hash, (spec, preset)), png in zip(charts.items(), pngs):
+            self._write(self._spec_path(chart_hash), json.dumps(
+                {'spec': spec, 'preset': preset}, ensure_ascii=False
+            ).encode('utf-8'))
+            self._write(self.path(chart_hash), png)
+        self._maybe_prune(len(charts))
+
+    def _spec_path(self, chart_hash):
+        return os.path.join(self.cache_dir, f'{chart_hash}.json')
+
+    def _write(self, path, content):
+        """Écriture atomique: un lecteur concurrent ne voit jamais de fichier partiel"""
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _touch(self, path):
+        """Marque un fichier comme récemment servi (éviction LRU sur la date de modification)"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _maybe_prune(self, renders=1):
+        """Supprime les fichiers les moins récemment servis au-delà de MAX_FILES (PNG) et MAX_SPEC_FILES"""
+        with ChartService._prune_lock:
+            ChartService._renders_since_prune += renders
+            if ChartService._renders_since_prune < self.PRUNE_EVERY:
+                return
+            ChartService._renders_since_prune = 0
+
+        try:
+            entries = list(os.scandir(self.cache_dir))
+            for extension, max_files in (('.png', self.MAX_FILES), ('.json', self.MAX_SPEC_FILES)):
+                files = [entry for entry in entries if entry.name.endswith(extension)]
+                if len(files) <= max_files:
+                    continue
+
+                files.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in files[:len(files) - max_files]:
+                    os.remove(entry.path)
+                logger.info(f"Cache des graphiques: {len(files) - max_files} fichier(s) {extension} supprimé(s)")
+
+        except OSError as e:
+            logger.warning(f"Nettoyage du cache des graphiques impossible: {e}")
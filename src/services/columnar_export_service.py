@@ -0,0 +1,183 @@
+import logging
+from src.models.hotel import SatisfactionResponse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Dépendance optionnelle: les exports Parquet / Arrow sont désactivés sans pyarrow
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+class _DrainableSink:
+    """Fichier en écriture seule dont le contenu est vidé au fil de l'export"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        """Retourne et oublie les octets écrits depuis le dernier appel"""
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+class ColumnarExportService:
+    """Exports colonnaires (Parquet, Arrow IPC) des réponses, un groupe de lignes par hôtel et par mois"""
+
+    FORMATS = ['parquet', 'arrow']
+
+    MIMETYPES = {
+        'parquet': 'application/vnd.apache.parquet',
+        'arrow': 'application/vnd.apache.arrow.file'
+    }
+
+    # Colonnes exportées et leur type Arrow (notes en float32, booléens compactés en bits)
+    COLUMNS = [
+        ('id', 'int64'),
+        ('hotel_id', 'int32'),
+        ('submission_date', 'timestamp'),
+        ('client_name', 'string'),
+        ('client_email', 'string'),
+        ('overall_rating', 'float32'),
+        ('accommodation_rating', 'float32'),
+        ('service_rating', 'float32'),
+        ('cleanliness_rating', 'float32'),
+        ('food_rating', 'float32'),
+        ('location_rating', 'float32'),
+        ('value_rating', 'float32'),
+        ('would_recommend', 'bool'),
+        ('comments', 'string'),
+        ('tally_submission_id', 'string')
+    ]
+
+    # Nombre de lignes lues par aller-retour avec la base
+    BATCH_SIZE = 5000
+
+    # Taille maximale d'un groupe de lignes (un hôtel très actif peut dépasser sur un mois)
+    MAX_ROW_GROUP_SIZE = 100000
+
+    COMPRESSION = 'zstd'
+
+    def __init__(self, db):
+        self.db = db
+
+    @classmethod
+    def is_available(cls):
+        """Indique si pyarrow est installé"""
+        return pa is not None
+
+    def schema(self):
+        """Schéma Arrow de l'export"""
+        types = {
+            'int64': pa.int64(),
+            'int32': pa.int32(),
+            'timestamp': pa.timestamp('us'),
+            'string': pa.string(),
+            'float32': pa.float32(),
+            'bool': pa.bool_()
+        }
+        return pa.schema([(name, types[kind]) for name, kind in self.COLUMNS])
+
+    def query(self, hotel_id=None, since=None, until=None, after_id=None):
+        """Réponses à exporter, ordonnées par hôtel puis date (index hôtel/date)"""
+        columns = [getattr(SatisfactionResponse, name) for name, _ in self.COLUMNS]
+        query = self.db.session.query(*columns)
+
+        if hotel_id is not None:
+            query = query.filter(SatisfactionResponse.hotel_id == hotel_id)
+        if since is not None:
+            query = query.filter(SatisfactionResponse.submission_date >= since)
+        if until is not None:
+            query = query.filter(SatisfactionResponse.submission_date < until)
+        if after_id is not None:
+            query = query.filter(SatisfactionResponse.id > after_id)
+
+        return query.order_by(
+            SatisfactionResponse.hotel_id,
+            SatisfactionResponse.submission_date,
+            SatisfactionResponse.id
+        ).execution_options(yield_per=self.BATCH_SIZE)
+
+    def stream(self, export_format, **filters):
+        """
+        Génère l'export au format demandé par blocs d'octets
+
+        Args:
+            export_format: 'parquet' ou 'arrow' (format fichier IPC)
+            **filters: hotel_id, since, until, after_id (voir query)
+
+        Yields:
+            Blocs d'octets, un par groupe de lignes (hôtel, mois) écrit
+        """
+        schema = self.schema()
+        sink = _DrainableSink()
+        output = pa.PythonFile(sink, mode='w')
+
+        if export_format == 'parquet':
+            writer = pq.ParquetWriter(output, schema, compression=self.COMPRESSION)
+            write = lambda batch: writer.write_batch(batch, row_group_size=self.MAX_ROW_GROUP_SIZE)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.COMPRESSION)
+            writer = pa.ipc.new_file(output, schema, options=options)
+            write = writer.write_batch
+
+        try:
+            for batch in self._record_batches(schema, **filters):
+                write(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+
+        yield sink.drain()
+
+    def _record_batches(self, schema, **filters):
+        """Regroupe les lignes du curseur en lots Arrow homogènes (même hôtel, même mois)"""
+        names = [name for name, _ in self.COLUMNS]
+        hotel_index = names.index('hotel_id')
+        date_index = names.index('submission_date')
+
+        group_key = None
+        columns = [[] for _ in names]
+
+        for row in self.query(**filters):
+            submission_date = row[date_index]
+            key = (row[hotel_index], (submission_date.year, submission_date.month) if submission_date else None)
+
+            if key != group_key or len(columns[0]) >= self.MAX_ROW_GROUP_SIZE:
+                if columns[0]:
+                    yield self._record_batch(schema, columns)
+                group_key = key
+                columns = [[] for _ in names]
+
+            for values, value in zip(columns, row):
+                values.append(value)
+
+        if columns[0]:
+            yield self._record_batch(schema, columns)
+
+    def _record_batch(self, schema, columns):
+        """Convertit des colonnes Python en lot Arrow typé"""
+        return pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        )
@@ -0,0 +1,233 @@
+import re
+import logging
+from markupsafe import escape
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+class CommentSearchService:
+    """Recherche plein texte (SQLite FTS5) sur les commentaires des réponses de satisfaction"""
+
+    FTS_TABLE = 'satisfaction_comments_fts'
+    # Statistiques de termes d'une version précédente (mots-clés lus dans KeywordService)
+    VOCAB_TABLE = 'satisfaction_comments_vocab'
+    CONTENT_VIEW = 'satisfaction_comments_content'
+
+    # Bornes des termes trouvés dans les extraits (caractères à usage privé),
+    # remplacées par <mark> après échappement HTML du commentaire
+    MATCH_START = '\ue000'
+    MATCH_END = '\ue001'
+
+    # Avis libre d'une réponse (profil voyageur), lu par les triggers
+    _ADDITIONAL = "(SELECT additional_comments FROM response_profiles WHERE response_id = {})"
+
+    # Index à contenu externe: le texte reste dans satisfaction_responses (commentaires) et
+    # response_profiles (avis libre), réunis par une vue; les triggers des deux tables
+    # maintiennent l'index synchronisé à chaque écriture
+    INDEX_DDL = [
+        f"""
+        CREATE VIEW IF NOT EXISTS {CONTENT_VIEW} AS
+        SELECT r.id, r.comments, p.additional_comments, r.hotel_id
+        FROM satisfaction_responses r
+        LEFT JOIN response_profiles p ON p.response_id = r.id
+        """,
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            comments,
+            additional_comments,
+            hotel_id UNINDEXED,
+            content='{CONTENT_VIEW}',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS satisfaction_comments_ai AFTER INSERT ON satisfaction_responses BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, comments, additional_comments, hotel_id)
+            VALUES (new.id, new.comments, {_ADDITIONAL.format('new.id')}, new.hotel_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS satisfaction_comments_ad AFTER DELETE ON satisfaction_responses BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comments, additional_comments, hotel_id)
+            VALUES ('delete', old.id, old.comments, {_ADDITIONAL.format('old.id')}, old.hotel_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS satisfaction_comments_au AFTER UPDATE ON satisfaction_responses BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comments, additional_comments, hotel_id)
+            VALUES ('delete', old.id, old.comments, {_ADDITIONAL.format('old.id')}, old.hotel_id);
+            INSERT INTO {FTS_TABLE}(rowid, comments, additional_comments, hotel_id)
+            VALUES (new.id, new.comments, {_ADDITIONAL.format('new.id')}, new.hotel_id);
+        END
+        """,
+        # Profil enregistré après la réponse: l'entrée indexée sans avis libre est remplacée
+        f"""
+        CREATE TRIGGER IF NOT EXISTS response_profiles_comments_ai AFTER INSERT ON response_profiles
+        WHEN new.additional_comments IS NOT NULL BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comments, additional_comments, hotel_id)
+            SELECT 'delete', id, comments, NULL, hotel_id FROM satisfaction_responses WHERE id = new.response_id;
+            INSERT INTO {FTS_TABLE}(rowid, comments, additional_comments, hotel_id)
+            SELECT id, comments, new.additional_comments, hotel_id FROM satisfaction_responses WHERE id = new.response_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS response_profiles_comments_ad AFTER DELETE ON response_profiles
+        WHEN old.additional_comments IS NOT NULL BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comments, additional_comments, hotel_id)
+            SELECT 'delete', id, comments, old.additional_comments, hotel_id FROM satisfaction_responses WHERE id = old.response_id;
+            INSERT INTO {FTS_TABLE}(rowid, comments, additional_comments, hotel_id)
+            SELECT id, comments, NULL, hotel_id FROM satisfaction_responses WHERE id = old.response_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS response_profiles_comments_au AFTER UPDATE OF additional_comments ON response_profiles
+        WHEN old.additional_comments IS NOT new.additional_comments BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comments, additional_comments, hotel_id)
+            SELECT 'delete', id, comments, old.additional_comments, hotel_id FROM satisfaction_responses WHERE id = old.response_id;
+            INSERT INTO {FTS_TABLE}(rowid, comments, additional_comments, hotel_id)
+            SELECT id, comments, new.additional_comments, hotel_id FROM satisfaction_responses WHERE id = new.response_id;
+        END
+        """
+    ]
+
+    # Index d'une version précédente (commentaires seuls): supprimé puis recréé
+    OUTDATED_INDEX_DDL = [
+        "DROP TRIGGER IF EXISTS satisfaction_comments_ai",
+        "DROP TRIGGER IF EXISTS satisfaction_comments_ad",
+        "DROP TRIGGER IF EXISTS satisfaction_comments_au",
+        f"DROP TABLE IF EXISTS {FTS_TABLE}"
+    ]
+
+    # Disponibilité de FTS5, déterminée une fois par processus
+    _available = None
+
+    def __init__(self, db):
+        self.db = db
+
+    def ensure_index(self):
+        """Crée l'index plein texte et ses triggers s'ils n'existent pas, puis l'alimente"""
+        try:
+            if self._index_outdated():
+                for statement in self.OUTDATED_INDEX_DDL:
+                    self.db.session.execute(text(statement))
+                logger.info("Index plein texte des commentaires d'une version précédente supprimé")
+
+            self.db.session.execute(text(f"DROP TABLE IF EXISTS {self.VOCAB_TABLE}"))
+            exists = self._index_exists()
+            for statement in self.INDEX_DDL:
+                self.db.session.execute(text(statement))
+            if not exists:
+                self.db.session.execute(text(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('rebuild')"))
+                logger.info("Index plein texte des commentaires créé")
+            self.db.session.commit()
+            CommentSearchService._available = True
+
+        except OperationalError as e:
+            self.db.session.rollback()
+            CommentSearchService._available = False
+            logger.warning(f"Index plein texte indisponible (FTS5 non supporté ?): {e}")
+
+        return CommentSearchService._available
+
+    def rebuild_index(self):
+        """Reconstruit entièrement l'index depuis les commentaires et avis libres des réponses"""
+        self.db.session.execute(text(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('rebuild')"))
+        self.db.session.commit()
+
+    def is_available(self):
+        """Indique si l'index plein texte peut être interrogé"""
+        if CommentSearchService._available is None:
+            CommentSearchService._available = self._index_exists()
+        return CommentSearchService._available
+
+    def search(self, hotel_id, query, page=1, per_page=20):
+        """
+        Recherche les commentaires d'un hôtel, triés par pertinence (BM25)
+
+        Args:
+            hotel_id: Identifiant de l'hôtel
+            query: Texte recherché (tous les mots doivent être présents)
+            page: Numéro de page (à partir de 1)
+            per_page: Nombre de résultats par page
+
+        Returns:
+            Dict contenant les résultats paginés et le nombre total de correspondances
+        """
+        match = self._match_expression(query)
+        page = max(page, 1)
+        per_page = min(max(per_page, 1), 100)
+
+        if not match:
+            return {'results': [], 'total': 0, 'pages': 0, 'current_page': page, 'per_page': per_page}
+
+        params = {'match': match, 'hotel_id': hotel_id}
+        total = self.db.session.execute(text(f"""
+            SELECT count(*) FROM {self.FTS_TABLE}
+            WHERE {self.FTS_TABLE} MATCH :match AND hotel_id = :hotel_id
+        """), params).scalar()
+
+        rows = self.db.session.execute(text(f"""
+            SELECT r.id, r.client_name, r.overall_rating, r.submission_date,
+                   snippet({self.FTS_TABLE}, -1, :match_start, :match_end, '…', 16) AS snippet,
+                   bm25({self.FTS_TABLE}) AS score
+            FROM {self.FTS_TABLE} f
+            JOIN satisfaction_responses r ON r.id = f.rowid
+            WHERE {self.FTS_TABLE} MATCH :match AND f.hotel_id = :hotel_id
+            ORDER BY score
+            LIMIT :limit OFFSET :offset
+        """), dict(
+            params,
+            match_start=self.MATCH_START,
+            match_end=self.MATCH_END,
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )).all()
+
+        return {
+            'results': [
+                {
+                    'response_id': row.id,
+                    'client_name': row.client_name,
+                    'overall_rating': row.overall_rating,
+                    'submission_date': str(row.submission_date) if row.submission_date else None,
+                    'snippet': self._highlight(row.snippet),
+                    'score': round(-row.score, 4)
+                }
+                for row in rows
+            ],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page,
+            'per_page': per_page
+        }
+
+    def _highlight(self, snippet):
+        """Échappe le HTML d'un extrait de commentaire puis balise les termes trouvés"""
+        if snippet is None:
+            return None
+        return str(escape(snippet)).replace(self.MATCH_START, '<mark>').replace(self.MATCH_END, '</mark>')
+
+    def _match_expression(self, query):
+        """Convertit la saisie utilisateur en expression FTS5 sûre (mots entre guillemets)"""
+        terms = re.findall(r'\w+', query or '')
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def _index_outdated(self):
+        """Vérifie si l'index existant n'inclut pas encore l'avis libre des réponses"""
+        sql = self.db.session.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.FTS_TABLE}
+        ).scalar()
+        return sql is not None and self.CONTENT_VIEW not in sql
+
+    def _index_exists(self):
+        """Vérifie la présence de la table virtuelle dans le schéma SQLite"""
+        try:
+            return self.db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': self.FTS_TABLE}
+            ).first() is not None
+        except OperationalError:
+            return False
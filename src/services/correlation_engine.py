@@ -0,0 +1,104 @@
+"""
+Moteur de corrélations entre champs de notation
+Calcule la matrice complète en une passe vectorisée, sur observations complètes par paire
+"""
+
+import logging
+from typing import Dict, List, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CorrelationEngine:
+    """Corrélations de Pearson par paires complètes sur une matrice de notes (NaN = absente)"""
+
+    # Nombre minimal d'observations communes pour qu'une corrélation soit publiée
+    MIN_OBSERVATIONS = 2
+
+    @classmethod
+    def pairwise_complete(cls, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule la matrice de corrélation en ne retenant, pour chaque paire de colonnes,
+        que les lignes où les deux valeurs sont renseignées
+
+        Args:
+            matrix: Tableau (réponses x champs) de notes, NaN pour les valeurs absentes
+
+        Returns:
+            Tuple (corrélations, nombre d'observations communes), matrices (champs x champs)
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        present = ~np.isnan(matrix)
+        mask = present.astype(np.float64)
+
+        # Centrage par colonne: la corrélation est invariante par translation,
+        # et le calcul des sommes de produits reste numériquement stable
+        with np.errstate(invalid='ignore'):
+            counts = present.sum(axis=0)
+            means = np.divide(np.where(present, matrix, 0).sum(axis=0), counts,
+                              out=np.zeros(matrix.shape[1]), where=counts > 0)
+        values = np.where(present, matrix - means, 0.0)
+
+        # Toutes les sommes par paire en produits matriciels (aucune boucle Python)
+        observations = mask.T @ mask
+        sum_x = values.T @ mask            # somme de x_i sur les lignes où j est présent
+        sum_y = sum_x.T                    # somme de x_j sur les lignes où i est présent
+        sum_xx = (values * values).T @ mask
+        sum_yy = sum_xx.T
+        sum_xy = values.T @ values
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = sum_xy - sum_x * sum_y / observations
+            variance_x = sum_xx - sum_x * sum_x / observations
+            variance_y = sum_yy - sum_y * sum_y / observations
+            correlations = covariance / np.sqrt(variance_x * variance_y)
+
+        tolerance = 1e-12 * np.maximum(observations, 1)
+        undefined = (
+            (observations < cls.MIN_OBSERVATIONS)
+            | (variance_x <= tolerance)
+            | (variance_y <= tolerance)
+        )
+        correlations[undefined] = np.nan
+        np.clip(correlations, -1.0, 1.0, out=correlations)
+
+        return correlations, observations.astype(np.int64)
+
+    @classmethod
+    def pairs(cls, fields: List[str], matrix: np.ndarray, decimals: int = 2) -> Dict[str, float]:
+        """
+        Retourne les corrélations définies sous la forme {'champ1_vs_champ2': valeur}
+
+        Args:
+            fields: Noms des colonnes de la matrice
+            matrix: Tableau (réponses x champs) de notes
+            decimals: Nombre de décimales conservées
+        """
+        correlations, _ = cls.pairwise_complete(matrix)
+        rows, cols = np.triu_indices(len(fields), k=1)
+        values = correlations[rows, cols]
+        defined = ~np.isnan(values)
+
+        return {
+            f"{fields[i]}_vs_{fields[j]}": round(float(value), decimals)
+            for i, j, value in zip(rows[defined], cols[defined], values[defined])
+        }
+
+    @classmethod
+    def matrix(cls, fields: List[str], matrix: np.ndarray, decimals: int = 2) -> Dict[str, object]:
+        """
+        Retourne la matrice complète sérialisable (None pour les paires non définies)
+
+        Args:
+            fields: Noms des colonnes de la matrice
+            matrix: Tableau (réponses x champs) de notes
+            decimals: Nombre de décimales conservées
+        """
+        correlations, observations = cls.pairwise_complete(matrix)
+        rounded = np.round(correlations, decimals)
+
+        return {
+            'fields': list(fields),
+            'matrix': [[None if np.isnan(value) else float(value) for value in row] for row in rounded],
+            'observations': observations.tolist()
+        }
@@ -0,0 +1,355 @@
+import os
+import re
+import queue
+import threading
+import logging
+from types import SimpleNamespace
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from src.models.hotel import Hotel, SatisfactionResponse
+from src.models.statistics import HotelStatsRollup
+
+logger = logging.getLogger(__name__)
+
+class _ChunkWriter:
+    """Fichier en écriture seule transmettant le classeur par blocs à une file bornée"""
+
+    def __init__(self, chunks, cancelled, chunk_size):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer.extend(data)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _put(self, item):
+        # Attente bornée: le client peut se déconnecter pendant l'écriture
+        while True:
+            if self.cancelled.is_set():
+                raise IOError("Export interrompu par le client")
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+class ExcelExportService:
+    """Exports Excel en flux (openpyxl write-only), à mémoire bornée et sans fichier temporaire conservé"""
+
+    MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    # Nombre de réponses lues par aller-retour avec la base
+    BATCH_SIZE = 1000
+
+    # Taille des blocs transmis au client et nombre de blocs en attente
+    CHUNK_SIZE = 64 * 1024
+    MAX_PENDING_CHUNKS = 16
+
+    # Colonnes de l'onglet des données: (en-tête, colonne source)
+    RESPONSE_COLUMNS = [
+        ('Date de soumission', 'submission_date'),
+        ('Nom du client', 'client_name'),
+        ('Email du client', 'client_email'),
+        ('Note globale', 'overall_rating'),
+        ('Hébergement', 'accommodation_rating'),
+        ('Service', 'service_rating'),
+        ('Propreté', 'cleanliness_rating'),
+        ('Restauration', 'food_rating'),
+        ('Emplacement', 'location_rating'),
+        ('Rapport qualité-prix', 'value_rating'),
+        ('Recommandation', 'would_recommend'),
+        ('Commentaires', 'comments')
+    ]
+
+    # En-têtes des onglets par hôtel du rapport global (mêmes colonnes que RESPONSE_COLUMNS)
+    GLOBAL_RESPONSE_HEADERS = [
+        'Date', 'Client', 'Email', 'Note globale', 'Hébergement', 'Service', 'Propreté',
+        'Restauration', 'Emplacement', 'Qualité-prix', 'Recommandation', 'Commentaires'
+    ]
+
+    SUMMARY_HEADERS = [
+        'Hôtel', 'Localisation', 'Nombre de réponses', 'Note moyenne', 'Taux de recommandation (%)',
+        'Hébergement', 'Service', 'Propreté', 'Restauration', 'Emplacement', 'Qualité-prix'
+    ]
+
+    # Contraintes Excel sur les noms d'onglets
+    SHEET_NAME_MAX_LENGTH = 31
+    SHEET_NAME_INVALID_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+    def __init__(self, db):
+        self.db = db
+
+    def stream_hotel_workbook(self, hotel_id, stats=None, progress=None):
+        """
+        Génère le classeur d'un hôtel (onglets Données et Statistiques) bloc par bloc
+
+        Args:
+            hotel_id: Identifiant de l'hôtel
+            stats: Statistiques de l'hôtel (onglet Statistiques omis si absentes)
+            progress: Fonction appelée avec le nombre de réponses écrites, tous les BATCH_SIZE
+
+        Yields:
+            Blocs d'octets du fichier .xlsx
+        """
+        workbook = Workbook(write_only=True)
+        try:
+            data_sheet = workbook.create_sheet('Données')
+            self.write_rows(data_sheet, [label for label, _ in self.RESPONSE_COLUMNS], self._with_progress(self.response_rows(hotel_id), progress))
+
+            if stats:
+                stats_sheet = workbook.create_sheet('Statistiques')
+                self.write_rows(stats_sheet, ['Métrique', 'Valeur'], self._statistics_rows(stats))
+
+            yield from self.stream_workbook(workbook)
+        finally:
+            self.discard_workbook(workbook)
+
+    def stream_global_workbook(self, progress=None):
+        """
+        Génère le rapport global (synthèse + un onglet par hôtel) en un seul parcours ordonné
+        des réponses jointes aux hôtels
+
+        Args:
+            progress: Fonction appelée avec le nombre de réponses écrites, tous les BATCH_SIZE
+
+        Yields:
+            Blocs d'octets du fichier .xlsx
+        """
+        workbook = Workbook(write_only=True)
+        try:
+            # Créé en premier pour rester le premier onglet, rempli à la fin du parcours
+            summary_sheet = workbook.create_sheet('Synthèse')
+            used_names = {'synthèse'}
+            summary_rows = []
+
+            hotel_id = sheet = counters = None
+            for row in self._with_progress(self._global_scan(), progress):
+                if row.hotel_id != hotel_id:
+                    if counters is not None:
+                        summary_rows.append(self._summary_row(hotel, counters))
+
+                    hotel_id = row.hotel_id
+                    hotel = SimpleNamespace(name=row.hotel_name, location=row.hotel_location)
+                    counters = self._empty_counters()
+                    sheet = None
+
+                if row.response_id is None:
+                    continue
+
+                if sheet is None:
+                    sheet = workbook.create_sheet(self.unique_sheet_name(row.hotel_name, used_names))
+                    self.write_rows(sheet, self.GLOBAL_RESPONSE_HEADERS, [])
+
+                values = row[3:-1]
+                self._accumulate(counters, values)
+                sheet.append(self.format_response_row(values, '%Y-%m-%d'))
+
+            if counters is not None:
+                summary_rows.append(self._summary_row(hotel, counters))
+
+            self.write_rows(summary_sheet, self.SUMMARY_HEADERS, summary_rows)
+
+            yield from self.stream_workbook(workbook)
+        finally:
+            self.discard_workbook(workbook)
+
+    def unique_sheet_name(self, name, used_names):
+        """
+        Nom d'onglet valide pour Excel (31 caractères, sans []:*?/\\) et unique sans tenir compte de la casse
+
+        Args:
+            name: Nom souhaité (nom de l'hôtel)
+            used_names: Noms déjà attribués, en minuscules (complété par cette méthode)
+        """
+        base = self.SHEET_NAME_INVALID_CHARS.sub('_', name or '').strip().strip("'") or 'Hôtel'
+        candidate = base[:self.SHEET_NAME_MAX_LENGTH]
+
+        suffix = 2
+        while candidate.lower() in used_names:
+            marker = f' ({suffix})'
+            candidate = base[:self.SHEET_NAME_MAX_LENGTH - len(marker)].rstrip() + marker
+            suffix += 1
+
+        used_names.add(candidate.lower())
+        return candidate
+
+    def response_rows(self, hotel_id, date_format='%Y-%m-%d %H:%M:%S'):
+        """Lignes formatées des réponses d'un hôtel, lues par lots (curseur serveur)"""
+        columns = [getattr(SatisfactionResponse, column) for _, column in self.RESPONSE_COLUMNS]
+        query = self.db.session.query(*columns).filter(
+            SatisfactionResponse.hotel_id == hotel_id
+        ).order_by(SatisfactionResponse.id).execution_options(yield_per=self.BATCH_SIZE)
+
+        for row in query:
+            yield self.format_response_row(row, date_format)
+
+    def format_response_row(self, row, date_format='%Y-%m-%d %H:%M:%S'):
+        """Met en forme une ligne (colonnes dans l'ordre de RESPONSE_COLUMNS)"""
+        (submission_date, client_name, client_email, overall, accommodation, service,
+         cleanliness, food, location, value, would_recommend, comments) = row
+
+        return [
+            submission_date.strftime(date_format) if submission_date else '',
+            client_name or '',
+            client_email or '',
+            overall or '',
+            accommodation or '',
+            service or '',
+            cleanliness or '',
+            food or '',
+            location or '',
+            value or '',
+            'Oui' if would_recommend else 'Non' if would_recommend is not None else '',
+            comments or ''
+        ]
+
+    def write_rows(self, sheet, headers, rows):
+        """Écrit un en-tête en gras puis les lignes dans un onglet en écriture seule"""
+        header_font = Font(bold=True)
+        header_cells = []
+        for label in headers:
+            cell = WriteOnlyCell(sheet, value=label)
+            cell.font = header_font
+            header_cells.append(cell)
+        sheet.append(header_cells)
+
+        for row in rows:
+            sheet.append(row)
+
+    def stream_workbook(self, workbook):
+        """
+        Compresse le classeur dans un thread et transmet l'archive au fur et à mesure
+
+        Les onglets en écriture seule sont déjà sur disque (fichiers temporaires d'openpyxl,
+        supprimés à la sauvegarde); seule l'archive zip en cours de production transite en mémoire.
+        """
+        chunks = queue.Queue(maxsize=self.MAX_PENDING_CHUNKS)
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            writer = _ChunkWriter(chunks, cancelled, self.CHUNK_SIZE)
+            try:
+                workbook.save(writer)
+                writer.flush()
+                writer._put(done)
+            except Exception as e:
+                if not cancelled.is_set():
+                    logger.error(f"Erreur lors de l'écriture du classeur Excel: {e}")
+                    chunks.put(e)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            thread.join()
+
+    def discard_workbook(self, workbook):
+        """Supprime les fichiers temporaires d'onglets laissés par un export interrompu"""
+        for sheet in workbook.worksheets:
+            writer = getattr(sheet, '_writer', None)
+            if writer is not None and isinstance(writer.out, str) and os.path.exists(writer.out):
+                writer.close()
+                writer.cleanup()
+
+    def _with_progress(self, rows, progress):
+        """Transmet les lignes en signalant l'avancement tous les BATCH_SIZE"""
+        if progress is None:
+            yield from rows
+            return
+
+        count = 0
+        for row in rows:
+            yield row
+            count += 1
+            if count % self.BATCH_SIZE == 0:
+                progress(count)
+        progress(count)
+
+    def _global_scan(self):
+        """Parcours unique des hôtels et de leurs réponses, ordonné par hôtel (jointure externe)"""
+        columns = [getattr(SatisfactionResponse, column) for _, column in self.RESPONSE_COLUMNS]
+        return self.db.session.query(
+            Hotel.id.label('hotel_id'),
+            Hotel.name.label('hotel_name'),
+            Hotel.location.label('hotel_location'),
+            *columns,
+            SatisfactionResponse.id.label('response_id')
+        ).outerjoin(
+            SatisfactionResponse, SatisfactionResponse.hotel_id == Hotel.id
+        ).order_by(Hotel.id, SatisfactionResponse.id).execution_options(yield_per=self.BATCH_SIZE)
+
+    def _empty_counters(self):
+        """Compteurs d'un hôtel, nommés comme les colonnes d'agrégat des statistiques"""
+        return {field: 0 for field in HotelStatsRollup.counter_fields()}
+
+    def _accumulate(self, counters, values):
+        """Ajoute une réponse (colonnes dans l'ordre de RESPONSE_COLUMNS) aux compteurs"""
+        counters['total_responses'] += 1
+        for (_, column), value in zip(self.RESPONSE_COLUMNS, values):
+            if value is None:
+                continue
+            if column in HotelStatsRollup.RATING_FIELDS:
+                counters[f'{column}_sum'] += value
+                counters[f'{column}_count'] += 1
+            elif column == 'would_recommend':
+                counters['recommend_count'] += 1
+                counters['recommend_yes'] += 1 if value else 0
+
+    def _summary_row(self, hotel, counters):
+        """Ligne de synthèse d'un hôtel à partir de ses compteurs (moyennes arrondies à une décimale)"""
+        def average(field):
+            count = counters[f'{field}_count']
+            return round(counters[f'{field}_sum'] / count, 1) if count else 0
+
+        recommend_count = counters['recommend_count']
+        return [
+            hotel.name,
+            hotel.location or '',
+            counters['total_responses'],
+            average('overall_rating'),
+            round(counters['recommend_yes'] / recommend_count * 100, 1) if recommend_count else 0,
+            average('accommodation_rating'),
+            average('service_rating'),
+            average('cleanliness_rating'),
+            average('food_rating'),
+            average('location_rating'),
+            average('value_rating')
+        ]
+
+    def _statistics_rows(self, stats):
+        """Lignes de l'onglet Statistiques"""
+        categories = stats['category_averages']
+        return [
+            ['Nombre total de réponses', stats['total_responses']],
+            ['Note moyenne globale', stats['average_overall_rating']],
+            ['Taux de recommandation (%)', stats['recommendation_rate']],
+            ['Réponses ce mois', stats['monthly_responses']],
+            ['', ''],
+            ['Moyennes par catégorie', ''],
+            ['Hébergement', categories.get('accommodation_rating', 0)],
+            ['Service', categories.get('service_rating', 0)],
+            ['Propreté', categories.get('cleanliness_rating', 0)],
+            ['Restauration', categories.get('food_rating', 0)],
+            ['Emplacement', categories.get('location_rating', 0)],
+            ['Rapport qualité-prix', categories.get('value_rating', 0)]
+        ]
@@ -0,0 +1,256 @@
+"""
+Correspondance déclarative entre les champs des formulaires Tally et ceux de l'application
+Le schéma est compilé une seule fois en table de recherche sur clés normalisées,
+avec des convertisseurs précompilés par type de champ
+"""
+
+import re
+import logging
+import unicodedata
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Schéma des champs: alias Tally (par ordre de priorité), type de valeur et section du questionnaire
+# Les alias sont comparés après normalisation (casse, accents, ponctuation ignorés)
+# Les notes par section sont stockées sous leur code (table response_ratings): un code ne doit jamais être réattribué
+FIELD_SCHEMA = {
+    # Identité
+    'client_name': {'aliases': ['nom', 'name', 'client_name'], 'type': 'text'},
+    'client_email': {'aliases': ['email', 'e-mail', 'client_email'], 'type': 'text'},
+    'departure_airport': {'aliases': ['aeroport_depart'], 'type': 'text'},
+    'travel_agency': {'aliases': ['agence_voyages'], 'type': 'text'},
+    'postal_code': {'aliases': ['code_postal'], 'type': 'text'},
+    'departure_date': {'aliases': ['date_depart'], 'type': 'text'},
+    'trip_duration': {
+        'aliases': ['duree_voyage'], 'type': 'integer',
+        'choices': {'7 jours': 7, '14 jours': 14, 'Autres': None}
+    },
+    'number_travelers': {'aliases': ['nombre_voyageurs'], 'type': 'integer'},
+
+    # Appréciations globales
+    'overall_rating': {
+        'aliases': ['note_globale', 'overall_rating', 'satisfaction_globale', 'appreciation_globale_vacances'],
+        'type': 'rating'
+    },
+    'accommodation_rating': {'aliases': ['hebergement', 'accommodation', 'logement'], 'type': 'rating'},
+    'service_rating': {'aliases': ['service', 'service_client'], 'type': 'rating'},
+    'cleanliness_rating': {'aliases': ['proprete', 'cleanliness', 'nettoyage'], 'type': 'rating'},
+    'food_rating': {'aliases': ['restauration', 'food', 'nourriture'], 'type': 'rating'},
+    'location_rating': {'aliases': ['emplacement', 'location', 'localisation'], 'type': 'rating'},
+    'value_rating': {'aliases': ['rapport_qualite_prix', 'value', 'prix'], 'type': 'rating'},
+    'conformity_rating': {'aliases': ['conformite_prestations_brochure'], 'type': 'rating', 'section': 'global', 'code': 1},
+    'would_recommend': {
+        'aliases': ['recommandation', 'recommend', 'recommande', 'recommanderiez_vous_voyage'],
+        'type': 'boolean'
+    },
+    'comments': {'aliases': ['commentaires', 'comments', 'remarques'], 'type': 'text'},
+
+    # Transports
+    'flight_comfort_rating': {'aliases': ['aerien_accueil_confort'], 'type': 'rating', 'section': 'transport', 'code': 2},
+    'flight_punctuality_rating': {'aliases': ['aerien_ponctualite'], 'type': 'rating', 'section': 'transport', 'code': 3},
+    'shuttle_safety_rating': {'aliases': ['navette_securite'], 'type': 'rating', 'section': 'transport', 'code': 4},
+    'shuttle_driver_rating': {'aliases': ['navette_conducteur'], 'type': 'rating', 'section': 'transport', 'code': 5},
+    'shuttle_comfort_rating': {'aliases': ['navette_confort_proprete'], 'type': 'rating', 'section': 'transport', 'code': 6},
+
+    # Hébergement
+    'accommodation_welcome_rating': {'aliases': ['hebergement_accueil'], 'type': 'rating', 'section': 'accommodation', 'code': 7},
+    'environment_rating': {'aliases': ['cadre_environnement'], 'type': 'rating', 'section': 'accommodation', 'code': 8},
+    'common_areas_cleanliness_rating': {'aliases': ['proprete_parties_communes'], 'type': 'rating', 'section': 'accommodation', 'code': 9},
+    'restaurant_setting_rating': {'aliases': ['cadre_restaurants'], 'type': 'rating', 'section': 'accommodation', 'code': 10},
+    'food_quality_rating': {'aliases': ['qualite_variete_plats'], 'type': 'rating', 'section': 'accommodation', 'code': 11},
+
+    # Chambres
+    'room_cleanliness_rating': {'aliases': ['chambres_proprete'], 'type': 'rating', 'section': 'room', 'code': 12},
+    'room_comfort_rating': {'aliases': ['chambres_confort'], 'type': 'rating', 'section': 'room', 'code': 13},
+    'room_size_rating': {'aliases': ['chambres_taille'], 'type': 'rating', 'section': 'room', 'code': 14},
+    'bathroom_rating': {'aliases': ['chambres_salle_bain'], 'type': 'rating', 'section': 'room', 'code': 15},
+
+    # Piscine
+    'pool_facilities_rating': {'aliases': ['piscine_amenagements'], 'type': 'rating', 'section': 'pool', 'code': 16},
+    'pool_hygiene_rating': {'aliases': ['piscine_hygiene'], 'type': 'rating', 'section': 'pool', 'code': 17},
+    'pool_safety_rating': {'aliases': ['piscine_securite'], 'type': 'rating', 'section': 'pool', 'code': 18},
+
+    # Animation
+    'sports_equipment_rating': {'aliases': ['equipements_sportifs'], 'type': 'rating', 'section': 'animation', 'code': 19},
+    'evening_entertainment_rating': {'aliases': ['animation_soiree'], 'type': 'rating', 'section': 'animation', 'code': 20},
+    'activities_variety_rating': {'aliases': ['variete_activites'], 'type': 'rating', 'section': 'animation', 'code': 21},
+    'animation_team_rating': {'aliases': ['convivialite_equipe_animation'], 'type': 'rating', 'section': 'animation', 'code': 22},
+    'children_activities_rating': {'aliases': ['activites_enfants'], 'type': 'rating', 'section': 'animation', 'code': 23},
+    'day_entertainment_rating': {'aliases': ['animation_journee'], 'type': 'rating', 'section': 'animation', 'code': 24},
+
+    # Équipes
+    'arrival_assistant_rating': {'aliases': ['assistant_aeroport_arrivee'], 'type': 'rating', 'section': 'team', 'code': 25},
+    'departure_assistant_rating': {'aliases': ['assistant_aeroport_depart'], 'type': 'rating', 'section': 'team', 'code': 26},
+    'info_meeting_rating': {'aliases': ['representant_reunion_info'], 'type': 'rating', 'section': 'team', 'code': 27},
+    'representative_presence_rating': {'aliases': ['representant_presence_convivialite'], 'type': 'rating', 'section': 'team', 'code': 28},
+    'needs_anticipation_rating': {'aliases': ['representant_anticipation_besoins'], 'type': 'rating', 'section': 'team', 'code': 29},
+    'reactivity_solutions_rating': {'aliases': ['representant_reactivite_solutions'], 'type': 'rating', 'section': 'team', 'code': 30},
+
+    # Excursions
+    'excursions_quality_rating': {'aliases': ['excursions_qualite'], 'type': 'rating', 'section': 'excursions', 'code': 31},
+    'excursions_transport_rating': {'aliases': ['excursions_transport'], 'type': 'rating', 'section': 'excursions', 'code': 32},
+    'excursions_guides_rating': {'aliases': ['excursions_guides'], 'type': 'rating', 'section': 'excursions', 'code': 33},
+    'excursions_food_rating': {'aliases': ['excursions_restauration'], 'type': 'rating', 'section': 'excursions', 'code': 34},
+
+    # Profil voyageur
+    'travel_type': {
+        'aliases': ['vous_voyagez'], 'type': 'choice',
+        'choices': {'En solo': 'solo', 'En couple sans enfant': 'couple', 'En famille': 'family', 'Entre amis': 'friends'}
+    },
+    'age_group': {
+        'aliases': ['ages'], 'type': 'choice',
+        'choices': {'18-30': '18-30', '31-40': '31-40', '41-50': '41-50', '51-60': '51-60', '60 et plus': '60+'}
+    },
+    'previous_operators': {'aliases': ['tour_operateurs'], 'type': 'text'},
+    'trip_preparation': {'aliases': ['preparation_voyage'], 'type': 'text'},
+    'additional_comments': {'aliases': ['votre_avis_compte'], 'type': 'text'}
+}
+
+# Note au format "4", "4.5", "4,5", "4 étoiles" ou "4/5" (ramenée sur 5 si le barème diffère)
+RATING_PATTERN = re.compile(r'(\d+(?:[.,]\d+)?)(?:\s*/\s*(\d+))?')
+INTEGER_PATTERN = re.compile(r'\d+')
+
+TRUE_VALUES = frozenset(['oui', 'yes', 'true', '1', 'recommande'])
+
+@lru_cache(maxsize=4096)
+def normalize_key(key):
+    """Clé normalisée: minuscules, sans accents, ponctuation et espaces remplacés par '_'"""
+    text = unicodedata.normalize('NFKD', key)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', '_', text).strip('_')
+
+def to_text(value):
+    return value
+
+@lru_cache(maxsize=1024)
+def parse_rating(text):
+    """Note d'un libellé ("4 étoiles", "4/5", "8/10" -> 4.0); libellés peu variés, d'où le cache"""
+    match = RATING_PATTERN.search(text)
+    if not match:
+        logger.warning(f"Impossible de convertir la note: {text}")
+        return None
+    rating = float(match.group(1).replace(',', '.'))
+    scale = match.group(2)
+    if scale and int(scale) not in (0, 5):
+        rating = round(rating * 5 / int(scale), 2)
+    return rating
+
+def to_rating(value):
+    """Convertit une note en float"""
+    if isinstance(value, str):
+        return parse_rating(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    logger.warning(f"Impossible de convertir la note: {value}")
+    return None
+
+def to_boolean(value):
+    """Convertit une réponse oui/non en booléen"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value == 1
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return None
+
+def to_integer(value):
+    """Convertit un nombre ("14 jours" -> 14)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = INTEGER_PATTERN.search(value)
+        if match:
+            return int(match.group(0))
+    return None
+
+CONVERTERS = {
+    'text': to_text,
+    'rating': to_rating,
+    'boolean': to_boolean,
+    'integer': to_integer,
+    'choice': to_text
+}
+
+class FieldMapping:
+    """Schéma de champs compilé: une recherche par clé de réponse, quel que soit le nombre d'alias"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.fields = list(schema)
+        self.sections = {}
+        self.rating_codes = {}
+        self._lookup = {}
+        self._converters = {}
+
+        for field, spec in schema.items():
+            converter = CONVERTERS[spec['type']]
+            choices = spec.get('choices')
+            if choices:
+                converter = self._with_choices(converter, choices)
+            self._converters[field] = converter
+
+            if spec.get('section'):
+                self.sections.setdefault(spec['section'], []).append(field)
+            if spec.get('code'):
+                if spec['code'] in self.rating_codes.values():
+                    raise ValueError(f"Code en double dans le schéma: {spec['code']}")
+                self.rating_codes[field] = spec['code']
+
+            for priority, alias in enumerate(spec['aliases']):
+                key = normalize_key(alias)
+                if key in self._lookup:
+                    raise ValueError(f"Alias en double dans le schéma: {alias}")
+                # Rang: ordre de l'alias dans le schéma, une clé exacte passant avant une clé normalisée
+                self._lookup[key] = (field, priority * 2)
+
+    def extract(self, responses, fields=None):
+        """
+        Extrait et convertit les champs connus des réponses d'un formulaire
+
+        Args:
+            responses: Réponses du formulaire (clé Tally -> valeur)
+            fields: Champs à conserver (tous les champs présents si None)
+
+        Returns:
+            Dict {champ: valeur convertie}, limité aux champs présents dans les réponses
+        """
+        matches = {}
+        lookup = self._lookup
+        for key, value in responses.items():
+            if not isinstance(key, str):
+                continue
+            match = lookup.get(key)
+            if match is not None:
+                field, rank = match
+            else:
+                match = lookup.get(normalize_key(key))
+                if match is None:
+                    continue
+                field, rank = match[0], match[1] + 1
+            # Plusieurs alias présents: le mieux classé l'emporte
+            current = matches.get(field)
+            if current is None or rank < current[0]:
+                matches[field] = (rank, value)
+
+        converters = self._converters
+        extracted = {}
+        for field, (_, value) in matches.items():
+            if fields is not None and field not in fields:
+                continue
+            extracted[field] = converters[field](value) if value is not None else None
+        return extracted
+
+    def _with_choices(self, converter, choices):
+        """Convertisseur appliquant d'abord les libellés connus du questionnaire"""
+        def convert(value):
+            if isinstance(value, str) and value in choices:
+                return choices[value]
+            return converter(value)
+        return convert
+
+# Schéma partagé par TallyService et TallyWebhookProcessor
+field_mapping = FieldMapping(FIELD_SCHEMA)
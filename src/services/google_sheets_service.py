@@ -114,6 +114,58 @@ class GoogleSheetsService:
         except HttpError as e:
             logger.error(f"Erreur lors de la personnalisation de la feuille: {e}")
     
+    # Plage des réponses dans la feuille (onglet "Données")
+    RESPONSE_RANGE = 'Données!A:L'
+    
+    @staticmethod
+    def response_row(response_data):
+        """Ligne de la feuille pour une réponse (valeurs sérialisables en JSON)"""
+        submission_date = response_data.get('submission_date')
+        if hasattr(submission_date, 'strftime'):
+            submission_date = submission_date.strftime('%Y-%m-%d %H:%M:%S')
+        
+        return [
+            submission_date or '',
+            response_data.get('client_name') or '',
+            response_data.get('client_email') or '',
+            response_data.get('overall_rating', ''),
+            response_data.get('accommodation_rating', ''),
+            response_data.get('service_rating', ''),
+            response_data.get('cleanliness_rating', ''),
+            response_data.get('food_rating', ''),
+            response_data.get('location_rating', ''),
+            response_data.get('value_rating', ''),
+            'Oui' if response_data.get('would_recommend') else 'Non',
+            response_data.get('comments') or ''
+        ]
+    
+    def append_rows(self, sheet_id, rows):
+        """
+        Ajoute plusieurs lignes à la feuille en un seul appel (HttpError propagée à l'appelant)
+        
+        Returns:
+            Nombre de lignes ajoutées
+        """
+        result = self.service.spreadsheets().values().append(
+            spreadsheetId=sheet_id,
+            range=self.RESPONSE_RANGE,
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': rows}
+        ).execute()
+        
+        return result.get('updates', {}).get('updatedRows', len(rows))
+    
+    def read_rows(self, sheet_id):
+        """Lignes de réponses de la feuille, valeurs non formatées (HttpError propagée à l'appelant)"""
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=sheet_id,
+            range=self.RESPONSE_RANGE,
+            valueRenderOption='UNFORMATTED_VALUE'
+        ).execute()
+        
+        return result.get('values', [])
+    
     def add_response_to_sheet(self, sheet_id, response_data):
         """Ajoute une nouvelle réponse à la feuille Google Sheets"""
         if not self.service:
@@ -121,34 +173,7 @@ class GoogleSheetsService:
             return False
         
         try:
-            # Préparer les données à insérer
-            values = [
-                response_data.get('submission_date', ''),
-                response_data.get('client_name', ''),
-                response_data.get('client_email', ''),
-                response_data.get('overall_rating', ''),
-                response_data.get('accommodation_rating', ''),
-                response_data.get('service_rating', ''),
-                response_data.get('cleanliness_rating', ''),
-                response_data.get('food_rating', ''),
-                response_data.get('location_rating', ''),
-                response_data.get('value_rating', ''),
-                'Oui' if response_data.get('would_recommend') else 'Non',
-                response_data.get('comments', '')
-            ]
-            
-            # Ajouter la ligne à la feuille
-            body = {
-                'values': [values]
-            }
-            
-            result = self.service.spreadsheets().values().append(
-                spreadsheetId=sheet_id,
-                range='Données!A:L',  # Supposant que les données sont dans l'onglet "Données"
-                valueInputOption='RAW',
-                body=body
-            ).execute()
-            
+            self.append_rows(sheet_id, [self.response_row(response_data)])
             logger.info(f"Réponse ajoutée à la feuille {sheet_id}")
             return True
             
@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from collections import namedtuple
+from src.models.hotel import Hotel
+
+logger = logging.getLogger(__name__)
+
+# Instantané des champs d'un hôtel utiles à l'enregistrement d'une réponse
+ResolvedHotel = namedtuple('ResolvedHotel', ['id', 'name', 'google_sheet_id'])
+
+# Identifiant de formulaire dans une URL Tally (https://tally.so/r/<formId>, /forms/, /embed/)
+FORM_ID_PATTERN = re.compile(r'tally\.so/(?:r|forms|embed)/([A-Za-z0-9_-]+)', re.IGNORECASE)
+
+class HotelResolver:
+    """
+    Index en mémoire des hôtels destinataires des webhooks Tally
+
+    Associe l'identifiant d'hôtel, l'identifiant de formulaire Tally (extrait de tally_form_url)
+    et les clés d'hôtel des champs cachés (identifiant ou nom) à un instantané de l'hôtel:
+    la résolution ne fait aucun aller-retour avec la base.
+    """
+
+    # Champs cachés Tally pouvant désigner l'hôtel
+    HIDDEN_FIELDS = ['hotel_id', 'hotel', 'hotel_key', 'hotel_code']
+
+    # Rechargement périodique (hôtels modifiés par un autre processus)
+    REFRESH_INTERVAL = float(os.getenv('HOTEL_RESOLVER_REFRESH_SECONDS', 300))
+
+    # Rechargement anticipé sur un formulaire inconnu, au plus une fois par intervalle
+    MISS_RELOAD_INTERVAL = 30.0
+
+    def __init__(self):
+        self._by_id = None
+        self._by_form = {}
+        self._by_key = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def resolve(self, webhook_data, hotel_id=None):
+        """
+        Identifie l'hôtel d'un webhook: paramètre hotel_id de l'URL, champ caché, puis formulaire
+
+        Returns:
+            ResolvedHotel, ou None si aucun hôtel ne correspond
+        """
+        if self._by_id is None or time.monotonic() - self._loaded_at > self.REFRESH_INTERVAL:
+            self.refresh()
+
+        hotel = self._lookup(webhook_data, hotel_id)
+        if hotel is None and time.monotonic() - self._loaded_at > self.MISS_RELOAD_INTERVAL:
+            # Hôtel éventuellement créé par un autre processus
+            self.refresh()
+            hotel = self._lookup(webhook_data, hotel_id)
+        return hotel
+
+    def refresh(self):
+        """Recharge l'index depuis la table des hôtels"""
+        rows = Hotel.query.with_entities(
+            Hotel.id, Hotel.name, Hotel.tally_form_url, Hotel.google_sheet_id
+        ).all()
+
+        by_id = {}
+        by_form = {}
+        by_key = {}
+        for hotel_id, name, tally_form_url, google_sheet_id in rows:
+            hotel = ResolvedHotel(hotel_id, name, google_sheet_id)
+            by_id[hotel_id] = hotel
+
+            form_id = self.form_id(tally_form_url)
+            if form_id:
+                by_form[form_id] = None if form_id in by_form else hotel
+
+            key = self.normalize_key(name)
+            if key:
+                # Nom partagé par plusieurs hôtels: clé ambiguë, ignorée
+                by_key[key] = None if key in by_key else hotel
+
+        with self._lock:
+            self._by_id = by_id
+            self._by_form = {form: hotel for form, hotel in by_form.items() if hotel is not None}
+            self._by_key = {key: hotel for key, hotel in by_key.items() if hotel is not None}
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Index des hôtels rechargé: {len(by_id)} hôtel(s), {len(self._by_form)} formulaire(s)")
+
+    def stats(self):
+        """Taille de l'index"""
+        return {
+            'hotels': len(self._by_id or {}),
+            'forms': len(self._by_form),
+            'keys': len(self._by_key)
+        }
+
+    @staticmethod
+    def form_id(tally_form_url):
+        """Identifiant du formulaire Tally d'une URL (None si l'URL n'est pas reconnue)"""
+        if not tally_form_url:
+            return None
+        match = FORM_ID_PATTERN.search(tally_form_url)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def normalize_key(value):
+        """Clé d'hôtel normalisée: minuscules, sans accents ni espaces superflus"""
+        if value is None:
+            return None
+        text = unicodedata.normalize('NFKD', str(value))
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        return ' '.join(text.lower().split()) or None
+
+    def _lookup(self, webhook_data, hotel_id):
+        by_id, by_form, by_key = self._by_id, self._by_form, self._by_key
+
+        # Stratégie 1: Paramètre hotel_id de l'URL du webhook
+        if hotel_id is not None:
+            hotel = by_id.get(self._as_int(hotel_id))
+            if hotel is not None:
+                return hotel
+
+        # Stratégie 2: Champ caché du formulaire (identifiant ou nom de l'hôtel)
+        responses = webhook_data.get('data')
+        if isinstance(responses, dict):
+            for field in self.HIDDEN_FIELDS:
+                value = responses.get(field)
+                if value is None:
+                    continue
+                hotel = by_id.get(self._as_int(value)) or by_key.get(self.normalize_key(value))
+                if hotel is not None:
+                    return hotel
+
+        # Stratégie 3: Identifiant du formulaire Tally
+        form_id = webhook_data.get('formId')
+        if form_id:
+            return by_form.get(form_id)
+
+        return None
+
+    @staticmethod
+    def _as_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+# Index partagé par les requêtes du processus
+hotel_resolver = HotelResolver()
@@ -0,0 +1,235 @@
+import os
+import re
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert
+from src.models.hotel import Hotel, SatisfactionResponse
+from src.models.statistics import HotelKeywordFrequency, HotelKeywordBackfill
+from src.models.response_details import ResponseProfile
+
+logger = logging.getLogger(__name__)
+
+# Mots vides français exclus des mots-clés (formes accentuées et désaccentuées)
+KEYWORD_STOPWORDS = {
+    'très', 'tres', 'bien', 'avec', 'pour', 'dans', 'cette', 'tout', 'plus',
+    'mais', 'nous', 'vous', 'elle', 'elles', 'ils', 'leur', 'leurs', 'avons',
+    'avait', 'était', 'etait', 'étaient', 'etaient', 'sont', 'être', 'etre',
+    'avoir', 'fait', 'faire', 'aussi', 'même', 'meme', 'comme', 'encore',
+    'sans', 'sous', 'chez', 'entre', 'donc', 'alors', 'quand', 'ceux', 'celle',
+    'celui', 'ces', 'cela', 'ceci', 'tous', 'toutes', 'toute', 'notre', 'votre',
+    'nos', 'vos', 'peu', 'trop', 'assez', 'car', 'lors', 'depuis', 'pendant',
+    'après', 'apres', 'avant', 'aux', 'des', 'les', 'une', 'qui', 'que', 'quoi'
+}
+
+# Liste complémentaire optionnelle (un mot par ligne)
+_stopwords_file = os.getenv('KEYWORD_STOPWORDS_FILE')
+if _stopwords_file and os.path.exists(_stopwords_file):
+    with open(_stopwords_file, encoding='utf-8') as f:
+        KEYWORD_STOPWORDS |= {line.strip().lower() for line in f if line.strip()}
+
+# Mots alphabétiques; les élisions (l'hôtel) et mots composés sont découpés comme dans l'index plein texte
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+class KeywordService:
+    """Fréquences de mots-clés des commentaires, maintenues à l'ingestion"""
+
+    # Longueur minimale d'un mot-clé
+    MIN_LENGTH = 4
+
+    # Taille des lots lors du remplissage initial
+    BACKFILL_BATCH_SIZE = 2000
+
+    def __init__(self, db):
+        self.db = db
+
+    @classmethod
+    def tokenize(cls, comment):
+        """Découpe un commentaire en mots-clés normalisés"""
+        if not comment:
+            return []
+        words = WORD_PATTERN.findall(comment.lower())
+        return [word for word in words if len(word) >= cls.MIN_LENGTH and word not in KEYWORD_STOPWORDS]
+
+    def record_response(self, response, details=None):
+        """Ajoute les mots-clés d'une nouvelle réponse (commentaires et avis libre des détails), dans la transaction en cours"""
+        if self._seed([response.hotel_id]):
+            # Première écriture pour cet hôtel: fréquences calculées sur tous ses commentaires, réponse incluse
+            return
+
+        terms = Counter(self._terms(response.comments, details))
+        if not terms:
+            return
+
+        month = self._month(response.submission_date)
+        self._upsert([
+            {'hotel_id': response.hotel_id, 'month': month, 'term': term, 'occurrences': count}
+            for term, count in terms.items()
+        ])
+
+    def record_responses(self, rows, details=None):
+        """
+        Ajoute les mots-clés d'un lot de réponses (dictionnaires de colonnes), dans la transaction en cours
+
+        Args:
+            rows: Colonnes des réponses insérées
+            details: Détails des réponses par tally_submission_id (avis libre)
+        """
+        details = details or {}
+        seeded = self._seed({row['hotel_id'] for row in rows})
+
+        counts = Counter()
+        for row in rows:
+            if row['hotel_id'] in seeded:
+                continue
+            month = self._month(row.get('submission_date'))
+            for term in self._terms(row.get('comments'), details.get(row.get('tally_submission_id'))):
+                counts[(row['hotel_id'], month, term)] += 1
+
+        upserts = [
+            {'hotel_id': hotel_id, 'month': month, 'term': term, 'occurrences': count}
+            for (hotel_id, month, term), count in counts.items()
+        ]
+        for start in range(0, len(upserts), self.BACKFILL_BATCH_SIZE):
+            self._upsert(upserts[start:start + self.BACKFILL_BATCH_SIZE])
+
+    def top_keywords(self, hotel_id, days=None, limit=10):
+        """
+        Mots-clés les plus fréquents d'un hôtel
+
+        Args:
+            hotel_id: Identifiant de l'hôtel
+            days: Fenêtre en jours (arrondie au mois entamé), toutes périodes si None
+            limit: Nombre de mots-clés retournés
+
+        Returns:
+            Liste de tuples (mot-clé, occurrences)
+        """
+        total = func.sum(HotelKeywordFrequency.occurrences).label('occurrences')
+        query = self.db.session.query(HotelKeywordFrequency.term, total).filter(
+            HotelKeywordFrequency.hotel_id == hotel_id
+        )
+        if days is not None:
+            query = query.filter(HotelKeywordFrequency.month >= self._month(date.today() - timedelta(days=days)))
+
+        rows = query.group_by(HotelKeywordFrequency.term).order_by(total.desc(), HotelKeywordFrequency.term).limit(limit).all()
+        return [(term, occurrences) for term, occurrences in rows]
+
+    def has_keywords(self, hotel_id):
+        """Indique si la table de fréquences couvre tous les commentaires de cet hôtel (initialisation faite)"""
+        return self.db.session.get(HotelKeywordBackfill, hotel_id) is not None
+
+    def backfill(self):
+        """
+        Recalcule entièrement la table de fréquences depuis les commentaires existants
+
+        Returns:
+            Nombre de commentaires traités
+        """
+        counts, processed = self._count_terms()
+
+        HotelKeywordFrequency.query.delete()
+        HotelKeywordBackfill.query.delete()
+        rows = [
+            {'hotel_id': hotel_id, 'month': month, 'term': term, 'occurrences': count}
+            for (hotel_id, month, term), count in counts.items()
+        ]
+        for start in range(0, len(rows), self.BACKFILL_BATCH_SIZE):
+            self.db.session.execute(HotelKeywordFrequency.__table__.insert(), rows[start:start + self.BACKFILL_BATCH_SIZE])
+
+        now = datetime.utcnow()
+        hotel_ids = [hotel_id for (hotel_id,) in self.db.session.query(Hotel.id)]
+        if hotel_ids:
+            self.db.session.execute(HotelKeywordBackfill.__table__.insert(), [
+                {'hotel_id': hotel_id, 'backfilled_at': now} for hotel_id in hotel_ids
+            ])
+        self.db.session.commit()
+
+        logger.info(f"Fréquences de mots-clés recalculées: {processed} commentaires, {len(rows)} lignes")
+        return processed
+
+    def _seed(self, hotel_ids):
+        """
+        Initialise les fréquences des hôtels pas encore suivis depuis leurs commentaires existants
+        (comme les agrégats de StatsRollupService), dans la transaction en cours
+
+        Returns:
+            Ensemble des hôtels initialisés par cet appel
+        """
+        tracked = {
+            hotel_id for (hotel_id,) in self.db.session.query(HotelKeywordBackfill.hotel_id).filter(
+                HotelKeywordBackfill.hotel_id.in_(hotel_ids)
+            )
+        }
+
+        # Marqueur posé atomiquement: un seul worker initialise un hôtel donné
+        table = HotelKeywordBackfill.__table__
+        seeded = set()
+        for hotel_id in set(hotel_ids) - tracked:
+            if self.db.session.execute(
+                insert(table).values(hotel_id=hotel_id, backfilled_at=datetime.utcnow())
+                .on_conflict_do_nothing().returning(table.c.hotel_id)
+            ).first() is not None:
+                seeded.add(hotel_id)
+
+        if seeded:
+            # Lignes éventuelles écrites avant le marqueur (commentaires partiels): remplacées
+            HotelKeywordFrequency.query.filter(
+                HotelKeywordFrequency.hotel_id.in_(seeded)
+            ).delete(synchronize_session=False)
+
+            counts, processed = self._count_terms(seeded)
+            rows = [
+                {'hotel_id': hotel_id, 'month': month, 'term': term, 'occurrences': count}
+                for (hotel_id, month, term), count in counts.items()
+            ]
+            for start in range(0, len(rows), self.BACKFILL_BATCH_SIZE):
+                self.db.session.execute(HotelKeywordFrequency.__table__.insert(), rows[start:start + self.BACKFILL_BATCH_SIZE])
+            logger.info(f"Fréquences de mots-clés initialisées pour {len(seeded)} hôtel(s): {processed} commentaires")
+        return seeded
+
+    def _count_terms(self, hotel_ids=None):
+        """Compte les mots-clés des commentaires existants par (hôtel, mois, terme)"""
+        counts = Counter()
+        processed = 0
+
+        query = self.db.session.query(
+            SatisfactionResponse.hotel_id,
+            SatisfactionResponse.submission_date,
+            SatisfactionResponse.comments,
+            ResponseProfile.additional_comments
+        ).outerjoin(
+            ResponseProfile, ResponseProfile.response_id == SatisfactionResponse.id
+        ).filter(
+            or_(SatisfactionResponse.comments.isnot(None), ResponseProfile.additional_comments.isnot(None))
+        )
+        if hotel_ids is not None:
+            query = query.filter(SatisfactionResponse.hotel_id.in_(hotel_ids))
+
+        for hotel_id, submission_date, comments, additional_comments in query.execution_options(yield_per=self.BACKFILL_BATCH_SIZE):
+            month = self._month(submission_date)
+            for term in self.tokenize(comments) + self.tokenize(additional_comments):
+                counts[(hotel_id, month, term)] += 1
+            processed += 1
+        return counts, processed
+
+    def _terms(self, comments, details):
+        """Mots-clés des commentaires d'une réponse et de son avis libre (détails Top of Travel)"""
+        return self.tokenize(comments) + self.tokenize((details or {}).get('additional_comments'))
+
+    def _upsert(self, rows):
+        """Incrémente les occurrences (INSERT ... ON CONFLICT DO UPDATE)"""
+        statement = insert(HotelKeywordFrequency.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['hotel_id', 'month', 'term'],
+            set_={'occurrences': HotelKeywordFrequency.__table__.c.occurrences + statement.excluded.occurrences}
+        )
+        self.db.session.execute(statement, rows)
+
+    def _month(self, value):
+        """Premier jour du mois d'une date (mois courant si absente)"""
+        value = value or date.today()
+        if hasattr(value, 'date'):
+            value = value.date()
+        return value.replace(day=1)
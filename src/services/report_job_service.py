@@ -0,0 +1,312 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from src.models.hotel import Hotel, SatisfactionResponse
+from src.models.report_job import ReportJob
+from src.services.analytics_service import AnalyticsService
+from src.services.excel_export_service import ExcelExportService
+from src.services.chart_service import ChartService
+
+logger = logging.getLogger(__name__)
+
+class ReportQueueFull(RuntimeError):
+    """Trop de rapports en attente: la demande doit être renouvelée plus tard"""
+
+class ReportJobService:
+    """
+    File locale de génération des rapports lourds (exports Excel, comparaisons)
+
+    L'état des travaux est conservé dans la table report_jobs, les fichiers produits sur disque.
+    Les rapports sont générés par un pool de threads borné, hors des workers HTTP; l'avancement
+    est tenu en mémoire pour ne pas écrire dans SQLite pendant la lecture des réponses.
+    """
+
+    JOB_TYPES = ['global_excel', 'hotel_excel', 'comparison']
+
+    # Nombre de rapports générés simultanément
+    MAX_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))
+
+    # Nombre maximal de travaux en attente ou en cours
+    MAX_PENDING = int(os.getenv('REPORT_JOB_MAX_PENDING', 20))
+
+    # Durée de conservation des rapports terminés
+    RETENTION_HOURS = int(os.getenv('REPORT_JOB_RETENTION_HOURS', 24))
+
+    # Nettoyage opportuniste lors des mises en file, au plus une fois par intervalle
+    CLEANUP_INTERVAL = timedelta(minutes=10)
+
+    # Identifiant de démarrage du processus (distingue un pid réutilisé après redémarrage)
+    BOOT_ID = uuid.uuid4().hex
+
+    _executor = None
+    _lock = threading.Lock()
+    _progress = {}
+    _last_cleanup = None
+
+    def __init__(self, db, report_dir=None):
+        self.db = db
+        self.report_dir = report_dir or os.getenv(
+            'REPORT_JOB_DIR',
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'reports')
+        )
+
+    def enqueue(self, job_type, params):
+        """
+        Met un rapport en file, ou retourne le travail identique déjà en attente
+
+        Args:
+            job_type: Type de rapport (voir JOB_TYPES)
+            params: Paramètres du rapport (hotel_id, hotel_ids, preset)
+
+        Returns:
+            Tuple (travail, créé)
+        """
+        if job_type not in self.JOB_TYPES:
+            raise ValueError(f"Type de rapport inconnu: {job_type}")
+
+        self._maybe_cleanup()
+
+        params_json = json.dumps(params, sort_keys=True)
+        params_hash = hashlib.sha256(f'{job_type}:{params_json}'.encode('utf-8')).hexdigest()
+
+        with ReportJobService._lock:
+            # Travaux d'un processus arrêté: ni partagés ni comptés dans la file
+            self.reap_orphans()
+
+            # Déduplication: une demande identique non terminée est partagée
+            existing = ReportJob.query.filter(
+                ReportJob.params_hash == params_hash,
+                ReportJob.status.in_(['pending', 'running'])
+            ).first()
+            if existing is not None:
+                return existing, False
+
+            active = ReportJob.query.filter(ReportJob.status.in_(['pending', 'running'])).count()
+            if active >= self.MAX_PENDING:
+                raise ReportQueueFull(f"{active} rapport(s) déjà en file")
+
+            job = ReportJob(
+                id=uuid.uuid4().hex,
+                job_type=job_type,
+                params=params_json,
+                params_hash=params_hash,
+                status='pending',
+                worker_pid=os.getpid(),
+                worker_boot=self.BOOT_ID
+            )
+            self.db.session.add(job)
+            self.db.session.commit()
+
+        app = current_app._get_current_object()
+        self._get_executor().submit(self._run, app, job.id)
+        return job, True
+
+    def get_job(self, job_id):
+        """Retourne un travail par son identifiant (None s'il est inconnu)"""
+        return self.db.session.get(ReportJob, job_id)
+
+    def progress(self, job_id):
+        """Nombre de réponses traitées par un travail en cours (None si inconnu)"""
+        return ReportJobService._progress.get(job_id)
+
+    def cleanup(self, retention_hours=None):
+        """
+        Supprime les rapports terminés depuis plus de retention_hours et leurs fichiers,
+        et marque en échec les travaux interrompus (processus arrêté)
+
+        Returns:
+            Tuple (rapports supprimés, travaux marqués en échec)
+        """
+        retention_hours = self.RETENTION_HOURS if retention_hours is None else retention_hours
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+
+        expired = ReportJob.query.filter(
+            ReportJob.status.in_(['completed', 'failed']),
+            ReportJob.finished_at < cutoff
+        ).all()
+        for job in expired:
+            self._remove_artifact(job)
+            self.db.session.delete(job)
+        self.db.session.commit()
+
+        return len(expired), self.reap_orphans()
+
+    def reap_orphans(self):
+        """
+        Marque en échec les travaux en attente ou en cours dont le processus propriétaire
+        n'existe plus (redémarrage, arrêt d'un worker), quelle que soit leur ancienneté
+
+        Returns:
+            Nombre de travaux marqués en échec
+        """
+        orphans = [
+            job for job in ReportJob.query.filter(ReportJob.status.in_(['pending', 'running']))
+            if not self._owned_by_live_process(job)
+        ]
+        if not orphans:
+            return 0
+
+        for job in orphans:
+            job.status = 'failed'
+            job.error = 'Travail interrompu'
+            job.finished_at = datetime.utcnow()
+        self.db.session.commit()
+
+        logger.warning(f"{len(orphans)} rapport(s) interrompu(s) par l'arrêt de leur processus marqué(s) en échec")
+        return len(orphans)
+
+    # Exécution des travaux
+
+    def _run(self, app, job_id):
+        """Génère un rapport dans un thread du pool"""
+        with app.app_context():
+            job = self.get_job(job_id)
+            if job is None or job.status != 'pending':
+                return
+
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            self.db.session.commit()
+            ReportJobService._progress[job_id] = 0
+
+            try:
+                generator = getattr(self, f'_generate_{job.job_type}')
+                name, mimetype, chunks = generator(job.get_params(), job_id)
+
+                path = os.path.join(self.report_dir, f'{job_id}{os.path.splitext(name)[1]}')
+                size = self._write(path, chunks)
+
+                job.status = 'completed'
+                job.artifact_path = path
+                job.artifact_name = name
+                job.artifact_mimetype = mimetype
+                job.artifact_size = size
+
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération du rapport {job_id}: {e}")
+                self.db.session.rollback()
+                job = self.get_job(job_id)
+                job.status = 'failed'
+                job.error = str(e)
+
+            finally:
+                job.finished_at = datetime.utcnow()
+                self.db.session.commit()
+                ReportJobService._progress.pop(job_id, None)
+
+    def _generate_global_excel(self, params, job_id):
+        if self.db.session.query(Hotel.id).first() is None:
+            raise ValueError('Aucun hôtel trouvé')
+
+        chunks = ExcelExportService(self.db).stream_global_workbook(progress=self._progress_callback(job_id))
+        name = f'HotelSat_Rapport_Global_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return name, ExcelExportService.MIMETYPE, chunks
+
+    def _generate_hotel_excel(self, params, job_id):
+        hotel = self.db.session.get(Hotel, params.get('hotel_id'))
+        if hotel is None:
+            raise ValueError('Hôtel non trouvé')
+        if self.db.session.query(SatisfactionResponse.id).filter_by(hotel_id=hotel.id).first() is None:
+            raise ValueError('Aucune donnée à exporter')
+
+        stats = AnalyticsService(self.db).get_hotel_statistics(hotel.id)
+        chunks = ExcelExportService(self.db).stream_hotel_workbook(
+            hotel.id, stats, progress=self._progress_callback(job_id)
+        )
+        name = f'HotelSat_{hotel.name}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return name, ExcelExportService.MIMETYPE, chunks
+
+    def _generate_comparison(self, params, job_id):
+        comparison_data = AnalyticsService(self.db).get_comparative_analysis(params['hotel_ids'])
+        if not comparison_data:
+            raise ValueError('Erreur lors de la génération du rapport')
+
+        chart_service = ChartService()
+        chart_url = chart_service.chart_url(
+            chart_service.comparison_spec(comparison_data), params.get('preset', 'print')
+        )
+        content = json.dumps({
+            'comparison_data': comparison_data,
+            'comparison_chart': chart_url
+        }, ensure_ascii=False)
+
+        name = f'HotelSat_Comparaison_{datetime.now().strftime("%Y%m%d")}.json'
+        return name, 'application/json', [content.encode('utf-8')]
+
+    def _progress_callback(self, job_id):
+        def report(count):
+            ReportJobService._progress[job_id] = count
+        return report
+
+    # Fichiers et pool
+
+    def _write(self, path, chunks):
+        """Écriture atomique du rapport: un téléchargement ne voit jamais de fichier partiel"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
+
+    def _remove_artifact(self, job):
+        if job.artifact_path:
+            try:
+                os.remove(job.artifact_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Suppression du rapport {job.id} impossible: {e}")
+
+    def _owned_by_live_process(self, job):
+        """Indique si le processus propriétaire d'un travail est toujours en vie"""
+        if job.worker_pid is None:
+            return False
+        if job.worker_pid == os.getpid():
+            return job.worker_boot == self.BOOT_ID
+
+        try:
+            os.kill(job.worker_pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Processus existant d'un autre utilisateur
+            return True
+        return True
+
+    def _maybe_cleanup(self):
+        now = datetime.utcnow()
+        last = ReportJobService._last_cleanup
+        if last is not None and now - last < self.CLEANUP_INTERVAL:
+            return
+        ReportJobService._last_cleanup = now
+
+        try:
+            self.cleanup()
+        except Exception as e:
+            self.db.session.rollback()
+            logger.warning(f"Nettoyage des rapports impossible: {e}")
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=max(cls.MAX_WORKERS, 1),
+                    thread_name_prefix='report-job'
+                )
+            return cls._executor
@@ -0,0 +1,170 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+from src.models.hotel import SatisfactionResponse
+from src.models.statistics import HotelStatsRollup
+
+logger = logging.getLogger(__name__)
+
+class ResponseColumns:
+    """Réponses d'un hôtel stockées en colonnes NumPy (notes, recommandation, dates)"""
+
+    # Colonnes de notes, dans l'ordre de la matrice ratings
+    RATING_FIELDS = HotelStatsRollup.RATING_FIELDS
+
+    def __init__(self, ids, ratings, recommend, submitted_at):
+        self.ids = ids                    # int64
+        self.ratings = ratings            # float64 (n, len(RATING_FIELDS)), NaN si absente
+        self.recommend = recommend        # int8: 1 oui, 0 non, -1 non renseigné
+        self.submitted_at = submitted_at  # datetime64[us], NaT si absente
+
+    @classmethod
+    def columns_query(cls, db, hotel_id):
+        """Requête ne chargeant que les colonnes utiles (pas d'objets ORM)"""
+        columns = [
+            SatisfactionResponse.id,
+            SatisfactionResponse.submission_date,
+            SatisfactionResponse.would_recommend
+        ] + [getattr(SatisfactionResponse, field) for field in cls.RATING_FIELDS]
+        return db.session.query(*columns).filter(SatisfactionResponse.hotel_id == hotel_id)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Construit les colonnes à partir de tuples (id, date, recommandation, notes...)"""
+        if not rows:
+            return cls(
+                np.empty(0, dtype=np.int64),
+                np.empty((0, len(cls.RATING_FIELDS)), dtype=np.float64),
+                np.empty(0, dtype=np.int8),
+                np.empty(0, dtype='datetime64[us]')
+            )
+
+        transposed = list(zip(*rows))
+        ids = np.array(transposed[0], dtype=np.int64)
+        submitted_at = np.array(transposed[1], dtype='datetime64[us]')
+        recommend = np.array([-1 if value is None else int(value) for value in transposed[2]], dtype=np.int8)
+        ratings = np.array(transposed[3:], dtype=np.float64).T.copy()
+        return cls(ids, ratings, recommend, submitted_at)
+
+    @classmethod
+    def from_response(cls, response):
+        """Construit les colonnes d'une seule réponse"""
+        row = (response.id, response.submission_date, response.would_recommend) + tuple(
+            getattr(response, field) for field in cls.RATING_FIELDS
+        )
+        return cls.from_rows([row])
+
+    def appended(self, other):
+        """Retourne de nouvelles colonnes complétées par celles de other"""
+        return ResponseColumns(
+            np.concatenate([self.ids, other.ids]),
+            np.concatenate([self.ratings, other.ratings]),
+            np.concatenate([self.recommend, other.recommend]),
+            np.concatenate([self.submitted_at, other.submitted_at])
+        )
+
+    def rating(self, field):
+        """Colonne des notes d'un champ (NaN pour les valeurs absentes)"""
+        return self.ratings[:, self.RATING_FIELDS.index(field)]
+
+    def matrix(self, fields):
+        """Sous-matrice (réponses x champs) des notes demandées"""
+        return self.ratings[:, [self.RATING_FIELDS.index(field) for field in fields]]
+
+    @property
+    def last_id(self):
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.ratings.nbytes + self.recommend.nbytes + self.submitted_at.nbytes
+
+    def __len__(self):
+        return len(self.ids)
+
+class ResponseColumnCache:
+    """Cache LRU en mémoire des colonnes de réponses par hôtel, borné en octets"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db, hotel_id):
+        """Retourne les colonnes à jour d'un hôtel, construites ou complétées à la demande"""
+        expected = self._expected_count(db, hotel_id)
+
+        with self._lock:
+            columns = self._entries.get(hotel_id)
+            if columns is not None:
+                self._entries.move_to_end(hotel_id)
+
+        if columns is not None and len(columns) == expected:
+            return columns
+
+        if columns is not None and len(columns) < expected:
+            # Nouvelles réponses (éventuellement écrites par un autre worker): ajout incrémental
+            rows = ResponseColumns.columns_query(db, hotel_id).filter(
+                SatisfactionResponse.id > columns.last_id
+            ).order_by(SatisfactionResponse.id).all()
+            columns = columns.appended(ResponseColumns.from_rows(rows))
+            if len(columns) == expected:
+                self._store(hotel_id, columns)
+                return columns
+
+        rows = ResponseColumns.columns_query(db, hotel_id).order_by(SatisfactionResponse.id).all()
+        columns = ResponseColumns.from_rows(rows)
+        self._store(hotel_id, columns)
+        return columns
+
+    def append(self, response):
+        """Ajoute une réponse fraîchement validée aux colonnes de son hôtel si elles sont en cache"""
+        with self._lock:
+            columns = self._entries.get(response.hotel_id)
+
+        if columns is None:
+            return
+        if response.id is None or response.id <= columns.last_id:
+            self.invalidate(response.hotel_id)
+            return
+
+        self._store(response.hotel_id, columns.appended(ResponseColumns.from_response(response)))
+
+    def invalidate(self, hotel_id=None):
+        """Supprime les colonnes d'un hôtel (ou de tous les hôtels) du cache"""
+        with self._lock:
+            if hotel_id is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            elif hotel_id in self._entries:
+                self.total_bytes -= self._entries.pop(hotel_id).nbytes
+
+    def _store(self, hotel_id, columns):
+        """Enregistre des colonnes et évince les hôtels les moins récemment utilisés"""
+        with self._lock:
+            if hotel_id in self._entries:
+                self.total_bytes -= self._entries.pop(hotel_id).nbytes
+
+            if columns.nbytes > self.max_bytes:
+                logger.info(f"Colonnes de l'hôtel {hotel_id} trop volumineuses pour le cache ({columns.nbytes} octets)")
+                return
+
+            self._entries[hotel_id] = columns
+            self.total_bytes += columns.nbytes
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def _expected_count(self, db, hotel_id):
+        """Nombre de réponses attendu, lu dans l'agrégat maintenu si disponible"""
+        rollup = db.session.get(HotelStatsRollup, hotel_id)
+        if rollup is not None:
+            return rollup.total_responses
+        return SatisfactionResponse.query.filter_by(hotel_id=hotel_id).count()
+
+# Cache partagé par les requêtes du processus
+response_cache = ResponseColumnCache(int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
@@ -0,0 +1,63 @@
+import logging
+from src.models.response_details import ResponseRating, ResponseProfile
+from src.services.field_mapping import field_mapping
+
+logger = logging.getLogger(__name__)
+
+class ResponseDetailService:
+    """
+    Enregistrement des notes détaillées et du profil voyageur des réponses Top of Travel
+
+    Les champs détaillés sont séparés des champs principaux par TallyService (clé 'details'
+    des données traitées) puis écrits dans les tables response_ratings et response_profiles.
+    """
+
+    # Champs détaillés retenus à l'extraction
+    FIELDS = frozenset(field_mapping.rating_codes) | frozenset(ResponseProfile.FIELDS)
+
+    def __init__(self, db):
+        self.db = db
+
+    @classmethod
+    def split_details(cls, extracted):
+        """Champs détaillés renseignés d'une extraction (None si aucun)"""
+        details = {
+            field: value for field, value in extracted.items()
+            if field in cls.FIELDS and value is not None
+        }
+        return details or None
+
+    def record(self, response_id, hotel_id, details):
+        """Enregistre les détails d'une réponse dans la transaction en cours (sans la valider)"""
+        self.record_many([(response_id, hotel_id, details)])
+
+    def record_many(self, items):
+        """
+        Enregistre les détails d'un lot de réponses (une requête par table)
+
+        Args:
+            items: Liste de tuples (response_id, hotel_id, détails)
+        """
+        ratings = []
+        profiles = []
+        for response_id, hotel_id, details in items:
+            if not details:
+                continue
+            for field, value in details.items():
+                code = field_mapping.rating_codes.get(field)
+                if code is not None:
+                    ratings.append({
+                        'hotel_id': hotel_id,
+                        'field_code': code,
+                        'response_id': response_id,
+                        'rating': value
+                    })
+
+            profile = {field: details.get(field) for field in ResponseProfile.FIELDS}
+            if any(value is not None for value in profile.values()):
+                profiles.append({'response_id': response_id, 'hotel_id': hotel_id, **profile})
+
+        if ratings:
+            self.db.session.execute(ResponseRating.__table__.insert(), ratings)
+        if profiles:
+            self.db.session.execute(ResponseProfile.__table__.insert(), profiles)
@@ -0,0 +1,285 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from src.models.statistics import HotelStatsRollup, HotelDailyRollup, HotelResponseCount
+from src.services.analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+class StatsRollupService:
+    """Maintient les agrégats de satisfaction par hôtel (hotel_stats_rollup) et par jour (hotel_daily_rollup)"""
+
+    # Colonnes de satisfaction_responses dont la modification rend les agrégats périmés
+    TRACKED_COLUMNS = ['hotel_id', 'submission_date', 'would_recommend'] + HotelStatsRollup.RATING_FIELDS
+
+    # Triggers comptant toutes les écritures sur les réponses, y compris hors ingestion
+    TRIGGERS_DDL = [
+        """
+        CREATE TRIGGER IF NOT EXISTS hotel_response_counts_ai AFTER INSERT ON satisfaction_responses BEGIN
+            INSERT INTO hotel_response_counts(hotel_id, responses, updates) VALUES (new.hotel_id, 1, 0)
+            ON CONFLICT(hotel_id) DO UPDATE SET responses = responses + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS hotel_response_counts_ad AFTER DELETE ON satisfaction_responses BEGIN
+            UPDATE hotel_response_counts SET responses = responses - 1, updates = updates + 1
+            WHERE hotel_id = old.hotel_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS hotel_response_counts_au
+        AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON satisfaction_responses BEGIN
+            UPDATE hotel_response_counts SET responses = responses - 1
+            WHERE hotel_id = old.hotel_id AND old.hotel_id IS NOT new.hotel_id;
+            INSERT INTO hotel_response_counts(hotel_id, responses, updates)
+            VALUES (new.hotel_id, CASE WHEN old.hotel_id IS NOT new.hotel_id THEN 1 ELSE 0 END, 1)
+            ON CONFLICT(hotel_id) DO UPDATE SET responses = responses + excluded.responses, updates = updates + 1;
+            UPDATE hotel_response_counts SET updates = updates + 1
+            WHERE hotel_id = old.hotel_id AND old.hotel_id IS NOT new.hotel_id;
+        END
+        """
+    ]
+
+    def __init__(self, db):
+        self.db = db
+
+    def ensure_triggers(self):
+        """Crée les triggers de comptage des réponses s'ils n'existent pas, puis initialise les compteurs"""
+        exists = self.db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'hotel_response_counts_ai'"
+        )).first() is not None
+        for statement in self.TRIGGERS_DDL:
+            self.db.session.execute(text(statement))
+        if not exists:
+            self._reset_counts()
+            logger.info("Triggers de comptage des réponses créés")
+        self.db.session.commit()
+
+    def record_response(self, response):
+        """Répercute une nouvelle réponse sur les agrégats, dans la transaction en cours"""
+        # La réponse doit être visible par les requêtes d'initialisation éventuelles
+        self.db.session.flush()
+
+        self.record_responses([{
+            'hotel_id': response.hotel_id,
+            'submission_date': response.submission_date,
+            'would_recommend': response.would_recommend,
+            **{field: getattr(response, field) for field in HotelStatsRollup.RATING_FIELDS}
+        }])
+
+    def record_responses(self, rows):
+        """
+        Répercute un lot de réponses insérées en masse sur les agrégats, dans la transaction en cours
+
+        Args:
+            rows: Colonnes des réponses insérées (hotel_id, submission_date, notes, would_recommend)
+        """
+        hotel_ids = {row['hotel_id'] for row in rows}
+        tracked = {
+            hotel_id for (hotel_id,) in self.db.session.query(HotelStatsRollup.hotel_id).filter(
+                HotelStatsRollup.hotel_id.in_(hotel_ids)
+            )
+        }
+
+        # Premières réponses suivies pour ces hôtels: on part des données existantes (lot inclus)
+        seeded = self._seed(hotel_ids - tracked) if hotel_ids - tracked else set()
+
+        # Compteurs du lot par hôtel et par jour, ajoutés en une requête par table
+        totals = {}
+        daily_totals = {}
+        for row in rows:
+            if row['hotel_id'] in seeded:
+                continue
+            day = row['submission_date'].date()
+            self._accumulate(totals.setdefault(row['hotel_id'], self._empty_counters()), row)
+            self._accumulate(daily_totals.setdefault((row['hotel_id'], day), self._empty_counters()), row)
+
+        self._upsert_increments(HotelStatsRollup, [
+            {'hotel_id': hotel_id, 'updated_at': datetime.utcnow(), **counters}
+            for hotel_id, counters in totals.items()
+        ])
+        self._upsert_increments(HotelDailyRollup, [
+            {'hotel_id': hotel_id, 'day': day, **counters}
+            for (hotel_id, day), counters in daily_totals.items()
+        ])
+
+    def rebuild(self, fix=True):
+        """
+        Recalcule les agrégats depuis satisfaction_responses et détecte les écarts
+
+        Args:
+            fix: Corrige les agrégats divergents si True, se contente de les signaler sinon
+
+        Returns:
+            Liste des écarts détectés, un dictionnaire par ligne d'agrégat
+        """
+        drifts = []
+
+        for model in (HotelStatsRollup, HotelDailyRollup):
+            expected = self._compute_rollups(model)
+            current = {self._key(model, rollup): rollup for rollup in model.query.all()}
+
+            for key in sorted(set(expected) | set(current)):
+                computed = expected.get(key)
+                stored = current.get(key)
+                differences = self._diff(model, stored, computed)
+
+                if not differences:
+                    continue
+
+                drift = {'table': model.__tablename__, 'hotel_id': key[0] if isinstance(key, tuple) else key}
+                if model is HotelDailyRollup:
+                    drift['day'] = key[1].isoformat()
+                drift['differences'] = differences
+                drifts.append(drift)
+
+                if fix:
+                    if computed is None:
+                        self.db.session.delete(stored)
+                    elif stored is None:
+                        self.db.session.add(computed)
+                    else:
+                        for field in model.counter_fields():
+                            setattr(stored, field, getattr(computed, field))
+
+        if fix:
+            # Agrégats recalculés: les écritures hors ingestion sont désormais prises en compte
+            self._reset_counts()
+            self.db.session.commit()
+
+        if drifts:
+            logger.warning(f"Écarts détectés dans les agrégats: {len(drifts)} ligne(s)")
+        return drifts
+
+    def _seed(self, hotel_ids):
+        """
+        Initialise les agrégats des hôtels pas encore suivis depuis satisfaction_responses
+
+        Chaque agrégat est inséré atomiquement (INSERT ... ON CONFLICT DO NOTHING): si un autre
+        worker l'a créé entre-temps, l'hôtel est traité comme déjà suivi et reçoit des incréments.
+
+        Returns:
+            Ensemble des hôtels initialisés par cet appel
+        """
+        table = HotelStatsRollup.__table__
+        seeded = set()
+        for hotel_id, rollup in self._compute_rollups(HotelStatsRollup, list(hotel_ids)).items():
+            values = self._columns(HotelStatsRollup, rollup)
+            values['updated_at'] = datetime.utcnow()
+            if self.db.session.execute(
+                insert(table).values(**values).on_conflict_do_nothing().returning(table.c.hotel_id)
+            ).first() is not None:
+                seeded.add(hotel_id)
+
+        if seeded:
+            # Agrégats calculés depuis les réponses existantes: modifications antérieures incluses
+            self.db.session.query(HotelResponseCount).filter(
+                HotelResponseCount.hotel_id.in_(seeded)
+            ).update({'updates': 0}, synchronize_session=False)
+
+            daily = [
+                self._columns(HotelDailyRollup, rollup)
+                for rollup in self._compute_rollups(HotelDailyRollup, list(seeded)).values()
+            ]
+            self.db.session.execute(insert(HotelDailyRollup.__table__).on_conflict_do_nothing(), daily)
+
+        return seeded
+
+    def _reset_counts(self):
+        """Recalcule les compteurs de réponses par hôtel, sans modification en attente"""
+        self.db.session.query(HotelResponseCount).delete(synchronize_session=False)
+        self.db.session.execute(text("""
+            INSERT INTO hotel_response_counts(hotel_id, responses, updates)
+            SELECT hotel_id, count(*), 0 FROM satisfaction_responses
+            WHERE hotel_id IS NOT NULL
+            GROUP BY hotel_id
+        """))
+
+    def _columns(self, model, rollup):
+        """Colonnes d'un agrégat calculé (clé et compteurs)"""
+        fields = [column.name for column in model.__table__.primary_key] + model.counter_fields()
+        return {field: getattr(rollup, field) for field in fields}
+
+    def _empty_counters(self):
+        return dict.fromkeys(HotelStatsRollup.counter_fields(), 0)
+
+    def _accumulate(self, counters, row):
+        """Ajoute une réponse (dictionnaire de colonnes) à des compteurs"""
+        counters['total_responses'] += 1
+        for field in HotelStatsRollup.RATING_FIELDS:
+            value = row.get(field)
+            if value is not None:
+                counters[f'{field}_sum'] += value
+                counters[f'{field}_count'] += 1
+
+        if row.get('would_recommend') is not None:
+            counters['recommend_count'] += 1
+            if row['would_recommend']:
+                counters['recommend_yes'] += 1
+
+    def _upsert_increments(self, model, rows):
+        """Insère les agrégats absents et incrémente les existants (INSERT ... ON CONFLICT DO UPDATE)"""
+        if not rows:
+            return
+
+        table = model.__table__
+        statement = insert(table)
+        increments = {field: table.c[field] + statement.excluded[field] for field in model.counter_fields()}
+        if 'updated_at' in table.c:
+            increments['updated_at'] = statement.excluded.updated_at
+
+        # executemany: une seule compilation de la requête quel que soit le nombre de lignes
+        self.db.session.execute(statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_=increments
+        ), rows)
+
+    def _compute_rollups(self, model, hotel_ids=None, day=None):
+        """Calcule les agrégats attendus depuis satisfaction_responses"""
+        analytics_service = AnalyticsService(self.db)
+        by_day = model is HotelDailyRollup
+        start_date = end_date = None
+        if day is not None:
+            start_date = datetime.combine(day, time.min)
+            end_date = start_date + timedelta(days=1)
+
+        query = analytics_service.aggregate_statistics_query(
+            hotel_ids,
+            group_by_day=by_day,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+        rollups = {}
+        for row in query.all():
+            rollup = model(hotel_id=row.hotel_id)
+            if by_day:
+                rollup.day = date.fromisoformat(row.day)
+            for field in model.counter_fields():
+                setattr(rollup, field, getattr(row, field) or 0)
+            rollups[self._key(model, rollup)] = rollup
+
+        return rollups
+
+    def _key(self, model, rollup):
+        """Clé d'identification d'une ligne d'agrégat"""
+        if model is HotelDailyRollup:
+            return (rollup.hotel_id, rollup.day)
+        return rollup.hotel_id
+
+    def _diff(self, model, stored, computed):
+        """Compare un agrégat stocké à sa valeur recalculée"""
+        if stored is None or computed is None:
+            return {'total_responses': {
+                'stored': stored.total_responses if stored is not None else None,
+                'computed': computed.total_responses if computed is not None else None
+            }}
+
+        differences = {}
+        for field in model.counter_fields():
+            stored_value = getattr(stored, field) or 0
+            computed_value = getattr(computed, field) or 0
+            if abs(stored_value - computed_value) > 1e-6:
+                differences[field] = {'stored': stored_value, 'computed': computed_value}
+        return differences
@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from src.models.sheets_outbox import SheetsOutboxRow
+from src.services.google_sheets_service import GoogleSheetsService
+
+logger = logging.getLogger(__name__)
+
+class SheetsOutboxService:
+    """
+    Outbox des lignes Google Sheets: enregistrées dans la transaction de la réponse,
+    envoyées ensuite par un flusher en un appel values.append multi-lignes par feuille
+
+    Les échecs sont réessayés avec une attente exponentielle; un 429 suspend tous les envois
+    et un intervalle minimal entre appels respecte le quota d'écriture de l'API.
+    Un lot interrompu en cours d'envoi (arrêt du processus) est rapproché du contenu
+    de la feuille avant d'être renvoyé: aucune ligne n'est ajoutée deux fois.
+    """
+
+    # Nombre maximal de lignes par appel values.append
+    BATCH_SIZE = int(os.getenv('SHEETS_OUTBOX_BATCH_SIZE', 500))
+
+    # Intervalle minimal entre deux appels (quota Sheets: 60 écritures par minute et par utilisateur)
+    MIN_INTERVAL = float(os.getenv('SHEETS_MIN_INTERVAL_SECONDS', 1.0))
+
+    # Attente exponentielle entre tentatives: BASE_BACKOFF * 2^(tentatives - 1), plafonnée
+    BASE_BACKOFF = 2.0
+    MAX_BACKOFF = 900.0
+
+    # Nombre de tentatives avant de laisser une ligne en échec
+    MAX_ATTEMPTS = 10
+
+    # Délai au-delà duquel un envoi réclamé par un processus disparu est repris
+    CLAIM_TIMEOUT = timedelta(minutes=5)
+
+    _metrics = {
+        'api_calls': 0,
+        'rows_appended': 0,
+        'rows_skipped': 0,
+        'failures': 0,
+        'throttled': 0,
+        'last_error': None,
+        'last_flush_at': None
+    }
+    _lock = threading.Lock()
+    _next_call_at = 0.0
+    _paused_until = 0.0
+
+    def __init__(self, db, sheets_service=None):
+        self.db = db
+        self.sheets_service = sheets_service
+
+    def available(self):
+        """Indique si les lignes peuvent être envoyées (service Google Sheets initialisé)"""
+        return bool(self.sheets_service and self.sheets_service.service)
+
+    def enqueue(self, sheet_id, response_data):
+        """
+        Enregistre une ligne à ajouter, dans la transaction en cours (sans la valider)
+
+        Returns:
+            Ligne de l'outbox, ou None si Google Sheets n'est pas disponible (ligne ignorée)
+        """
+        if not self.available():
+            self._skip(1)
+            return None
+
+        row = SheetsOutboxRow(
+            google_sheet_id=sheet_id,
+            values=json.dumps(GoogleSheetsService.response_row(response_data), ensure_ascii=False),
+            status='pending',
+            next_attempt_at=datetime.utcnow()
+        )
+        self.db.session.add(row)
+        return row
+
+    def enqueue_many(self, rows):
+        """
+        Enregistre un lot de lignes en une requête (dans la transaction en cours)
+
+        Args:
+            rows: Liste de tuples (google_sheet_id, données de la réponse)
+        """
+        if not rows:
+            return
+        if not self.available():
+            self._skip(len(rows))
+            return
+        now = datetime.utcnow()
+        self.db.session.execute(SheetsOutboxRow.__table__.insert(), [
+            {
+                'google_sheet_id': sheet_id,
+                'values': json.dumps(GoogleSheetsService.response_row(response_data), ensure_ascii=False),
+                'status': 'pending',
+                'created_at': now,
+                'attempts': 0,
+                'next_attempt_at': now
+            }
+            for sheet_id, response_data in rows
+        ])
+
+    def flush(self):
+        """
+        Envoie les lignes dues, un appel multi-lignes par feuille
+
+        Returns:
+            Nombre de lignes ajoutées aux feuilles
+        """
+        if not self.available():
+            return 0
+
+        rows = self._claim_rows()
+        if not rows:
+            return 0
+
+        by_sheet = {}
+        for row in rows:
+            by_sheet.setdefault(row.google_sheet_id, []).append(row)
+
+        appended = 0
+        for sheet_id, sheet_rows in by_sheet.items():
+            if time.monotonic() < SheetsOutboxService._paused_until:
+                # Quota dépassé: les lignes restantes attendent le prochain passage
+                self._release(sheet_rows)
+                continue
+
+            if any(row.status == 'sending' for row in sheet_rows):
+                sheet_rows = self._reconcile(sheet_id, sheet_rows)
+
+            for start in range(0, len(sheet_rows), self.BATCH_SIZE):
+                chunk = sheet_rows[start:start + self.BATCH_SIZE]
+                if self._send(sheet_id, chunk):
+                    appended += len(chunk)
+                else:
+                    self._release(sheet_rows[start + self.BATCH_SIZE:])
+                    break
+
+        with SheetsOutboxService._lock:
+            SheetsOutboxService._metrics['last_flush_at'] = datetime.utcnow().isoformat()
+        return appended
+
+    def stats(self):
+        """Arriéré de l'outbox et compteurs d'appels à l'API"""
+        counts = dict(
+            self.db.session.query(SheetsOutboxRow.status, self.db.func.count(SheetsOutboxRow.id))
+            .group_by(SheetsOutboxRow.status).all()
+        )
+        pending = self.db.session.query(
+            self.db.func.min(SheetsOutboxRow.created_at),
+            self.db.func.count(self.db.distinct(SheetsOutboxRow.google_sheet_id))
+        ).filter(SheetsOutboxRow.status == 'pending').one()
+
+        with SheetsOutboxService._lock:
+            metrics = dict(SheetsOutboxService._metrics)
+        paused = max(SheetsOutboxService._paused_until - time.monotonic(), 0)
+
+        return {
+            'available': self.available(),
+            'backlog': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'failed': counts.get('failed', 0),
+            'sheets': pending[1],
+            'oldest_created_at': pending[0].isoformat() if pending[0] else None,
+            'lag_seconds': round((datetime.utcnow() - pending[0]).total_seconds(), 3) if pending[0] else 0,
+            'paused_seconds': round(paused, 1),
+            **metrics
+        }
+
+    def retry_failed(self):
+        """Remet en attente les lignes en échec; retourne leur nombre"""
+        count = SheetsOutboxRow.query.filter_by(status='failed').update(
+            {'status': 'pending', 'attempts': 0, 'next_attempt_at': datetime.utcnow(), 'claim_token': None},
+            synchronize_session=False
+        )
+        self.db.session.commit()
+        return count
+
+    def _claim_rows(self):
+        """Réserve les lignes dues pour ce processus (un seul envoi par ligne)"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        expired = SheetsOutboxRow.claimed_at < now - self.CLAIM_TIMEOUT
+        due = self.db.session.query(SheetsOutboxRow.id).filter(
+            self.db.or_(
+                self.db.and_(
+                    SheetsOutboxRow.status == 'pending',
+                    SheetsOutboxRow.next_attempt_at <= now,
+                    self.db.or_(SheetsOutboxRow.claim_token.is_(None), expired)
+                ),
+                # Envoi interrompu par l'arrêt d'un processus
+                self.db.and_(SheetsOutboxRow.status == 'sending', expired)
+            )
+        ).order_by(SheetsOutboxRow.id).limit(self.BATCH_SIZE * 10)
+
+        claimed = SheetsOutboxRow.query.filter(
+            SheetsOutboxRow.id.in_(due.scalar_subquery())
+        ).update({'claim_token': token, 'claimed_at': now}, synchronize_session=False)
+        self.db.session.commit()
+
+        if not claimed:
+            return []
+        return SheetsOutboxRow.query.filter_by(claim_token=token).order_by(SheetsOutboxRow.id).all()
+
+    def _send(self, sheet_id, rows):
+        """Ajoute un lot de lignes à une feuille; retourne False en cas d'échec (lot replanifié)"""
+        self._pace()
+        with SheetsOutboxService._lock:
+            SheetsOutboxService._metrics['api_calls'] += 1
+
+        # Lot marqué en cours d'envoi avant l'appel: un arrêt pendant l'appel est détectable
+        for row in rows:
+            row.status = 'sending'
+        self.db.session.commit()
+
+        try:
+            self.sheets_service.append_rows(sheet_id, [row.get_values() for row in rows])
+
+        except Exception as e:
+            status = getattr(getattr(e, 'resp', None), 'status', None)
+            logger.warning(f"Ajout de {len(rows)} ligne(s) à la feuille {sheet_id} impossible ({status}): {e}")
+
+            attempts = max(row.attempts for row in rows) + 1
+            delay = self._backoff(attempts)
+            with SheetsOutboxService._lock:
+                SheetsOutboxService._metrics['failures'] += 1
+                SheetsOutboxService._metrics['last_error'] = f"{sheet_id}: {e}"
+                if str(status) == '429':
+                    # Quota dépassé: suspension de tous les envois
+                    SheetsOutboxService._metrics['throttled'] += 1
+                    SheetsOutboxService._paused_until = time.monotonic() + delay
+
+            for row in rows:
+                row.attempts += 1
+                row.last_error = str(e)
+                row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                row.status = 'failed' if row.attempts >= self.MAX_ATTEMPTS else 'pending'
+                row.claim_token = None
+            self.db.session.commit()
+            return False
+
+        for row in rows:
+            self.db.session.delete(row)
+        self.db.session.commit()
+
+        with SheetsOutboxService._lock:
+            SheetsOutboxService._metrics['rows_appended'] += len(rows)
+        logger.info(f"{len(rows)} ligne(s) ajoutée(s) à la feuille {sheet_id}")
+        return True
+
+    def _reconcile(self, sheet_id, rows):
+        """
+        Écarte les lignes d'un envoi interrompu déjà présentes dans la feuille
+
+        Returns:
+            Lignes restant à envoyer (aucune si la feuille n'a pas pu être lue)
+        """
+        try:
+            present = Counter(self._row_key(values) for values in self.sheets_service.read_rows(sheet_id))
+        except Exception as e:
+            logger.warning(f"Lecture de la feuille {sheet_id} impossible, envoi interrompu reporté: {e}")
+            self._release(rows)
+            return []
+
+        remaining = []
+        for row in rows:
+            key = self._row_key(row.get_values())
+            if row.status == 'sending' and present[key] > 0:
+                # Ligne ajoutée avant l'interruption: seule la suppression de l'outbox manquait
+                present[key] -= 1
+                self.db.session.delete(row)
+            else:
+                row.status = 'pending'
+                remaining.append(row)
+        self.db.session.commit()
+
+        if len(remaining) < len(rows):
+            logger.info(f"{len(rows) - len(remaining)} ligne(s) déjà présente(s) dans la feuille {sheet_id}, non renvoyée(s)")
+        return remaining
+
+    @staticmethod
+    def _row_key(values):
+        """Clé de comparaison d'une ligne (nombres en float, cellules vides finales ignorées)"""
+        key = [
+            float(value) if isinstance(value, (int, float)) and not isinstance(value, bool)
+            else '' if value is None else str(value)
+            for value in values
+        ]
+        while key and key[-1] == '':
+            key.pop()
+        return tuple(key)
+
+    def _release(self, rows):
+        """Rend des lignes réclamées sans les envoyer"""
+        for row in rows:
+            row.claim_token = None
+        self.db.session.commit()
+
+    def _pace(self):
+        """Attend l'intervalle minimal depuis le dernier appel du processus"""
+        with SheetsOutboxService._lock:
+            now = time.monotonic()
+            wait = SheetsOutboxService._next_call_at - now
+            SheetsOutboxService._next_call_at = max(now, SheetsOutboxService._next_call_at) + self.MIN_INTERVAL
+        if wait > 0:
+            time.sleep(wait)
+
+    def _skip(self, count):
+        """Ignore des lignes faute de service Google Sheets: l'outbox ne grossit pas sans envoi possible"""
+        with SheetsOutboxService._lock:
+            first = SheetsOutboxService._metrics['rows_skipped'] == 0
+            SheetsOutboxService._metrics['rows_skipped'] += count
+        if first:
+            logger.warning("Service Google Sheets indisponible (credentials absents): lignes non mises en outbox")
+
+    def _backoff(self, attempts):
+        """Attente avant la tentative suivante (exponentielle, avec gigue)"""
+        delay = min(self.BASE_BACKOFF * 2 ** (attempts - 1), self.MAX_BACKOFF)
+        return delay * random.uniform(0.8, 1.2)
+
+class SheetsOutboxFlusher:
+    """Thread d'arrière-plan envoyant périodiquement l'outbox Google Sheets"""
+
+    # Intervalle entre deux envois (les lignes arrivées entre-temps sont regroupées)
+    FLUSH_INTERVAL = float(os.getenv('SHEETS_FLUSH_INTERVAL_SECONDS', 5))
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, app, db, sheets_service):
+        """Démarre le thread du processus (sans effet s'il tourne déjà ou sans service Sheets)"""
+        if not sheets_service.service:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._loop,
+                args=(app, db, sheets_service),
+                name='sheets-outbox',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self, app, db, sheets_service):
+        while True:
+            self._stop.wait(self.FLUSH_INTERVAL)
+            with app.app_context():
+                try:
+                    SheetsOutboxService(db, sheets_service).flush()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erreur lors de l'envoi de l'outbox Google Sheets: {e}")
+
+# Flusher partagé par le processus
+sheets_flusher = SheetsOutboxFlusher()
@@ -0,0 +1,126 @@
+import io
+import csv
+import json
+import logging
+from src.models.hotel import SatisfactionResponse
+
+logger = logging.getLogger(__name__)
+
+class StreamExportService:
+    """Exports CSV / NDJSON des réponses, lus au fil du curseur et transmis en flux"""
+
+    MIMETYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson'
+    }
+
+    # Colonnes exportées, dans l'ordre
+    FIELDS = [
+        'id',
+        'hotel_id',
+        'submission_date',
+        'client_name',
+        'client_email',
+        'overall_rating',
+        'accommodation_rating',
+        'service_rating',
+        'cleanliness_rating',
+        'food_rating',
+        'location_rating',
+        'value_rating',
+        'would_recommend',
+        'comments',
+        'tally_submission_id'
+    ]
+
+    # Nombre de lignes lues par aller-retour avec la base
+    BATCH_SIZE = 1000
+
+    # Taille approximative des blocs transmis au client
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, db):
+        self.db = db
+
+    def query(self, hotel_id=None, since=None, until=None, after_id=None):
+        """
+        Requête des réponses à exporter, ordonnée par identifiant croissant
+
+        Args:
+            hotel_id: Identifiant de l'hôtel (tout le portefeuille si None)
+            since: Date de soumission minimale (incluse)
+            until: Date de soumission maximale (exclue)
+            after_id: Curseur incrémental, seules les réponses d'identifiant supérieur sont exportées
+        """
+        columns = [getattr(SatisfactionResponse, field) for field in self.FIELDS]
+        query = self.db.session.query(*columns)
+
+        if hotel_id is not None:
+            query = query.filter(SatisfactionResponse.hotel_id == hotel_id)
+        if since is not None:
+            query = query.filter(SatisfactionResponse.submission_date >= since)
+        if until is not None:
+            query = query.filter(SatisfactionResponse.submission_date < until)
+        if after_id is not None:
+            query = query.filter(SatisfactionResponse.id > after_id)
+
+        return query.order_by(SatisfactionResponse.id).execution_options(yield_per=self.BATCH_SIZE)
+
+    def stream(self, export_format, **filters):
+        """Génère l'export au format demandé ('csv' ou 'ndjson') par blocs d'octets"""
+        if export_format == 'csv':
+            return self.stream_csv(**filters)
+        return self.stream_ndjson(**filters)
+
+    def stream_csv(self, **filters):
+        """Génère l'export CSV (en-tête puis une ligne par réponse)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.FIELDS)
+
+        for row in self.query(**filters):
+            writer.writerow(self._csv_values(row))
+            if buffer.tell() >= self.CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    def stream_ndjson(self, **filters):
+        """Génère l'export NDJSON (un objet JSON par ligne)"""
+        lines = []
+        size = 0
+
+        for row in self.query(**filters):
+            line = json.dumps(self._json_record(row), ensure_ascii=False)
+            lines.append(line)
+            size += len(line) + 1
+            if size >= self.CHUNK_SIZE:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+                lines = []
+                size = 0
+
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def _json_record(self, row):
+        """Objet JSON d'une réponse (dates au format ISO)"""
+        record = dict(zip(self.FIELDS, row))
+        if record['submission_date'] is not None:
+            record['submission_date'] = record['submission_date'].isoformat()
+        return record
+
+    def _csv_values(self, row):
+        """Valeurs CSV d'une réponse (vide pour les valeurs absentes, booléens en 1/0)"""
+        values = []
+        for field, value in zip(self.FIELDS, row):
+            if value is None:
+                values.append('')
+            elif field == 'submission_date':
+                values.append(value.isoformat())
+            elif field == 'would_recommend':
+                values.append(1 if value else 0)
+            else:
+                values.append(value)
+        return values
@@ -1,11 +1,20 @@
 import requests
 import json
 import logging
+import uuid
 from datetime import datetime
+from src.services.field_mapping import field_mapping
+from src.services.response_detail_service import ResponseDetailService
 
 logger = logging.getLogger(__name__)
 
 class TallyService:
+    # Champs de la réponse extraits du formulaire
+    FIELDS = [
+        'client_name', 'client_email', 'overall_rating', 'accommodation_rating', 'service_rating',
+        'cleanliness_rating', 'food_rating', 'location_rating', 'value_rating', 'would_recommend', 'comments'
+    ]
+
     def __init__(self):
         self.base_url = "https://api.tally.so"
         self.api_key = None  # À configurer via les variables d'environnement
@@ -24,22 +33,19 @@ class TallyService:
             # Réponses du formulaire
             responses = webhook_data.get('data', {})
             
-            # Mapper les réponses aux champs de notre modèle
+            # Mapper les réponses aux champs de notre modèle (schéma compilé partagé)
+            extracted = field_mapping.extract(responses) if isinstance(responses, dict) else {}
             processed_data = {
                 'tally_submission_id': submission_id,
-                'submission_date': self._parse_date(submitted_at),
-                'client_name': self._extract_field(responses, ['nom', 'name', 'client_name']),
-                'client_email': self._extract_field(responses, ['email', 'e-mail', 'client_email']),
-                'overall_rating': self._extract_rating(responses, ['note_globale', 'overall_rating', 'satisfaction_globale']),
-                'accommodation_rating': self._extract_rating(responses, ['hebergement', 'accommodation', 'logement']),
-                'service_rating': self._extract_rating(responses, ['service', 'service_client']),
-                'cleanliness_rating': self._extract_rating(responses, ['proprete', 'cleanliness', 'nettoyage']),
-                'food_rating': self._extract_rating(responses, ['restauration', 'food', 'nourriture']),
-                'location_rating': self._extract_rating(responses, ['emplacement', 'location', 'localisation']),
-                'value_rating': self._extract_rating(responses, ['rapport_qualite_prix', 'value', 'prix']),
-                'would_recommend': self._extract_recommendation(responses),
-                'comments': self._extract_field(responses, ['commentaires', 'comments', 'remarques'])
+                'submission_date': self._parse_date(submitted_at)
             }
+            for field in self.FIELDS:
+                processed_data[field] = extracted.get(field)
+            
+            # Notes détaillées, profil voyageur et avis libre (questionnaire Top of Travel), stockés à part
+            details = ResponseDetailService.split_details(extracted)
+            if details:
+                processed_data['details'] = details
             
             logger.info(f"Données Tally traitées pour la soumission {submission_id}")
             return processed_data
@@ -48,45 +54,6 @@ class TallyService:
             logger.error(f"Erreur lors du traitement des données Tally: {e}")
             return None
     
-    def _extract_field(self, responses, possible_keys):
-        """Extrait un champ des réponses en essayant plusieurs clés possibles"""
-        for key in possible_keys:
-            if key in responses:
-                return responses[key]
-            # Essayer aussi avec des variations de casse
-            for response_key in responses.keys():
-                if response_key.lower() == key.lower():
-                    return responses[response_key]
-        return None
-    
-    def _extract_rating(self, responses, possible_keys):
-        """Extrait une note et la convertit en float"""
-        value = self._extract_field(responses, possible_keys)
-        if value is not None:
-            try:
-                # Gérer différents formats de notes
-                if isinstance(value, str):
-                    # Extraire le nombre de chaînes comme "4/5" ou "4 étoiles"
-                    import re
-                    match = re.search(r'(\d+(?:\.\d+)?)', value)
-                    if match:
-                        return float(match.group(1))
-                return float(value)
-            except (ValueError, TypeError):
-                logger.warning(f"Impossible de convertir la note: {value}")
-        return None
-    
-    def _extract_recommendation(self, responses):
-        """Extrait la recommandation et la convertit en boolean"""
-        value = self._extract_field(responses, ['recommandation', 'recommend', 'recommande'])
-        if value is not None:
-            if isinstance(value, bool):
-                return value
-            if isinstance(value, str):
-                value_lower = value.lower()
-                return value_lower in ['oui', 'yes', 'true', '1', 'recommande']
-        return None
-    
     def _parse_date(self, date_string):
         """Parse une date depuis différents formats"""
         if not date_string:
@@ -127,7 +94,7 @@ class TallyService:
     def create_sample_webhook_data(self, hotel_name="Test Hotel"):
         """Crée des données d'exemple pour tester l'intégration"""
         return {
-            'submissionId': f'test_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            'submissionId': f'test_{datetime.now().strftime("%Y%m%d_%H%M%S")}_{uuid.uuid4().hex[:8]}',
             'formId': 'test_form',
             'submittedAt': datetime.now().isoformat(),
             'data': {
@@ -0,0 +1,483 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from src.models.hotel import SatisfactionResponse
+from sqlalchemy.dialects.sqlite import insert
+from src.models.webhook_queue import WebhookQueueItem
+from src.services.rollup_service import StatsRollupService
+from src.services.keyword_service import KeywordService
+from src.services.response_detail_service import ResponseDetailService
+from src.services.response_cache import response_cache
+from src.services.analytics_cache import analytics_cache
+from src.services.sheets_outbox_service import SheetsOutboxService
+from src.services.hotel_resolver import hotel_resolver
+
+logger = logging.getLogger(__name__)
+
+class WebhookIngestService:
+    """
+    Enregistrement des réponses Tally, directement ou via la file d'ingestion durable
+
+    En mode file, le webhook n'écrit que son corps brut dans webhook_ingest_queue et répond
+    immédiatement; les workers vident ensuite la file par lots, une transaction par lot.
+    """
+
+    # Nombre de webhooks enregistrés par transaction
+    BATCH_SIZE = int(os.getenv('WEBHOOK_INGEST_BATCH_SIZE', 200))
+
+    # Nombre de réponses insérées par transaction lors d'un import en masse
+    BULK_CHUNK_SIZE = int(os.getenv('WEBHOOK_BULK_CHUNK_SIZE', 2000))
+
+    # Nombre de tentatives avant de laisser un webhook en échec
+    MAX_ATTEMPTS = 5
+
+    # Délai au-delà duquel un lot réclamé par un worker disparu est repris
+    CLAIM_TIMEOUT = timedelta(minutes=5)
+
+    # Compteurs du processus (les lots traités par ce processus uniquement)
+    _metrics = {
+        'batches': 0,
+        'processed': 0,
+        'created': 0,
+        'duplicates': 0,
+        'errors': 0,
+        'last_batch': None
+    }
+    _metrics_lock = threading.Lock()
+
+    def __init__(self, db, tally_service=None, sheets_service=None):
+        self.db = db
+        self.tally_service = tally_service
+        self.sheets_service = sheets_service
+
+    @staticmethod
+    def mode():
+        """Mode d'ingestion des webhooks: 'sync' (par défaut) ou 'queue'"""
+        return 'queue' if os.getenv('WEBHOOK_INGEST_MODE', 'sync') == 'queue' else 'sync'
+
+    def resolve_hotel(self, webhook_data, hotel_id=None):
+        """Identifie l'hôtel destinataire d'un webhook (index en mémoire, None si inconnu)"""
+        return hotel_resolver.resolve(webhook_data, hotel_id)
+
+    def add_response(self, hotel, processed_data):
+        """
+        Ajoute une réponse et met à jour les agrégats dans la transaction en cours (sans la valider)
+
+        L'insertion est atomique (INSERT ... ON CONFLICT DO NOTHING RETURNING): une soumission
+        déjà enregistrée, y compris par un autre worker au même instant, ne lève pas d'erreur.
+
+        Returns:
+            Réponse créée, ou None si la soumission existe déjà
+        """
+        values = {'hotel_id': hotel.id, **processed_data}
+        details = values.pop('details', None)
+        if values.get('submission_date') is None:
+            values['submission_date'] = datetime.utcnow()
+
+        response = self.db.session.scalars(
+            insert(SatisfactionResponse)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=['tally_submission_id'])
+            .returning(SatisfactionResponse)
+        ).first()
+
+        if response is None:
+            return None
+
+        if details:
+            ResponseDetailService(self.db).record(response.id, hotel.id, details)
+        StatsRollupService(self.db).record_response(response)
+        KeywordService(self.db).record_response(response, details)
+        analytics_cache.bump_version(self.db, hotel.id)
+
+        # Ligne Google Sheets envoyée plus tard par l'outbox, validée avec la réponse
+        if hotel.google_sheet_id:
+            SheetsOutboxService(self.db, self.sheets_service).enqueue(hotel.google_sheet_id, processed_data)
+        return response
+
+    def ingest_bulk(self, payloads, hotel_id=None):
+        """
+        Enregistre un lot de webhooks Tally historiques (import en masse)
+
+        Les soumissions sont dédoublonnées dans le lot puis en base par l'insertion
+        (ON CONFLICT DO NOTHING), par paquets de BULK_CHUNK_SIZE, une transaction par paquet.
+        Les agrégats, mots-clés et l'outbox Google Sheets sont mis à jour une fois par paquet.
+
+        Args:
+            payloads: Itérable de webhooks Tally (dictionnaires)
+            hotel_id: Hôtel par défaut (paramètre hotel_id de l'URL)
+
+        Returns:
+            Liste des résultats, un par webhook, dans l'ordre reçu
+        """
+        results = []
+        pending = []
+        seen = set()
+
+        for index, webhook_data in enumerate(payloads):
+            result = {'index': index, 'submission_id': None}
+            results.append(result)
+
+            if not isinstance(webhook_data, dict):
+                result.update(status='error', error='Format de webhook invalide')
+                continue
+
+            processed_data = self.tally_service.process_webhook_data(webhook_data)
+            if not processed_data:
+                result.update(status='error', error='Erreur lors du traitement des données')
+                continue
+
+            submission_id = processed_data['tally_submission_id']
+            result['submission_id'] = submission_id
+            if not submission_id:
+                result.update(status='error', error='submissionId manquant')
+                continue
+            if submission_id in seen or recent_submissions.seen(submission_id):
+                result['status'] = 'duplicate'
+                continue
+            seen.add(submission_id)
+
+            hotel = self.resolve_hotel(webhook_data, hotel_id)
+            if not hotel:
+                result.update(status='error', error='Hôtel non identifié')
+                continue
+
+            if processed_data.get('submission_date') is None:
+                processed_data['submission_date'] = datetime.utcnow()
+            pending.append((result, hotel, processed_data))
+
+            if len(pending) >= self.BULK_CHUNK_SIZE:
+                self._insert_chunk(pending)
+                pending = []
+
+        if pending:
+            self._insert_chunk(pending)
+        return results
+
+    # File d'ingestion
+
+    def enqueue(self, payload, hotel_id=None):
+        """
+        Enregistre durablement le corps brut d'un webhook
+
+        Args:
+            payload: Corps JSON du webhook, tel que reçu
+            hotel_id: Paramètre hotel_id de l'URL du webhook
+
+        Returns:
+            Identifiant de l'élément de file
+        """
+        item = WebhookQueueItem(payload=payload, hotel_id=hotel_id, status='pending')
+        self.db.session.add(item)
+        self.db.session.commit()
+        return item.id
+
+    def park(self, payload, hotel_id=None, reason=None):
+        """
+        Met de côté un webhook non enregistrable (hôtel inconnu) pour un traitement ultérieur
+
+        Le webhook est conservé en échec dans la file: il est repris par
+        'flask webhooks drain --retry-failed' une fois l'hôtel configuré.
+        """
+        item = WebhookQueueItem(payload=payload, hotel_id=hotel_id, status='failed', last_error=reason)
+        self.db.session.add(item)
+        self.db.session.commit()
+        return item.id
+
+    def drain(self, max_batches=None):
+        """Vide la file par lots jusqu'à ce qu'elle soit vide; retourne le nombre de webhooks traités"""
+        processed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            result = self.drain_batch()
+            if result is None:
+                break
+            processed += result['size']
+            batches += 1
+        return processed
+
+    def drain_batch(self):
+        """
+        Réclame et enregistre un lot de webhooks dans une seule transaction
+
+        Returns:
+            Bilan du lot (taille, créées, doublons, erreurs, durée), None si la file est vide
+        """
+        items = self._claim_batch()
+        if not items:
+            return None
+
+        started = time.perf_counter()
+        created = []
+        duplicates = 0
+        errors = 0
+
+        for item in items:
+            item.attempts += 1
+            try:
+                webhook_data = json.loads(item.payload)
+                if not isinstance(webhook_data, dict):
+                    raise ValueError('Format de webhook invalide')
+                if recent_submissions.seen(webhook_data.get('submissionId')):
+                    result = None
+                else:
+                    # Point de sauvegarde: un webhook invalide n'annule pas le reste du lot
+                    with self.db.session.begin_nested():
+                        result = self._ingest(webhook_data, item.hotel_id)
+                if result is None:
+                    duplicates += 1
+                else:
+                    created.append(result)
+                self.db.session.delete(item)
+
+            except Exception as e:
+                errors += 1
+                logger.error(f"Erreur lors de l'ingestion du webhook {item.id}: {e}")
+                item.last_error = str(e)
+                # Données invalides (ValueError): inutile de réessayer
+                exhausted = isinstance(e, ValueError) or item.attempts >= self.MAX_ATTEMPTS
+                item.status = 'failed' if exhausted else 'pending'
+                item.claim_token = None
+
+        oldest = min(item.received_at for item in items)
+        self.db.session.commit()
+
+        for response in created:
+            response_cache.append(response)
+            recent_submissions.add(response.tally_submission_id)
+
+        duration = time.perf_counter() - started
+        summary = {
+            'size': len(items),
+            'created': len(created),
+            'duplicates': duplicates,
+            'errors': errors,
+            'duration_ms': round(duration * 1000, 2),
+            'rows_per_second': round(len(items) / duration, 1) if duration > 0 else None,
+            'max_latency_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        self._record_metrics(summary)
+        return summary
+
+    def stats(self):
+        """Profondeur de la file, retard du plus ancien webhook et débit des derniers lots"""
+        counts = dict(
+            self.db.session.query(WebhookQueueItem.status, self.db.func.count(WebhookQueueItem.id))
+            .group_by(WebhookQueueItem.status).all()
+        )
+        oldest = self.db.session.query(self.db.func.min(WebhookQueueItem.received_at)).filter(
+            WebhookQueueItem.status.in_(['pending', 'processing'])
+        ).scalar()
+
+        with WebhookIngestService._metrics_lock:
+            metrics = dict(WebhookIngestService._metrics)
+
+        return {
+            'mode': self.mode(),
+            'depth': counts.get('pending', 0) + counts.get('processing', 0),
+            'pending': counts.get('pending', 0),
+            'processing': counts.get('processing', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_received_at': oldest.isoformat() if oldest else None,
+            'lag_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0,
+            **metrics
+        }
+
+    def retry_failed(self):
+        """Remet en file les webhooks en échec; retourne leur nombre"""
+        count = WebhookQueueItem.query.filter_by(status='failed').update(
+            {'status': 'pending', 'attempts': 0, 'claim_token': None},
+            synchronize_session=False
+        )
+        self.db.session.commit()
+        return count
+
+    def _claim_batch(self):
+        """Réserve les plus anciens webhooks en attente (ou abandonnés) pour ce worker"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        claimable = self.db.session.query(WebhookQueueItem.id).filter(
+            self.db.or_(
+                WebhookQueueItem.status == 'pending',
+                self.db.and_(
+                    WebhookQueueItem.status == 'processing',
+                    WebhookQueueItem.claimed_at < now - self.CLAIM_TIMEOUT
+                )
+            )
+        ).order_by(WebhookQueueItem.id).limit(self.BATCH_SIZE)
+
+        # Réclamation atomique: un seul worker obtient chaque élément
+        claimed = WebhookQueueItem.query.filter(
+            WebhookQueueItem.id.in_(claimable.scalar_subquery())
+        ).update(
+            {'status': 'processing', 'claim_token': token, 'claimed_at': now},
+            synchronize_session=False
+        )
+        self.db.session.commit()
+
+        if not claimed:
+            return []
+        return WebhookQueueItem.query.filter_by(claim_token=token).order_by(WebhookQueueItem.id).all()
+
+    def _ingest(self, webhook_data, hotel_id):
+        """Enregistre un webhook; retourne la réponse créée ou None pour un doublon"""
+        processed_data = self.tally_service.process_webhook_data(webhook_data)
+        if not processed_data:
+            raise ValueError('Erreur lors du traitement des données')
+
+        hotel = self.resolve_hotel(webhook_data, hotel_id)
+        if not hotel:
+            raise ValueError('Hôtel non identifié')
+
+        return self.add_response(hotel, processed_data)
+
+    def _insert_chunk(self, items):
+        """Insère un paquet de réponses (executemany) et met à jour les données dérivées"""
+        table = SatisfactionResponse.__table__
+        statement = insert(table).on_conflict_do_nothing(
+            index_elements=['tally_submission_id']
+        ).returning(table.c.id, table.c.tally_submission_id)
+
+        rows = []
+        details = {}
+        for _, hotel, processed_data in items:
+            row = {'hotel_id': hotel.id, **processed_data}
+            row_details = row.pop('details', None)
+            if row_details:
+                details[row['tally_submission_id']] = row_details
+            rows.append(row)
+        try:
+            inserted = dict(
+                (submission_id, response_id)
+                for response_id, submission_id in self.db.session.execute(statement, rows).all()
+            )
+
+            created = [row for row in rows if row['tally_submission_id'] in inserted]
+            if created:
+                ResponseDetailService(self.db).record_many([
+                    (inserted[row['tally_submission_id']], row['hotel_id'], details[row['tally_submission_id']])
+                    for row in created if row['tally_submission_id'] in details
+                ])
+                StatsRollupService(self.db).record_responses(created)
+                KeywordService(self.db).record_responses(created, details)
+                for hotel_id in {row['hotel_id'] for row in created}:
+                    analytics_cache.bump_version(self.db, hotel_id)
+                SheetsOutboxService(self.db, self.sheets_service).enqueue_many([
+                    (hotel.google_sheet_id, processed_data)
+                    for _, hotel, processed_data in items
+                    if hotel.google_sheet_id and processed_data['tally_submission_id'] in inserted
+                ])
+            self.db.session.commit()
+
+        except Exception as e:
+            self.db.session.rollback()
+            logger.error(f"Erreur lors de l'import d'un paquet de {len(items)} réponse(s): {e}")
+            for result, _, _ in items:
+                result.update(status='error', error='Erreur lors de l\'enregistrement')
+            return
+
+        for result, _, _ in items:
+            response_id = inserted.get(result['submission_id'])
+            if response_id is None:
+                result['status'] = 'duplicate'
+            else:
+                result.update(status='created', response_id=response_id)
+            recent_submissions.add(result['submission_id'])
+
+    def _record_metrics(self, summary):
+        with WebhookIngestService._metrics_lock:
+            metrics = WebhookIngestService._metrics
+            metrics['batches'] += 1
+            metrics['processed'] += summary['size']
+            metrics['created'] += summary['created']
+            metrics['duplicates'] += summary['duplicates']
+            metrics['errors'] += summary['errors']
+            metrics['last_batch'] = summary
+
+class RecentSubmissionFilter:
+    """
+    Identifiants de soumission Tally récemment enregistrés par le processus (LRU borné)
+
+    Les renvois de Tally d'une soumission déjà enregistrée sont écartés sans requête;
+    l'absence du filtre ne prouve rien, l'insertion idempotente reste la garantie.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, submission_id):
+        """Indique si la soumission a déjà été enregistrée récemment"""
+        if submission_id is None:
+            return False
+        with self._lock:
+            if submission_id in self._ids:
+                self._ids.move_to_end(submission_id)
+                return True
+        return False
+
+    def add(self, submission_id):
+        """Mémorise une soumission enregistrée (validée en base)"""
+        if submission_id is None:
+            return
+        with self._lock:
+            self._ids[submission_id] = None
+            self._ids.move_to_end(submission_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+# Filtre partagé par les requêtes du processus
+recent_submissions = RecentSubmissionFilter(int(os.getenv('WEBHOOK_RECENT_IDS', 10000)))
+
+class IngestWorker:
+    """Threads d'arrière-plan vidant la file d'ingestion des webhooks"""
+
+    # Intervalle de vérification de la file (webhooks mis en file par d'autres processus)
+    POLL_INTERVAL = float(os.getenv('WEBHOOK_INGEST_POLL_SECONDS', 2))
+
+    def __init__(self, workers):
+        self.workers = max(workers, 1)
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self, app, db, tally_service, sheets_service=None):
+        """Démarre les threads du processus (sans effet s'ils tournent déjà)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._loop,
+                    args=(app, db, tally_service, sheets_service),
+                    name=f'webhook-ingest-{i}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Signale l'arrivée d'un webhook en file"""
+        self._wakeup.set()
+
+    def _loop(self, app, db, tally_service, sheets_service):
+        while True:
+            self._wakeup.wait(self.POLL_INTERVAL)
+            self._wakeup.clear()
+            with app.app_context():
+                try:
+                    WebhookIngestService(db, tally_service, sheets_service).drain()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erreur lors du vidage de la file des webhooks: {e}")
+
+# Workers partagés par le processus
+ingest_worker = IngestWorker(int(os.getenv('WEBHOOK_INGEST_WORKERS', 1)))
@@ -4,6 +4,17 @@ const API_BASE = '/api';
 // Variables globales
 let currentHotels = [];
 let currentCharts = {};
+let etagCache = {};
+
+// Libellés des catégories de notes
+const CATEGORY_LABELS = {
+    'accommodation_rating': 'Hébergement',
+    'service_rating': 'Service',
+    'cleanliness_rating': 'Propreté',
+    'food_rating': 'Restauration',
+    'location_rating': 'Emplacement',
+    'value_rating': 'Qualité-prix'
+};
 
 // Initialisation de l'application
 document.addEventListener('DOMContentLoaded', function() {
@@ -11,6 +22,24 @@ document.addEventListener('DOMContentLoaded', function() {
     showSection('dashboard');
 });
 
+// Requête GET revalidée par ETag: le serveur répond 304 si les données n'ont pas changé
+async function fetchWithETag(url) {
+    const cached = etagCache[url];
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    
+    if (response.status === 304 && cached) {
+        return cached.data;
+    }
+    
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        etagCache[url] = { etag, data };
+    }
+    return data;
+}
+
 // Gestion de la navigation
 function showSection(sectionName) {
     // Masquer toutes les sections
@@ -233,12 +262,10 @@ async function loadDashboard() {
         dashboardContent.innerHTML = '<div class="text-center py-5"><div class="spinner-border"></div></div>';
         
         // Charger les statistiques
-        const statsResponse = await fetch(`${API_BASE}/hotels/${hotelId}/statistics`);
-        const stats = await statsResponse.json();
+        const stats = await fetchWithETag(`${API_BASE}/hotels/${hotelId}/statistics`);
         
         // Charger les insights
-        const insightsResponse = await fetch(`${API_BASE}/hotels/${hotelId}/insights`);
-        const insightsData = await insightsResponse.json();
+        const insightsData = await fetchWithETag(`${API_BASE}/hotels/${hotelId}/insights`);
         
         // Afficher le dashboard
         dashboardContent.innerHTML = `
@@ -328,17 +355,8 @@ function createCategoriesChart(categoryAverages) {
     const ctx = document.getElementById('categories-chart');
     if (!ctx) return;
     
-    const labels = {
-        'accommodation_rating': 'Hébergement',
-        'service_rating': 'Service',
-        'cleanliness_rating': 'Propreté',
-        'food_rating': 'Restauration',
-        'location_rating': 'Emplacement',
-        'value_rating': 'Qualité-prix'
-    };
-    
     const data = Object.keys(categoryAverages).map(key => categoryAverages[key]);
-    const chartLabels = Object.keys(categoryAverages).map(key => labels[key] || key);
+    const chartLabels = Object.keys(categoryAverages).map(key => CATEGORY_LABELS[key] || key);
     
     if (currentCharts.categories) {
         currentCharts.categories.destroy();
@@ -493,9 +511,18 @@ async function loadAnalytics() {
     try {
         analyticsContent.innerHTML = '<div class="text-center py-5"><div class="spinner-border"></div></div>';
         
-        // Charger les graphiques
-        const chartsResponse = await fetch(`${API_BASE}/reports/hotel/${hotelId}/charts`);
-        const chartsData = await chartsResponse.json();
+        // Charger les séries des graphiques (rendu côté client)
+        const chartData = await fetchWithETag(`${API_BASE}/hotels/${hotelId}/chart-data`);
+        
+        if (chartData.error || !chartData.total_responses) {
+            analyticsContent.innerHTML = `
+                <div class="text-center py-5">
+                    <i class="fas fa-chart-bar fa-3x text-muted mb-3"></i>
+                    <h4 class="text-muted">Aucune donnée pour générer les graphiques</h4>
+                </div>
+            `;
+            return;
+        }
         
         analyticsContent.innerHTML = `
             <div class="row">
@@ -503,28 +530,28 @@ async function loadAnalytics() {
                     <div class="card">
                         <div class="card-body">
                             <h5 class="card-title">Notes par Catégorie</h5>
-                            <img src="data:image/png;base64,${chartsData.charts.categories}" class="img-fluid" alt="Graphique des catégories">
+                            <div style="height: 300px;"><canvas id="analytics-categories-chart"></canvas></div>
                         </div>
                     </div>
                 </div>
                 
-                ${chartsData.charts.distribution ? `
+                ${chartData.distribution ? `
                     <div class="col-md-6 mb-4">
                         <div class="card">
                             <div class="card-body">
                                 <h5 class="card-title">Distribution des Notes</h5>
-                                <img src="data:image/png;base64,${chartsData.charts.distribution}" class="img-fluid" alt="Distribution des notes">
+                                <div style="height: 300px;"><canvas id="analytics-distribution-chart"></canvas></div>
                             </div>
                         </div>
                     </div>
                 ` : ''}
                 
-                ${chartsData.charts.temporal ? `
+                ${chartData.temporal ? `
                     <div class="col-md-6 mb-4">
                         <div class="card">
                             <div class="card-body">
                                 <h5 class="card-title">Évolution Temporelle</h5>
-                                <img src="data:image/png;base64,${chartsData.charts.temporal}" class="img-fluid" alt="Évolution temporelle">
+                                <div style="height: 300px;"><canvas id="analytics-temporal-chart"></canvas></div>
                             </div>
                         </div>
                     </div>
@@ -532,6 +559,8 @@ async function loadAnalytics() {
             </div>
         `;
         
+        createAnalyticsCharts(chartData);
+        
     } catch (error) {
         console.error('Erreur lors du chargement des analyses:', error);
         analyticsContent.innerHTML = `
@@ -544,6 +573,76 @@ async function loadAnalytics() {
 }
 
 // Reports
+function createAnalyticsCharts(chartData) {
+    ['analyticsCategories', 'analyticsDistribution', 'analyticsTemporal'].forEach(name => {
+        if (currentCharts[name]) {
+            currentCharts[name].destroy();
+            delete currentCharts[name];
+        }
+    });
+    
+    const rangeOptions = {
+        responsive: true,
+        maintainAspectRatio: false,
+        scales: { y: { beginAtZero: true, max: 5 } },
+        plugins: { legend: { display: false } }
+    };
+    
+    currentCharts.analyticsCategories = new Chart(document.getElementById('analytics-categories-chart'), {
+        type: 'bar',
+        data: {
+            labels: chartData.categories.keys.map(key => CATEGORY_LABELS[key] || key),
+            datasets: [{
+                label: 'Note moyenne',
+                data: chartData.categories.values,
+                backgroundColor: 'rgba(37, 99, 235, 0.8)',
+                borderColor: 'rgba(37, 99, 235, 1)',
+                borderWidth: 1
+            }]
+        },
+        options: rangeOptions
+    });
+    
+    if (chartData.distribution) {
+        currentCharts.analyticsDistribution = new Chart(document.getElementById('analytics-distribution-chart'), {
+            type: 'bar',
+            data: {
+                labels: chartData.distribution.ratings.map(rating => `${rating}/5`),
+                datasets: [{
+                    label: 'Nombre de réponses',
+                    data: chartData.distribution.counts,
+                    backgroundColor: 'rgba(16, 185, 129, 0.8)',
+                    borderColor: 'rgba(16, 185, 129, 1)',
+                    borderWidth: 1
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: { y: { beginAtZero: true, ticks: { precision: 0 } } },
+                plugins: { legend: { display: false } }
+            }
+        });
+    }
+    
+    if (chartData.temporal) {
+        currentCharts.analyticsTemporal = new Chart(document.getElementById('analytics-temporal-chart'), {
+            type: 'line',
+            data: {
+                labels: chartData.temporal.periods,
+                datasets: [{
+                    label: 'Note moyenne',
+                    data: chartData.temporal.values,
+                    borderColor: 'rgba(37, 99, 235, 1)',
+                    backgroundColor: 'rgba(37, 99, 235, 0.2)',
+                    tension: 0.2
+                }]
+            },
+            options: rangeOptions
+        });
+    }
+}
+
 function populateReportSelectors() {
     // Les sélecteurs sont déjà mis à jour par updateHotelSelectors
 }
@@ -584,25 +683,45 @@ async function exportHotelExcel() {
 
 async function exportGlobalExcel() {
     try {
-        const response = await fetch(`${API_BASE}/reports/global/excel`);
+        // Génération en arrière-plan: mise en file puis suivi jusqu'au téléchargement
+        const response = await fetch(`${API_BASE}/reports/jobs`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ type: 'global_excel' })
+        });
+        let job = await response.json();
         
-        if (response.ok) {
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `HotelSat_Rapport_Global_${new Date().toISOString().split('T')[0]}.xlsx`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
-            showAlert('Rapport global téléchargé avec succès', 'success');
-        } else {
-            const error = await response.json();
-            showAlert(error.error || 'Erreur lors de l\'export', 'danger');
+        if (!response.ok) {
+            showAlert(job.error || 'Erreur lors de l\'export', 'danger');
+            return;
+        }
+        
+        showAlert('Génération du rapport global en cours...', 'info');
+        
+        while (job.status === 'pending' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const statusResponse = await fetch(job.status_url);
+            job = await statusResponse.json();
+            if (!statusResponse.ok) {
+                showAlert(job.error || 'Erreur lors de l\'export', 'danger');
+                return;
+            }
+        }
+        
+        if (job.status !== 'completed') {
+            showAlert(job.error || 'Erreur lors de l\'export', 'danger');
+            return;
         }
         
+        const a = document.createElement('a');
+        a.href = job.download_url;
+        a.download = job.artifact_name;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        
+        showAlert('Rapport global téléchargé avec succès', 'success');
+        
     } catch (error) {
         console.error('Erreur lors de l\'export global:', error);
         showAlert('Erreur lors de l\'export global', 'danger');
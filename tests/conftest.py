@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.hotel import db, Hotel
+from src.routes.hotels import hotels_bp
+from src.routes.webhooks import webhooks_bp
+from src.services.analytics_cache import analytics_cache
+from src.services.hotel_resolver import hotel_resolver
+from src.services.response_cache import response_cache
+from src.services.rollup_service import StatsRollupService
+from src.services.webhook_ingest_service import recent_submissions
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Application Flask minimale sur une base SQLite fichier (partagée entre threads)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    db.init_app(app)
+    app.register_blueprint(hotels_bp, url_prefix='/api')
+    app.register_blueprint(webhooks_bp, url_prefix='/api')
+
+    # Caches du processus: aucun état hérité d'un test précédent
+    response_cache.invalidate()
+    analytics_cache.invalidate()
+    recent_submissions._ids.clear()
+    hotel_resolver._by_id = None
+
+    with app.app_context():
+        db.create_all()
+        StatsRollupService(db).ensure_triggers()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def hotel(app):
+    """Hôtel relié à une feuille Google Sheets"""
+    with app.app_context():
+        hotel = Hotel(name='Hôtel Test', google_sheet_id='sheet-1', tally_form_url='https://tally.so/r/testform')
+        db.session.add(hotel)
+        db.session.commit()
+        return hotel.id
@@ -0,0 +1,44 @@
+import httplib2
+from googleapiclient.errors import HttpError
+
+from src.services.google_sheets_service import GoogleSheetsService
+
+
+class SheetsCrash(BaseException):
+    """Arrêt brutal du processus simulé pendant un appel à l'API"""
+
+
+class FakeSheetsService(GoogleSheetsService):
+    """
+    Service Google Sheets local: les feuilles sont des listes de lignes en mémoire
+
+    failures: exceptions levées par les prochains appels values.append, dans l'ordre
+    (None pour un appel réussi); crash_after_append: arrêt juste après l'ajout effectif.
+    """
+
+    def __init__(self, failures=None, crash_after_append=False):
+        self.service = True
+        self.sheets = {}
+        self.calls = []
+        self.failures = list(failures or [])
+        self.crash_after_append = crash_after_append
+
+    def append_rows(self, sheet_id, rows):
+        self.calls.append((sheet_id, len(rows)))
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+
+        self.sheets.setdefault(sheet_id, []).extend(rows)
+        if self.crash_after_append:
+            self.crash_after_append = False
+            raise SheetsCrash()
+        return len(rows)
+
+    def read_rows(self, sheet_id):
+        return [list(row) for row in self.sheets.get(sheet_id, [])]
+
+
+def http_error(status):
+    """Erreur HTTP telle que levée par le client de l'API Google"""
+    return HttpError(httplib2.Response({'status': status}), b'{"error": {"message": "fake"}}')
@@ -0,0 +1,39 @@
+import os
+
+from flask import Flask
+
+from src.routes.reports import reports_bp
+from src.services.chart_service import ChartService
+
+
+def make_client(tmp_path, monkeypatch):
+    monkeypatch.setenv('CHART_CACHE_DIR', str(tmp_path / 'charts'))
+    app = Flask(__name__)
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_served_chart_is_touched_and_rerendered_after_eviction(tmp_path, monkeypatch):
+    client = make_client(tmp_path, monkeypatch)
+    chart_service = ChartService()
+    spec = chart_service.distribution_spec('Hôtel Test', {1: 2, 5: 8})
+    url = chart_service.chart_url(spec, 'thumbnail')
+    path = chart_service.path(url.rsplit('/', 1)[1][:-4])
+
+    # Servir le PNG le marque comme récemment utilisé
+    os.utime(path, (0, 0))
+    assert client.get(url).status_code == 200
+    assert os.stat(path).st_mtime > 0
+
+    # PNG évincé: l'URL toujours présente dans une réponse en cache est rendue à nouveau
+    os.remove(path)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data.startswith(b'\x89PNG')
+    assert os.path.exists(path)
+
+
+def test_unknown_chart_hash_returns_404(tmp_path, monkeypatch):
+    client = make_client(tmp_path, monkeypatch)
+    assert client.get(f"/api/charts/{'0' * 64}.png").status_code == 404
+    assert client.get('/api/charts/not-a-hash.png').status_code == 404
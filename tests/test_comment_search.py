@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import text
+
+from src.models.hotel import db, SatisfactionResponse
+from src.models.response_details import ResponseProfile
+from src.services.comment_search_service import CommentSearchService
+
+
+def test_search_snippet_escapes_comment_html(app, hotel):
+    with app.app_context():
+        search_service = CommentSearchService(db)
+        if not search_service.ensure_index():
+            pytest.skip('FTS5 indisponible')
+        db.session.add(SatisfactionResponse(
+            hotel_id=hotel, comments='Piscine <script>alert(1)</script> & bar "top"'
+        ))
+        db.session.commit()
+
+        [result] = search_service.search(hotel, 'piscine')['results']
+        assert result['snippet'] == (
+            '<mark>Piscine</mark> &lt;script&gt;alert(1)&lt;/script&gt; &amp; bar &#34;top&#34;'
+        )
+
+
+def test_search_includes_additional_comments(app, hotel):
+    with app.app_context():
+        search_service = CommentSearchService(db)
+        if not search_service.ensure_index():
+            pytest.skip('FTS5 indisponible')
+
+    response = app.test_client().post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+        'submissionId': 'tot-1',
+        'data': {'commentaires': 'Chambre spacieuse', 'votre_avis_compte': 'Animation excellente'}
+    })
+    assert response.status_code == 201
+
+    with app.app_context():
+        [result] = search_service.search(hotel, 'animation')['results']
+        assert result['snippet'] == '<mark>Animation</mark> excellente'
+        assert search_service.search(hotel, 'chambre')['total'] == 1
+
+        # Avis libre modifié puis supprimé: l'index suit le profil
+        profile = db.session.get(ResponseProfile, result['response_id'])
+        profile.additional_comments = 'Spectacle réussi'
+        db.session.commit()
+        assert search_service.search(hotel, 'animation')['total'] == 0
+        assert search_service.search(hotel, 'spectacle')['total'] == 1
+
+        db.session.delete(profile)
+        db.session.commit()
+        assert search_service.search(hotel, 'spectacle')['total'] == 0
+        assert search_service.search(hotel, 'chambre')['total'] == 1
+
+        # Index cohérent avec son contenu externe
+        db.session.execute(text(f"INSERT INTO {search_service.FTS_TABLE}({search_service.FTS_TABLE}) VALUES ('integrity-check')"))
+
+
+def test_ensure_index_replaces_comments_only_index(app, hotel):
+    with app.app_context():
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE {CommentSearchService.FTS_TABLE} USING fts5("
+            "comments, hotel_id UNINDEXED, content='satisfaction_responses', content_rowid='id')"
+        ))
+        db.session.add(SatisfactionResponse(hotel_id=hotel, comments='Piscine chauffée'))
+        db.session.flush()
+        db.session.add(ResponseProfile(response_id=1, hotel_id=hotel, additional_comments='Animation excellente'))
+        db.session.commit()
+
+        search_service = CommentSearchService(db)
+        if not search_service.ensure_index():
+            pytest.skip('FTS5 indisponible')
+        assert search_service.search(hotel, 'animation')['total'] == 1
+        assert search_service.search(hotel, 'piscine')['total'] == 1
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from src.models.hotel import db, SatisfactionResponse
+from src.models.response_details import ResponseRating
+from src.services.field_mapping import field_mapping
+
+
+def add_responses(hotel_id, ratings):
+    """Réponses avec note globale et note détaillée de la piscine (None = non renseignée)"""
+    code = field_mapping.rating_codes['pool_hygiene_rating']
+    for overall, pool in ratings:
+        response = SatisfactionResponse(
+            hotel_id=hotel_id, client_name='Client', overall_rating=overall, submission_date=datetime.utcnow()
+        )
+        db.session.add(response)
+        db.session.flush()
+        if pool is not None:
+            db.session.add(ResponseRating(hotel_id=hotel_id, field_code=code, response_id=response.id, rating=pool))
+    db.session.commit()
+
+
+def test_correlation_matrix_includes_detail_ratings(app, hotel):
+    with app.app_context():
+        add_responses(hotel, [(1, 2), (3, 4), (5, 5), (4, None), (2, None)])
+
+    client = app.test_client()
+    body = client.get(f'/api/hotels/{hotel}/correlations').get_json()
+
+    # Notes détaillées renseignées ajoutées aux notes principales
+    assert body['fields'][-1] == 'pool_hygiene_rating'
+    assert 'flight_comfort_rating' not in body['fields']
+    overall, pool = body['fields'].index('overall_rating'), body['fields'].index('pool_hygiene_rating')
+    assert body['observations'][overall][pool] == 3
+    assert body['matrix'][overall][pool] > 0.9
+
+    body = client.get(f'/api/hotels/{hotel}/correlations?fields=pool_hygiene_rating,overall_rating').get_json()
+    assert body['fields'] == ['pool_hygiene_rating', 'overall_rating']
+    assert body['observations'] == [[3, 3], [3, 5]]
+
+
+def test_correlation_requires_minimum_overlap(app, hotel):
+    with app.app_context():
+        add_responses(hotel, [(1, 2), (3, None), (5, None)])
+
+    body = app.test_client().get(f'/api/hotels/{hotel}/correlations?fields=overall_rating,pool_hygiene_rating').get_json()
+    assert body['observations'][0][1] == 1
+    assert body['matrix'][0][1] is None
@@ -0,0 +1,53 @@
+from datetime import datetime
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from src.models.hotel import db, SatisfactionResponse
+from src.services.analytics_service import AnalyticsService
+from src.services.excel_export_service import ExcelExportService
+
+
+def test_global_report_hotel_sheets_keep_their_headers_and_day_dates(app, hotel):
+    with app.app_context():
+        db.session.add(SatisfactionResponse(
+            hotel_id=hotel, client_name='Client', overall_rating=4, submission_date=datetime(2024, 6, 1, 14, 30)
+        ))
+        db.session.commit()
+
+        export_service = ExcelExportService(db)
+        hotel_rows = list(load_workbook(BytesIO(b''.join(
+            export_service.stream_hotel_workbook(hotel)
+        )))['Données'].values)
+        global_rows = list(load_workbook(BytesIO(b''.join(
+            export_service.stream_global_workbook()
+        )))['Hôtel Test'].values)
+
+    # Onglets par hôtel du rapport global: en-têtes courts et date au jour, mêmes colonnes que l'export par hôtel
+    assert list(global_rows[0]) == ExcelExportService.GLOBAL_RESPONSE_HEADERS
+    assert hotel_rows[0][:2] == ('Date de soumission', 'Nom du client')
+    assert global_rows[1][0] == '2024-06-01'
+    assert hotel_rows[1][0] == '2024-06-01 14:30:00'
+    assert global_rows[1][1:] == hotel_rows[1][1:]
+
+
+def test_global_report_summary_matches_hotel_statistics(app, hotel):
+    with app.app_context():
+        for overall, service, recommend in [(4, 5, True), (3, None, False), (5, 4, None)]:
+            db.session.add(SatisfactionResponse(
+                hotel_id=hotel, overall_rating=overall, service_rating=service, would_recommend=recommend,
+                submission_date=datetime(2024, 6, 1)
+            ))
+        db.session.commit()
+
+        stats = AnalyticsService(db).get_hotel_statistics(hotel)
+        summary_rows = list(load_workbook(BytesIO(b''.join(
+            ExcelExportService(db).stream_global_workbook()
+        )))['Synthèse'].values)
+
+    categories = stats['category_averages']
+    assert summary_rows[1] == (
+        'Hôtel Test', None, stats['total_responses'], stats['average_overall_rating'], stats['recommendation_rate'],
+        categories['accommodation_rating'], categories['service_rating'], categories['cleanliness_rating'],
+        categories['food_rating'], categories['location_rating'], categories['value_rating']
+    )
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from src.models.hotel import db, SatisfactionResponse
+from src.services.analytics_service import AnalyticsService
+
+
+def test_insights_timings_are_sent_as_server_timing_and_not_cached(app, hotel):
+    with app.app_context():
+        db.session.add(SatisfactionResponse(hotel_id=hotel, overall_rating=4, service_rating=5))
+        db.session.commit()
+
+    client = app.test_client()
+    first = client.get(f'/api/hotels/{hotel}/insights')
+    assert first.status_code == 200
+    assert 'timings' not in first.get_json()
+    assert first.headers['X-Cache'] == 'MISS'
+    assert 'snapshot;dur=' in first.headers['Server-Timing']
+
+    # Réponse rejouée depuis le cache: même corps, aucune durée périmée
+    second = client.get(f'/api/hotels/{hotel}/insights')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_data() == first.get_data()
+    assert 'Server-Timing' not in second.headers
+
+
+def test_chart_data_is_built_from_one_snapshot(app, hotel, monkeypatch):
+    with app.app_context():
+        now = datetime.utcnow()
+        for days, overall, service in [(1, 4, 5), (3, 2, None), (10, 5, 4), (40, 3, 3)]:
+            db.session.add(SatisfactionResponse(
+                hotel_id=hotel, overall_rating=overall, service_rating=service,
+                submission_date=now - timedelta(days=days)
+            ))
+        db.session.commit()
+
+        analytics_service = AnalyticsService(db)
+        stats = analytics_service.get_hotel_statistics(hotel)
+        distribution = analytics_service.get_rating_distribution(hotel)
+        temporal = analytics_service.get_temporal_analysis(hotel, 60)
+
+        load_snapshot = analytics_service.load_snapshot
+        snapshots = []
+        monkeypatch.setattr(analytics_service, 'load_snapshot', lambda hotel_id: snapshots.append(hotel_id) or load_snapshot(hotel_id))
+        chart_data = analytics_service.get_chart_data(hotel, 60)
+
+    # Mêmes séries que les analyses séparées, en un seul chargement des données
+    assert snapshots == [hotel]
+    assert chart_data['total_responses'] == stats['total_responses'] == 4
+    assert chart_data['categories']['values'] == list(stats['category_averages'].values())
+    assert chart_data['distribution']['counts'] == list(distribution.values())
+    assert chart_data['temporal']['periods'] == [d['period'] for d in temporal['data']]
+    assert chart_data['temporal']['values'] == [d['average_rating'] for d in temporal['data']]
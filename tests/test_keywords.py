@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from src.models.hotel import db, SatisfactionResponse
+from src.models.response_details import ResponseProfile
+from src.models.statistics import HotelKeywordFrequency
+from src.services.analytics_service import AnalyticsService
+from src.services.keyword_service import KeywordService
+
+
+def test_ingested_comments_update_keyword_frequencies(app, hotel):
+    client = app.test_client()
+    for index, comment in enumerate(['Piscine magnifique, très propre', "Piscine froide mais l'accueil chaleureux"]):
+        response = client.post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+            'submissionId': f'sub-{index}', 'data': {'note_globale': '4', 'commentaires': comment}
+        })
+        assert response.status_code == 201
+
+    with app.app_context():
+        keywords = dict(KeywordService(db).top_keywords(hotel))
+        # Mots vides (très, mais) et mots courts (l') exclus
+        assert keywords == {
+            'piscine': 2, 'magnifique': 1, 'propre': 1, 'froide': 1, 'accueil': 1, 'chaleureux': 1
+        }
+        assert KeywordService(db).top_keywords(hotel, limit=1) == [('piscine', 2)]
+
+
+def test_backfill_rebuilds_frequencies_from_existing_comments(app, hotel):
+    with app.app_context():
+        for index, month in enumerate([1, 1, 3]):
+            db.session.add(SatisfactionResponse(
+                hotel_id=hotel, comments='Restaurant excellent', submission_date=datetime(2024, month, 10),
+                tally_submission_id=f'old-{index}'
+            ))
+        db.session.commit()
+        keyword_service = KeywordService(db)
+        assert not keyword_service.has_keywords(hotel)
+        # Avant le remplissage: mots-clés comptés sur les commentaires de l'hôtel
+        assert dict(AnalyticsService(db).load_snapshot(hotel).top_keywords) == {'restaurant': 3, 'excellent': 3}
+
+        assert keyword_service.backfill() == 3
+        assert keyword_service.has_keywords(hotel)
+        rows = {
+            (row.month.month, row.term): row.occurrences
+            for row in HotelKeywordFrequency.query.filter_by(hotel_id=hotel)
+        }
+        assert rows == {(1, 'restaurant'): 2, (1, 'excellent'): 2, (3, 'restaurant'): 1, (3, 'excellent'): 1}
+        assert dict(AnalyticsService(db).load_snapshot(hotel).top_keywords) == {'restaurant': 3, 'excellent': 3}
+
+
+def test_first_ingested_comment_seeds_keywords_from_existing_comments(app, hotel):
+    with app.app_context():
+        # Commentaires antérieurs au suivi des mots-clés
+        for index in range(3):
+            db.session.add(SatisfactionResponse(
+                hotel_id=hotel, comments='Piscine magnifique', submission_date=datetime(2024, 5, 1),
+                tally_submission_id=f'old-{index}'
+            ))
+        # Ligne partielle écrite avant l'initialisation
+        db.session.add(HotelKeywordFrequency(hotel_id=hotel, month=datetime(2024, 6, 1).date(), term='piscine', occurrences=7))
+        db.session.commit()
+        assert not KeywordService(db).has_keywords(hotel)
+
+    response = app.test_client().post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+        'submissionId': 'new-1', 'data': {'note_globale': '4', 'commentaires': 'Piscine froide'}
+    })
+    assert response.status_code == 201
+
+    with app.app_context():
+        keyword_service = KeywordService(db)
+        assert keyword_service.has_keywords(hotel)
+        assert dict(keyword_service.top_keywords(hotel)) == {'piscine': 4, 'magnifique': 3, 'froide': 1}
+
+        # Réponses suivantes: simple incrément
+        app.test_client().post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+            'submissionId': 'new-2', 'data': {'commentaires': 'Piscine propre'}
+        })
+        assert dict(keyword_service.top_keywords(hotel))['piscine'] == 5
+        assert dict(AnalyticsService(db).load_snapshot(hotel).top_keywords)['piscine'] == 5
+
+
+def test_additional_comments_are_indexed_with_comments(app, hotel):
+    response = app.test_client().post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+        'submissionId': 'tot-1',
+        'data': {'commentaires': 'Chambre spacieuse', 'votre_avis_compte': 'Animation excellente'}
+    })
+    assert response.status_code == 201
+
+    with app.app_context():
+        stored = SatisfactionResponse.query.filter_by(tally_submission_id='tot-1').one()
+        assert stored.comments == 'Chambre spacieuse'
+        assert db.session.get(ResponseProfile, stored.id).additional_comments == 'Animation excellente'
+        assert {'chambre', 'animation', 'excellente'} <= set(dict(KeywordService(db).top_keywords(hotel)))
+
+        # Recalcul depuis la base: avis libre lu dans les profils
+        KeywordService(db).backfill()
+        assert {'chambre', 'animation', 'excellente'} <= set(dict(KeywordService(db).top_keywords(hotel)))
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+from src.models.hotel import db
+from src.models.report_job import ReportJob
+from src.services.report_job_service import ReportJobService
+
+
+def dead_pid():
+    """Pid d'un processus terminé"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def add_job(job_id, status, worker_pid, worker_boot, params_hash='hash'):
+    db.session.add(ReportJob(
+        id=job_id, job_type='global_excel', params='{}', params_hash=params_hash,
+        status=status, worker_pid=worker_pid, worker_boot=worker_boot
+    ))
+    db.session.commit()
+
+
+def test_reap_orphans_fails_jobs_of_stopped_processes(app):
+    with app.app_context():
+        add_job('own', 'running', os.getpid(), ReportJobService.BOOT_ID)
+        add_job('dead', 'pending', dead_pid(), 'other-boot')
+        add_job('restarted', 'running', os.getpid(), 'previous-boot')
+        add_job('legacy', 'pending', None, None)
+
+        # Indépendant de la durée de conservation: travaux créés à l'instant
+        assert ReportJobService(db).reap_orphans() == 3
+
+        statuses = {job.id: (job.status, job.error) for job in ReportJob.query}
+        assert statuses['own'] == ('running', None)
+        for job_id in ('dead', 'restarted', 'legacy'):
+            assert statuses[job_id] == ('failed', 'Travail interrompu')
+
+
+def test_enqueue_ignores_orphaned_duplicates(app, monkeypatch):
+    submitted = []
+
+    class Executor:
+        def submit(self, *args):
+            submitted.append(args)
+
+    monkeypatch.setattr(ReportJobService, '_get_executor', classmethod(lambda cls: Executor()))
+    monkeypatch.setattr(ReportJobService, 'MAX_PENDING', 1)
+
+    with app.app_context():
+        service = ReportJobService(db)
+        job, created = service.enqueue('global_excel', {})
+        db.session.delete(job)
+        db.session.commit()
+
+        # Même demande laissée en attente par un processus arrêté: ni partagée ni comptée
+        add_job('orphan', 'pending', dead_pid(), 'other-boot', params_hash=job.params_hash)
+
+        job, created = service.enqueue('global_excel', {})
+        assert created
+        assert job.id != 'orphan'
+        assert (job.worker_pid, job.worker_boot) == (os.getpid(), ReportJobService.BOOT_ID)
+        assert db.session.get(ReportJob, 'orphan').status == 'failed'
+        assert len(submitted) == 2
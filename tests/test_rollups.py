@@ -0,0 +1,61 @@
+from src.models.hotel import db, SatisfactionResponse
+from src.models.statistics import HotelResponseCount
+from src.services.analytics_service import AnalyticsService
+from src.services.rollup_service import StatsRollupService
+
+
+def ingest(app, hotel, submission_id, rating):
+    response = app.test_client().post(f'/api/webhooks/tally?hotel_id={hotel}', json={
+        'submissionId': submission_id, 'data': {'note_globale': str(rating)}
+    })
+    assert response.status_code == 201
+
+
+def test_statistics_ignore_rollup_after_direct_writes(app, hotel):
+    ingest(app, hotel, 'sub-1', 4)
+    ingest(app, hotel, 'sub-2', 2)
+
+    with app.app_context():
+        analytics_service = AnalyticsService(db)
+        assert analytics_service._current_rollups([hotel])
+        assert analytics_service.get_hotel_statistics(hotel)['total_responses'] == 2
+
+        # Insertion hors ingestion: agrégat écarté, statistiques recalculées en SQL
+        db.session.add(SatisfactionResponse(hotel_id=hotel, overall_rating=5))
+        db.session.commit()
+        assert not analytics_service._current_rollups([hotel])
+        stats = analytics_service.get_hotel_statistics(hotel)
+        assert (stats['total_responses'], stats['average_overall_rating']) == (3, 3.7)
+
+        StatsRollupService(db).rebuild()
+        assert analytics_service._current_rollups([hotel])
+        assert analytics_service.get_hotel_statistics(hotel)['total_responses'] == 3
+
+        # Modification et suppression directes
+        response = SatisfactionResponse.query.filter_by(tally_submission_id='sub-2').one()
+        response.overall_rating = 5
+        db.session.commit()
+        assert analytics_service.get_hotel_statistics(hotel)['average_overall_rating'] == 4.7
+
+        db.session.delete(response)
+        db.session.commit()
+        stats = analytics_service.get_hotel_statistics(hotel)
+        assert (stats['total_responses'], stats['average_overall_rating']) == (2, 4.5)
+        assert db.session.get(HotelResponseCount, hotel).to_dict() == {'hotel_id': hotel, 'responses': 2, 'updates': 2}
+
+
+def test_statistics_for_hotels_mix_current_and_stale_rollups(app, hotel):
+    ingest(app, hotel, 'sub-1', 4)
+    with app.app_context():
+        db.session.add(SatisfactionResponse(hotel_id=hotel, overall_rating=2))
+        db.session.commit()
+
+        [(_, stats)] = AnalyticsService(db).get_statistics_for_hotels([hotel])
+        assert (stats['total_responses'], stats['average_overall_rating']) == (2, 3.0)
+
+
+def test_comparison_ignores_non_numeric_hotel_ids(app, hotel):
+    response = app.test_client().post('/api/hotels/compare', json={'hotel_ids': ['abc', str(hotel), None]})
+
+    assert response.status_code == 200
+    assert list(response.get_json()) == ['Hôtel Test']
@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.hotel import db
+from src.models.sheets_outbox import SheetsOutboxRow
+from src.services.sheets_outbox_service import SheetsOutboxService
+from fake_sheets import FakeSheetsService, SheetsCrash, http_error
+
+
+@pytest.fixture(autouse=True)
+def outbox_state(monkeypatch):
+    """État du processus remis à zéro, sans intervalle entre appels"""
+    monkeypatch.setattr(SheetsOutboxService, 'MIN_INTERVAL', 0)
+    monkeypatch.setattr(SheetsOutboxService, '_paused_until', 0.0)
+    monkeypatch.setattr(SheetsOutboxService, '_next_call_at', 0.0)
+    monkeypatch.setattr(SheetsOutboxService, '_metrics', dict(SheetsOutboxService._metrics, throttled=0, failures=0, rows_skipped=0))
+
+
+def enqueue(app, rows_per_sheet):
+    """Met en outbox des réponses distinctes, par feuille"""
+    with app.app_context():
+        SheetsOutboxService(db, FakeSheetsService()).enqueue_many([
+            (sheet_id, {
+                'submission_date': datetime(2024, 6, 1, 10, 0, index),
+                'client_name': f'Client {sheet_id} {index}',
+                'overall_rating': 4.0,
+                'would_recommend': True
+            })
+            for sheet_id, count in rows_per_sheet.items()
+            for index in range(count)
+        ])
+        db.session.commit()
+
+
+def make_due(app):
+    """Rend dues toutes les lignes en attente (fin de l'attente exponentielle)"""
+    with app.app_context():
+        SheetsOutboxRow.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+    SheetsOutboxService._paused_until = 0.0
+
+
+def expire_claims(app):
+    """Simule l'expiration des réclamations d'un processus arrêté"""
+    with app.app_context():
+        SheetsOutboxRow.query.update({'claimed_at': datetime.utcnow() - SheetsOutboxService.CLAIM_TIMEOUT * 2})
+        db.session.commit()
+
+
+def test_flush_appends_one_batched_call_per_sheet(app, monkeypatch):
+    monkeypatch.setattr(SheetsOutboxService, 'BATCH_SIZE', 3)
+    enqueue(app, {'sheet-a': 5, 'sheet-b': 2})
+    sheets = FakeSheetsService()
+
+    with app.app_context():
+        assert SheetsOutboxService(db, sheets).flush() == 7
+        assert SheetsOutboxRow.query.count() == 0
+
+    assert sorted(sheets.calls) == [('sheet-a', 2), ('sheet-a', 3), ('sheet-b', 2)]
+    assert [row[1] for row in sheets.sheets['sheet-a']] == [f'Client sheet-a {i}' for i in range(5)]
+
+
+def test_rate_limit_pauses_all_sheets_and_backs_off(app):
+    enqueue(app, {'sheet-a': 2, 'sheet-b': 2})
+    sheets = FakeSheetsService(failures=[http_error(429)])
+
+    with app.app_context():
+        service = SheetsOutboxService(db, sheets)
+        assert service.flush() == 0
+        # Un seul appel: le 429 suspend aussi l'envoi de l'autre feuille
+        assert len(sheets.calls) == 1
+        assert service.stats()['throttled'] == 1
+        assert service.stats()['paused_seconds'] > 0
+
+        rows = SheetsOutboxRow.query.all()
+        assert all(row.status == 'pending' and row.claim_token is None for row in rows)
+        throttled = [row for row in rows if row.attempts == 1]
+        assert len(throttled) == 2
+        assert all(row.next_attempt_at > datetime.utcnow() for row in throttled)
+
+        # Lignes pas encore dues: rien n'est renvoyé
+        SheetsOutboxService._paused_until = 0.0
+        service.flush()
+        assert sorted(sheets.sheets) == ['sheet-b']
+
+    make_due(app)
+    with app.app_context():
+        assert SheetsOutboxService(db, sheets).flush() == 2
+        assert SheetsOutboxRow.query.count() == 0
+    assert len(sheets.sheets['sheet-a']) == 2
+
+
+def test_server_errors_back_off_exponentially(app, monkeypatch):
+    monkeypatch.setattr('random.uniform', lambda low, high: 1.0)
+    enqueue(app, {'sheet-a': 1})
+    sheets = FakeSheetsService(failures=[http_error(503), http_error(500)])
+
+    delays = []
+    for _ in range(2):
+        with app.app_context():
+            before = datetime.utcnow()
+            SheetsOutboxService(db, sheets).flush()
+            row = SheetsOutboxRow.query.one()
+            delays.append((row.next_attempt_at - before).total_seconds())
+        make_due(app)
+
+    # BASE_BACKOFF puis le double; pas de suspension globale hors 429
+    assert delays[0] == pytest.approx(SheetsOutboxService.BASE_BACKOFF, abs=0.5)
+    assert delays[1] == pytest.approx(SheetsOutboxService.BASE_BACKOFF * 2, abs=0.5)
+    assert SheetsOutboxService._metrics['throttled'] == 0
+
+    with app.app_context():
+        assert SheetsOutboxService(db, sheets).flush() == 1
+    assert len(sheets.sheets['sheet-a']) == 1
+
+
+def test_retry_failed_requeues_rows_after_max_attempts(app, monkeypatch):
+    monkeypatch.setattr(SheetsOutboxService, 'MAX_ATTEMPTS', 2)
+    enqueue(app, {'sheet-a': 2})
+    sheets = FakeSheetsService(failures=[http_error(500), http_error(500)])
+
+    for _ in range(2):
+        with app.app_context():
+            SheetsOutboxService(db, sheets).flush()
+        make_due(app)
+
+    with app.app_context():
+        service = SheetsOutboxService(db, sheets)
+        assert service.stats()['failed'] == 2
+        # Les lignes en échec ne sont plus envoyées
+        assert service.flush() == 0
+
+        assert service.retry_failed() == 2
+        row = SheetsOutboxRow.query.first()
+        assert (row.status, row.attempts) == ('pending', 0)
+        assert service.flush() == 2
+    assert len(sheets.sheets['sheet-a']) == 2
+
+
+def test_flush_interrupted_between_sheets_sends_each_row_once(app):
+    enqueue(app, {'sheet-a': 2, 'sheet-b': 2})
+    sheets = FakeSheetsService(failures=[None, SheetsCrash()])
+
+    with app.app_context():
+        with pytest.raises(SheetsCrash):
+            SheetsOutboxService(db, sheets).flush()
+        db.session.rollback()
+
+        # Lignes de la feuille interrompue toujours réclamées par le processus arrêté
+        assert SheetsOutboxService(db, sheets).flush() == 0
+
+    expire_claims(app)
+    with app.app_context():
+        assert SheetsOutboxService(db, sheets).flush() == 2
+        assert SheetsOutboxRow.query.count() == 0
+    assert len(sheets.sheets['sheet-a']) == 2
+    assert len(sheets.sheets['sheet-b']) == 2
+
+
+def test_flush_interrupted_after_append_does_not_duplicate_rows(app):
+    enqueue(app, {'sheet-a': 3})
+    sheets = FakeSheetsService(crash_after_append=True)
+
+    with app.app_context():
+        with pytest.raises(SheetsCrash):
+            SheetsOutboxService(db, sheets).flush()
+        db.session.rollback()
+        assert SheetsOutboxRow.query.filter_by(status='sending').count() == 3
+
+    expire_claims(app)
+    with app.app_context():
+        # Lignes retrouvées dans la feuille: supprimées de l'outbox sans nouvel appel
+        assert SheetsOutboxService(db, sheets).flush() == 0
+        assert SheetsOutboxRow.query.count() == 0
+    assert len(sheets.calls) == 1
+    assert len(sheets.sheets['sheet-a']) == 3
+
+
+def test_rows_are_not_queued_without_sheets_service(app):
+    with app.app_context():
+        service = SheetsOutboxService(db, FakeSheetsService())
+        service.sheets_service.service = None
+        assert service.enqueue('sheet-a', {'client_name': 'Client'}) is None
+        service.enqueue_many([('sheet-a', {'client_name': 'Client'})] * 3)
+        db.session.commit()
+
+        # Aucun envoi possible: l'outbox reste vide, les lignes ignorées sont comptées
+        assert SheetsOutboxRow.query.count() == 0
+        stats = service.stats()
+        assert not stats['available']
+        assert stats['rows_skipped'] == 4
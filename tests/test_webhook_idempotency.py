@@ -0,0 +1,77 @@
+import threading
+from collections import Counter
+
+from src.models.hotel import db, SatisfactionResponse
+from src.models.sheets_outbox import SheetsOutboxRow
+from src.models.statistics import HotelStatsRollup, HotelDailyRollup
+from src.routes import webhooks
+from fake_sheets import FakeSheetsService
+
+THREADS = 20
+
+
+def deliver_concurrently(app, hotel_id, submission_ids):
+    """Envoie un webhook par identifiant, tous les threads démarrant ensemble"""
+    barrier = threading.Barrier(len(submission_ids))
+    statuses = []
+
+    def deliver(submission_id):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(f'/api/webhooks/tally?hotel_id={hotel_id}', json={
+            'submissionId': submission_id,
+            'formId': 'testform',
+            'data': {'note_globale': '4', 'service': '5', 'recommandation': 'Oui', 'commentaires': 'Piscine superbe'}
+        })
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=deliver, args=(submission_id,)) for submission_id in submission_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Counter(statuses)
+
+
+def test_concurrent_duplicate_deliveries_create_one_response(app, hotel, monkeypatch):
+    # Service Google Sheets disponible, sans thread d'envoi
+    monkeypatch.setattr(webhooks, 'google_sheets_service', FakeSheetsService())
+    monkeypatch.setattr(webhooks, 'start_sheets_flusher', lambda app: None)
+    statuses = deliver_concurrently(app, hotel, ['sub-1'] * THREADS)
+
+    # Une seule création, les autres livraisons sont reconnues comme doublons
+    assert statuses == Counter({201: 1, 200: THREADS - 1})
+    with app.app_context():
+        assert SatisfactionResponse.query.filter_by(tally_submission_id='sub-1').count() == 1
+        assert SheetsOutboxRow.query.count() == 1
+        rollup = db.session.get(HotelStatsRollup, hotel)
+        assert rollup.total_responses == 1
+        assert rollup.overall_rating_count == 1
+        assert rollup.recommend_yes == 1
+
+
+def test_test_webhook_replay_is_acknowledged(app, hotel, monkeypatch):
+    from src.routes import webhooks
+
+    sample = webhooks.tally_service.create_sample_webhook_data('Hôtel Test')
+    monkeypatch.setattr(webhooks.tally_service, 'create_sample_webhook_data', lambda hotel_name: sample)
+    client = app.test_client()
+
+    assert client.post(f'/api/webhooks/test?hotel_id={hotel}').status_code == 201
+    replay = client.post(f'/api/webhooks/test?hotel_id={hotel}')
+    assert replay.status_code == 200
+    assert replay.get_json() == {'message': 'Soumission déjà traitée'}
+
+
+def test_concurrent_first_responses_seed_rollup_once(app, hotel):
+    # Aucun agrégat pour l'hôtel: chaque worker tente de l'initialiser
+    statuses = deliver_concurrently(app, hotel, [f'sub-{i}' for i in range(THREADS)])
+
+    assert statuses == Counter({201: THREADS})
+    with app.app_context():
+        rollup = db.session.get(HotelStatsRollup, hotel)
+        assert rollup.total_responses == THREADS
+        assert rollup.service_rating_count == THREADS
+        assert rollup.recommend_yes == THREADS
+        daily = HotelDailyRollup.query.filter_by(hotel_id=hotel).all()
+        assert sum(row.total_responses for row in daily) == THREADS